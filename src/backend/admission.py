@@ -0,0 +1,282 @@
+"""
+Admission control for QR code generation requests.
+
+Every request gets a cost estimate before any work is done. A token bucket per
+client limits how much cost each client may submit over time, and a bounded
+priority queue limits how many renders run at once. When the server is busy,
+cheap requests are admitted first, expensive ones wait behind them, and
+requests are shed once the queue is full or they have waited too long.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from qrcode import constants, util
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed instead of admitted."""
+
+    def __init__(self, reason, retry_after=1):
+        super().__init__(f"Server is overloaded ({reason}), please retry later")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def estimate_cost(content, box_size=20, border=4, title=None, logo=False, rasterize=True,
+                  error_correction=constants.ERROR_CORRECT_M):
+    """
+    Estimate the relative cost of rendering a QR code, without encoding it.
+
+    The version is estimated from the byte length of the content, which is
+    exact for byte-mode data and an upper bound otherwise. One unit is roughly
+    the cost of a small titled code.
+
+    Args:
+        content: The content to encode
+        box_size: Size of each box in pixels
+        border: Border size in boxes
+        title: Title text, if any
+        logo: Whether a logo is composited
+        rasterize: Whether an image is rendered (False for matrix-only responses)
+        error_correction: Error correction level
+
+    Returns:
+        The estimated cost
+    """
+    needed_bits = len(content.encode('utf-8')) * 8 + 20
+    version = min(bisect_left(util.BIT_LIMIT_TABLE[error_correction], needed_bits, 1), 40)
+    modules = version * 4 + 17
+
+    # Encoding and mask selection scale with the module count
+    cost = modules * modules / 2000
+
+    if rasterize:
+        pixels = ((modules + 2 * border) * box_size) ** 2
+        cost += pixels / 500000
+        if title:
+            cost += 0.5
+        if logo:
+            cost += 1.0
+
+    return cost
+
+
+class TokenBucket:
+    """A thread-safe token bucket refilled continuously over time."""
+
+    def __init__(self, rate, capacity):
+        """
+        Initialize a full bucket.
+
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum number of tokens
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, amount):
+        """
+        Take tokens from the bucket if enough are available.
+
+        Args:
+            amount: Number of tokens to take
+
+        Returns:
+            True if the tokens were taken
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+            # A request costlier than the whole bucket is allowed on a full bucket
+            if self.tokens >= min(amount, self.capacity):
+                self.tokens -= amount
+                return True
+            return False
+
+
+class ClientRateLimiter:
+    """Token buckets per client, bounded to the most recently seen clients."""
+
+    def __init__(self, rate, capacity, max_clients=10000):
+        """
+        Initialize the limiter.
+
+        Args:
+            rate: Cost units each client regains per second
+            capacity: Maximum burst of cost units per client
+            max_clients: Number of client buckets kept in memory
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.max_clients = max_clients
+        self.limited = 0
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def allow(self, client, cost):
+        """
+        Check whether a client may submit a request of the given cost.
+
+        Args:
+            client: Client identifier (e.g. IP address)
+            cost: Estimated request cost
+
+        Returns:
+            True if the request is within the client's budget
+        """
+        with self._lock:
+            bucket = self._buckets.pop(client, None)
+            if bucket is None:
+                bucket = TokenBucket(self.rate, self.capacity)
+            self._buckets[client] = bucket
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+
+        allowed = bucket.consume(cost)
+        if not allowed:
+            with self._lock:
+                self.limited += 1
+        return allowed
+
+    def stats(self):
+        """Get the number of tracked clients and rate-limited requests."""
+        with self._lock:
+            return {'clients': len(self._buckets), 'limited': self.limited}
+
+
+class _Waiter:
+    """A queued request."""
+
+    __slots__ = ('cost', 'seq', 'state')
+
+    def __init__(self, cost, seq):
+        self.cost = cost
+        self.seq = seq
+        self.state = 'waiting'
+
+    def __lt__(self, other):
+        return (self.cost, self.seq) < (other.cost, other.seq)
+
+
+class AdmissionController:
+    """
+    Limit concurrent renders, queueing excess requests cheapest first.
+    """
+
+    def __init__(self, max_concurrent=4, max_queue=32, queue_timeout=5.0):
+        """
+        Initialize the controller.
+
+        Args:
+            max_concurrent: Number of requests allowed to run at once
+            max_queue: Number of requests allowed to wait for a slot
+            queue_timeout: Seconds a request may wait before it is shed
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+        self.in_flight = 0
+        self.admitted = 0
+        self.deferred = 0
+        self.shed = {'queue_full': 0, 'evicted': 0, 'timeout': 0}
+
+        self._queue = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def _acquire(self, cost):
+        with self._cond:
+            if self.in_flight < self.max_concurrent and not self._queue:
+                self.in_flight += 1
+                self.admitted += 1
+                return
+
+            if len(self._queue) >= self.max_queue:
+                # Make room by shedding the most expensive waiter, if it costs more
+                worst = max(self._queue) if self._queue else None
+                if worst is None or worst.cost <= cost:
+                    self.shed['queue_full'] += 1
+                    raise Overloaded('queue full')
+                self._queue.remove(worst)
+                heapq.heapify(self._queue)
+                worst.state = 'shed'
+                self.shed['evicted'] += 1
+
+            waiter = _Waiter(cost, next(self._seq))
+            heapq.heappush(self._queue, waiter)
+            self.deferred += 1
+            self._cond.notify_all()
+
+            deadline = time.monotonic() + self.queue_timeout
+            while waiter.state == 'waiting':
+                if self.in_flight < self.max_concurrent and self._queue[0] is waiter:
+                    heapq.heappop(self._queue)
+                    waiter.state = 'admitted'
+                    self.in_flight += 1
+                    self.admitted += 1
+                    # The next waiter may also fit
+                    self._cond.notify_all()
+                    return
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._queue.remove(waiter)
+                    heapq.heapify(self._queue)
+                    self.shed['timeout'] += 1
+                    self._cond.notify_all()
+                    raise Overloaded('queue timeout')
+                self._cond.wait(remaining)
+
+            raise Overloaded('evicted by cheaper requests')
+
+    def _release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, cost):
+        """
+        Hold a render slot for the duration of a with block.
+
+        Args:
+            cost: Estimated cost of the request
+
+        Raises:
+            Overloaded: If the request is shed
+        """
+        self._acquire(cost)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def stats(self):
+        """
+        Get admission metrics.
+
+        Returns:
+            Queue depth, in-flight count, admitted and deferred totals, and shed
+            counts by reason
+        """
+        with self._cond:
+            return {
+                'queue_depth': len(self._queue),
+                'in_flight': self.in_flight,
+                'admitted': self.admitted,
+                'deferred': self.deferred,
+                'shed': dict(self.shed, total=sum(self.shed.values())),
+            }
@@ -7,43 +7,116 @@ Designed to work with Vercel serverless deployment.
 
 import os
 import base64
-import io
+import json
+import time
 import uuid
 import tempfile
 import re
-from flask import Flask, request, jsonify, send_from_directory, Response
+from flask import Flask, request, jsonify, redirect, send_from_directory, send_file, Response, make_response
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 # Try absolute imports first (for direct script execution)
 # Fall back to relative imports (for Vercel deployment)
 try:
     from qr_generator import QRGenerator
-    from qr_generator.utils import format_wifi_data, format_contact_data, format_event_data, format_geo_data, format_email_data
+    from qr_generator.incremental import DEFAULT_STAGE_CACHE_BYTES, IncrementalRenderer
+    from qr_generator.jobs import DEFAULT_ARTIFACT_DIR, DEFAULT_JOB_DB, DONE, FAILED, JobQueue, start_workers
+    from qr_generator.planner import ImageBudgetError
+    from qr_generator.renditions import FORMATS, Rendition, parse_rendition, render_renditions
+    from qr_generator.shortlinks import DEFAULT_SHORTLINK_DB, ShortLinkRegistry, is_shortenable
+    from qr_generator.spec import RenderSpec
+    from qr_generator.styles import style_from_options
+    from qr_generator.singleflight import SingleFlight
+    from qr_generator.utils import format_wifi_data, format_contact_data, format_event_data, format_geo_data, format_email_data, pack_matrix
+    from static_assets import StaticAssets
+    from admission import AdmissionController, ClientRateLimiter, Overloaded, estimate_cost
 except ImportError:
     from .qr_generator import QRGenerator
-    from .qr_generator.utils import format_wifi_data, format_contact_data, format_event_data, format_geo_data, format_email_data
+    from .qr_generator.incremental import DEFAULT_STAGE_CACHE_BYTES, IncrementalRenderer
+    from .qr_generator.jobs import DEFAULT_ARTIFACT_DIR, DEFAULT_JOB_DB, DONE, FAILED, JobQueue, start_workers
+    from .qr_generator.planner import ImageBudgetError
+    from .qr_generator.renditions import FORMATS, Rendition, parse_rendition, render_renditions
+    from .qr_generator.shortlinks import DEFAULT_SHORTLINK_DB, ShortLinkRegistry, is_shortenable
+    from .qr_generator.spec import RenderSpec
+    from .qr_generator.styles import style_from_options
+    from .qr_generator.singleflight import SingleFlight
+    from .qr_generator.utils import format_wifi_data, format_contact_data, format_event_data, format_geo_data, format_email_data, pack_matrix
+    from .static_assets import StaticAssets
+    from .admission import AdmissionController, ClientRateLimiter, Overloaded, estimate_cost
 
 # Environment configuration
 is_production = os.environ.get('ENVIRONMENT', 'development') == 'production'
 allowed_origins = os.environ.get('ALLOWED_ORIGINS', '*')
 
 app = Flask(__name__, static_folder='../frontend')
+
+# Number of reverse proxies in front of the app whose X-Forwarded-For
+# entries are trusted; clients are identified by their address otherwise
+trusted_proxy_hops = int(os.environ.get('TRUSTED_PROXY_HOPS', '0'))
+if trusted_proxy_hops:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=trusted_proxy_hops)
 # Enhanced CORS configuration with explicit options
 CORS(app, 
      resources={r"/api/*": {"origins": allowed_origins}},
      supports_credentials=True,
-     allow_headers=["Content-Type", "Authorization", "X-Requested-With"],
+     allow_headers=["Content-Type", "Authorization", "X-Requested-With", "X-Profile"],
      methods=["GET", "POST", "OPTIONS"])
 
 # Create a QR generator instance
 qr_generator = QRGenerator()
 
+# Stage-caching renderer for live previews, bounded per stage in bytes
+preview_renderer = IncrementalRenderer(
+    qr_generator,
+    max_bytes=int(os.environ.get('PREVIEW_CACHE_BYTES', str(DEFAULT_STAGE_CACHE_BYTES)))
+)
+
 # In-memory storage for generated QR codes (for serverless environment)
 qr_codes = {}
 
+# Codes generated in matrix mode, rendered to PNG on download
+pending_renders = {}
+
+# Coalesces concurrent renders of the same code
+render_flights = SingleFlight()
+
+# Per-client rate limiting and bounded, cheapest-first queueing of renders
+rate_limiter = ClientRateLimiter(
+    rate=float(os.environ.get('RATE_LIMIT_RATE', '20')),
+    capacity=float(os.environ.get('RATE_LIMIT_BURST', '60'))
+)
+admission = AdmissionController(
+    max_concurrent=int(os.environ.get('ADMISSION_MAX_CONCURRENT', '4')),
+    max_queue=int(os.environ.get('ADMISSION_MAX_QUEUE', '32')),
+    queue_timeout=float(os.environ.get('ADMISSION_QUEUE_TIMEOUT', '5'))
+)
+
+# Frontend files, precompressed and fingerprinted once at startup
+static_assets = StaticAssets(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'frontend'))
+
 # Create a temporary directory for file operations if needed
 temp_dir = tempfile.gettempdir()
 
+# Background jobs for large requests, run by `main.py job-worker` processes
+# or by JOB_WORKERS processes started with the app
+max_job_items = int(os.environ.get('MAX_JOB_ITEMS', '10000'))
+job_workers = int(os.environ.get('JOB_WORKERS', '0'))
+_job_queue = None
+
+# Short links served by this app; codes encode SHORTLINK_BASE_URL/S/<id>.
+# Shortening is refused unless both it and SHORTLINK_DB_PATH are set, since
+# the Host header is client-supplied and links in a temporary database break
+shortlink_base_url = os.environ.get('SHORTLINK_BASE_URL')
+_shortlinks = None
+
+# Most renditions a single request may ask for
+max_renditions = int(os.environ.get('MAX_RENDITIONS', '8'))
+
+# Per-request profiling, only honoured when enabled on the server
+profiling_enabled = os.environ.get('ENABLE_PROFILING', '').lower() in ('1', 'true', 'yes')
+profile_dir = os.environ.get('PROFILE_DIR', os.path.join(temp_dir, 'qr-profiles'))
+
 
 def sanitize_filename(title, max_length=50):
     """
@@ -73,11 +146,17 @@ def sanitize_filename(title, max_length=50):
 @app.route('/')
 def index():
     """Serve the frontend index.html file."""
-    return send_from_directory('../frontend/html', 'index.html')
+    return static_assets.response('index.html', request) or send_from_directory('../frontend/html', 'index.html')
 
 @app.route('/<path:path>')
 def serve_static(path):
     """Serve static files from the frontend directory."""
+    # Precompressed, fingerprinted copies loaded at startup
+    response = static_assets.response(path, request)
+    if response is not None:
+        return response
+    
+    # Files added after startup are served from disk
     if path.startswith('css/'):
         return send_from_directory('../frontend', path)
     elif path.startswith('js/'):
@@ -86,76 +165,286 @@ def serve_static(path):
         return send_from_directory('../frontend/html', path)
 
 
+def build_qr_content(data):
+    """
+    Build the content to encode from a request payload.
+    
+    Args:
+        data: The JSON payload of a generate request
+        
+    Returns:
+        The content string for the QR code
+    """
+    qr_type = data.get('type', 'custom')
+    
+    # Prepare content based on QR type
+    if qr_type == 'url':
+        content = data.get('content', '')
+    elif qr_type == 'wifi':
+        ssid = data.get('ssid', '')
+        password = data.get('password', '')
+        security = data.get('security', 'WPA')
+        content = format_wifi_data(ssid, password, security)
+    elif qr_type == 'contact':
+        name = data.get('name', '')
+        phone = data.get('phone', '')
+        email = data.get('email', '')
+        company = data.get('company', '')
+        job_title = data.get('jobTitle', '')
+        website = data.get('website', '')
+        content = format_contact_data(
+            name=name,
+            phone=phone,
+            email=email,
+            company=company,
+            title=job_title,
+            website=website
+        )
+    elif qr_type == 'event':
+        name = data.get('name', '')
+        start = data.get('start', '')
+        end = data.get('end', '')
+        location = data.get('location', '')
+        content = format_event_data(
+            name=name,
+            start_iso=start,
+            end_iso=end,
+            location=location
+        )
+    elif qr_type == 'geo':
+        latitude = data.get('latitude', '')
+        longitude = data.get('longitude', '')
+        content = format_geo_data(latitude, longitude)
+    elif qr_type == 'email':
+        recipient = data.get('recipient', '')
+        subject = data.get('subject', '')
+        body = data.get('body', '')
+        content = format_email_data(
+            recipient=recipient,
+            subject=subject,
+            body=body
+        )
+    else:  # custom
+        content = data.get('content', '')
+    
+    return content
+
+
+def build_qr_options(data):
+    """
+    Build the QR code rendering options from a request payload.
+    
+    Args:
+        data: The JSON payload of a generate request
+        
+    Returns:
+        Keyword arguments for QRGenerator.generate
+    """
+    # Set QR code options
+    options = {
+        'title': data.get('title', 'QR Code'),
+        'box_size': 20,  # Larger QR code
+    }
+    
+    # Add custom colors if provided
+    if data.get('type', 'custom') == 'custom':
+        fg_color = data.get('fgColor', '#000000')
+        bg_color = data.get('bgColor', '#FFFFFF')
+        options['fg_color'] = fg_color
+        options['bg_color'] = bg_color
+    
+    # Module shapes, eye styles and gradient fills
+    style = style_from_options(
+        module_style=data.get('moduleStyle'),
+        eye_style=data.get('eyeStyle'),
+        gradient=data.get('gradient'),
+        gradient_type=data.get('gradientType', 'linear'),
+        gradient_angle=float(data.get('gradientAngle', 0)),
+        eye_color=data.get('eyeColor')
+    )
+    if style is not None:
+        options['style'] = style
+    
+    return options
+
+
+def build_matrix_response(content, options):
+    """
+    Build a response carrying a bit-packed module matrix and its styling.
+    
+    Clients paint the matrix themselves, so no image is rasterized on the server.
+    
+    Args:
+        content: The content to encode
+        options: Rendering options from build_qr_options
+        
+    Returns:
+        The JSON-serializable response body
+    """
+    matrix = preview_renderer.matrix(content)
+    
+    return {
+        'success': True,
+        'matrix': {
+            'size': len(matrix),
+            'data': pack_matrix(matrix),
+        },
+        'style': {
+            'boxSize': options.get('box_size', qr_generator.default_box_size),
+            'fgColor': options.get('fg_color', qr_generator.default_fg_color),
+            'bgColor': options.get('bg_color', qr_generator.default_bg_color),
+            'title': options.get('title'),
+            'titleBgColor': qr_generator.default_title_bg_color,
+            'titleTextColor': qr_generator.default_title_text_color,
+            'titleHeight': 80,
+            'titleFontSize': 30,
+        }
+    }
+
+
+def render_spec(content, options):
+    """
+    Build the canonical spec of a render, used to coalesce identical requests.
+    
+    Args:
+        content: The content to encode
+        options: Rendering options from build_qr_options
+        
+    Returns:
+        The RenderSpec with the generator's defaults filled in
+    """
+    return RenderSpec(content, **options).resolve(qr_generator)
+
+
+def client_id():
+    """
+    Identify the client of the current request for rate limiting.
+    
+    X-Forwarded-For is only honoured for the TRUSTED_PROXY_HOPS proxies in
+    front of the app, through ProxyFix, so clients cannot pick their own
+    identity.
+    """
+    return request.remote_addr or 'unknown'
+
+
+def rate_limit_exceeded():
+    """Build the 429 response of a rate-limited request."""
+    response = jsonify({
+        'success': False,
+        'error': 'Rate limit exceeded, please slow down'
+    })
+    response.headers['Retry-After'] = '1'
+    return response, 429
+
+
+def overloaded(error):
+    """Build the 503 response of a request shed by admission control."""
+    response = jsonify({
+        'success': False,
+        'error': str(error)
+    })
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 503
+
+
+def raster_cost(spec):
+    """Estimate the cost of rendering a resolved RenderSpec to an image."""
+    return estimate_cost(spec.content, box_size=spec.box_size, border=spec.border, title=spec.title)
+
+
+def render_admitted(spec, cost):
+    """
+    Render a code to base64 PNG data once, under an admission slot.
+    
+    Concurrent requests for the same code share a single render. Only the
+    request that renders takes a slot; the others wait for its result
+    without holding one.
+    
+    Args:
+        spec: The RenderSpec of the code
+        cost: Estimated cost of the render
+        
+    Returns:
+        The PNG data as a base64 string
+    """
+    def render():
+        with admission.slot(cost):
+            return render_png_base64(spec)
+    
+    encoded_string, _ = render_flights.do(spec, render)
+    return encoded_string
+
+
+def render_png_base64(spec):
+    """
+    Render a QR code to base64-encoded PNG data in memory.
+    
+    The image and the PNG stream are the worker thread's scratch buffers;
+    only the base64 string is allocated per render.
+    
+    Args:
+        spec: The RenderSpec of the code
+        
+    Returns:
+        The PNG data as a base64 string
+    """
+    img = qr_generator.render_spec(spec, reuse_buffer=True)
+    with qr_generator.encode_image(img, 'PNG') as png_data:
+        return base64.b64encode(png_data).decode('ascii')
+
+
+def profiling_requested():
+    """Check whether the current request asks to be profiled and may be."""
+    if not profiling_enabled:
+        return False
+    if request.headers.get('X-Profile', '').lower() in ('1', 'true', 'yes'):
+        return True
+    data = request.get_json(silent=True)
+    return isinstance(data, dict) and data.get('profile') is True
+
+
+def profiled(name, handler):
+    """
+    Run a request handler under the profiler and add the summary to its response.
+    
+    Args:
+        name: File name prefix of the profile files
+        handler: Function producing the response
+        
+    Returns:
+        The handler's response, with a ``profile`` entry in its JSON body
+    """
+    try:
+        from qr_generator.profiling import Profiler
+    except ImportError:
+        from .qr_generator.profiling import Profiler
+    
+    profiler = Profiler(profile_dir, name=f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}")
+    with profiler:
+        response = make_response(handler())
+    
+    body = response.get_json(silent=True)
+    if isinstance(body, dict):
+        body['profile'] = profiler.summary
+        response.set_data(json.dumps(body))
+    return response
+
+
 @app.route('/api/generate', methods=['POST'])
 def generate_qr():
+    """Generate a QR code, profiling it when requested."""
+    if profiling_requested():
+        return profiled('generate', generate_qr_response)
+    return generate_qr_response()
+
+
+def generate_qr_response():
     """Generate a QR code based on the request data."""
     try:
         data = request.json
-        qr_type = data.get('type', 'custom')
         title = data.get('title', 'QR Code')
-        
-        # Prepare content based on QR type
-        if qr_type == 'url':
-            content = data.get('content', '')
-        elif qr_type == 'wifi':
-            ssid = data.get('ssid', '')
-            password = data.get('password', '')
-            security = data.get('security', 'WPA')
-            content = format_wifi_data(ssid, password, security)
-        elif qr_type == 'contact':
-            name = data.get('name', '')
-            phone = data.get('phone', '')
-            email = data.get('email', '')
-            company = data.get('company', '')
-            job_title = data.get('jobTitle', '')
-            website = data.get('website', '')
-            content = format_contact_data(
-                name=name,
-                phone=phone,
-                email=email,
-                company=company,
-                title=job_title,
-                website=website
-            )
-        elif qr_type == 'event':
-            name = data.get('name', '')
-            start = data.get('start', '')
-            end = data.get('end', '')
-            location = data.get('location', '')
-            content = format_event_data(
-                name=name,
-                start_iso=start,
-                end_iso=end,
-                location=location
-            )
-        elif qr_type == 'geo':
-            latitude = data.get('latitude', '')
-            longitude = data.get('longitude', '')
-            content = format_geo_data(latitude, longitude)
-        elif qr_type == 'email':
-            recipient = data.get('recipient', '')
-            subject = data.get('subject', '')
-            body = data.get('body', '')
-            content = format_email_data(
-                recipient=recipient,
-                subject=subject,
-                body=body
-            )
-        else:  # custom
-            content = data.get('content', '')
-        
-        # Set QR code options
-        options = {
-            'title': title,
-            'box_size': 20,  # Larger QR code
-        }
-        
-        # Add custom colors if provided
-        if qr_type == 'custom':
-            fg_color = data.get('fgColor', '#000000')
-            bg_color = data.get('bgColor', '#FFFFFF')
-            options['fg_color'] = fg_color
-            options['bg_color'] = bg_color
+        content, short_url = shorten_content(data, build_qr_content(data))
+        options = build_qr_options(data)
         
         # Generate a filename based on the title
         sanitized_title = sanitize_filename(title)
@@ -163,37 +452,429 @@ def generate_qr():
         short_uuid = uuid.uuid4().hex[:8]
         filename = f"{sanitized_title}_{short_uuid}.png"
         
-        # For serverless environment, use a temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as temp_file:
-            temp_path = temp_file.name
-            
-            # Generate the QR code
-            qr_generator.generate(
-                content=content,
-                output_path=temp_path,
-                **options
-            )
-            
-            # Convert the image to base64 for direct embedding in HTML
-            with open(temp_path, "rb") as image_file:
-                encoded_string = base64.b64encode(image_file.read()).decode('utf-8')
-            
-            # Store the image data in memory for download
-            qr_codes[filename] = encoded_string
-            
-            # Clean up the temporary file
-            try:
-                os.unlink(temp_path)
-            except:
-                pass
+        # Styled codes are always rendered on the server
+        matrix_mode = data.get('render') == 'matrix' and 'style' not in options
+        cost = estimate_cost(
+            content,
+            box_size=options['box_size'],
+            title=options.get('title'),
+            rasterize=not matrix_mode
+        )
+        if not rate_limiter.allow(client_id(), cost):
+            return rate_limit_exceeded()
+        
+        # Client-side rendering: return only the module matrix and render the
+        # full-resolution PNG when it is downloaded
+        spec = render_spec(content, options)
+        if matrix_mode:
+            pending_renders[filename] = spec
+            response = build_matrix_response(content, options)
+            response['filename'] = filename
+            if short_url:
+                response['shortUrl'] = short_url
+            return jsonify(response)
+        
+        # Encoded to base64 for direct embedding in HTML
+        encoded_string = render_admitted(spec, cost)
+        
+        # Store the image data in memory for download
+        qr_codes[filename] = encoded_string
         
         # Return the QR code as base64 data URL
-        return jsonify({
+        response = {
             'success': True,
             'qrCodeUrl': f"data:image/png;base64,{encoded_string}",
             'filename': filename
+        }
+        if short_url:
+            response['shortUrl'] = short_url
+        return jsonify(response)
+        
+    except ImageBudgetError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 413
+        
+    except Overloaded as e:
+        return overloaded(e)
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+def job_queue():
+    """Get the background job queue, creating its database and workers on first use."""
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue(DEFAULT_JOB_DB)
+        if job_workers:
+            start_workers(DEFAULT_JOB_DB, DEFAULT_ARTIFACT_DIR, job_workers)
+    return _job_queue
+
+
+def shortlinks():
+    """
+    Get the short-link registry, creating its database on first use.
+    
+    Raises:
+        ValueError: If SHORTLINK_BASE_URL or SHORTLINK_DB_PATH is not set
+    """
+    global _shortlinks
+    if not shortlink_base_url or not DEFAULT_SHORTLINK_DB:
+        raise ValueError('Short links are not configured: set SHORTLINK_BASE_URL and SHORTLINK_DB_PATH')
+    if _shortlinks is None:
+        _shortlinks = ShortLinkRegistry(DEFAULT_SHORTLINK_DB)
+    return _shortlinks
+
+
+def shorten_content(data, content):
+    """
+    Replace URL content with a short link when the payload asks for it.
+    
+    Args:
+        data: The JSON payload, whose ``shorten`` flag enables shortening
+        content: The content built from the payload
+        
+    Returns:
+        The content to encode and the short URL, or None if it was not shortened
+    """
+    if not data.get('shorten') or not is_shortenable(content):
+        return content, None
+    short_url = shortlinks().short_url(content, shortlink_base_url)
+    return short_url, short_url
+
+
+def build_job_items(data):
+    """
+    Validate the items of a job submission.
+    
+    Args:
+        data: The JSON payload of a job submission, whose ``items`` list holds
+            worker jobs (``command``, ``content`` and CLI-style options)
+        
+    Returns:
+        The items
+    """
+    items = data.get('items')
+    if not isinstance(items, list) or not items:
+        raise ValueError('items must be a non-empty list')
+    if len(items) > max_job_items:
+        raise ValueError(f'At most {max_job_items} items can be submitted in one job')
+    
+    for item in items:
+        if not isinstance(item, dict):
+            raise ValueError('Every item must be a JSON object')
+        # Items may not read files from the server
+        if item.get('logo') or str(item.get('command', '')).replace('_', '-') == 'generate-with-logo':
+            raise ValueError('Logos are not supported in jobs')
+        item.pop('output', None)
+    return items
+
+
+def job_cost(items):
+    """
+    Estimate the cost of rendering every item of a job.
+    
+    Args:
+        items: The validated job items
+        
+    Returns:
+        The summed cost of the items, so a job is charged like the same
+        renders submitted one by one
+    """
+    return sum(
+        estimate_cost(
+            str(item.get('content') or item.get('ssid') or item.get('name') or ''),
+            box_size=int(item.get('box_size') or 10),
+            border=int(item.get('border') if item.get('border') is not None else 4),
+            title=item.get('title')
+        )
+        for item in items
+    )
+
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """Queue a large generation request for the background workers."""
+    try:
+        data = request.json
+        items = build_job_items(data)
+        
+        if not rate_limiter.allow(client_id(), job_cost(items)):
+            return rate_limit_exceeded()
+        
+        max_attempts = data.get('maxAttempts')
+        if max_attempts is not None:
+            max_attempts = min(max(int(max_attempts), 1), 10)
+        
+        job_id = job_queue().submit(items, max_attempts=max_attempts)
+        return jsonify({
+            'success': True,
+            'jobId': job_id,
+            'statusUrl': f'/api/jobs/{job_id}',
+            'resultUrl': f'/api/jobs/{job_id}/result'
+        }), 202
+        
+    except (TypeError, ValueError) as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Report the state and progress of a background job."""
+    status = job_queue().status(job_id)
+    if status is None:
+        return jsonify({
+            'success': False,
+            'error': 'Job not found'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'jobId': status['id'],
+        'status': status['status'],
+        'total': status['total'],
+        'completed': status['completed'],
+        'failedItems': status['failed_items'],
+        'progress': status['progress'],
+        'attempts': status['attempts'],
+        'error': status['error'],
+        'resultUrl': f'/api/jobs/{job_id}/result' if status['status'] == DONE else None
+    })
+
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    """Download the archive of a finished background job."""
+    status = job_queue().status(job_id)
+    if status is None:
+        return jsonify({
+            'success': False,
+            'error': 'Job not found'
+        }), 404
+    
+    if status['status'] != DONE:
+        return jsonify({
+            'success': False,
+            'status': status['status'],
+            'error': status['error'] if status['status'] == FAILED else 'Job has not finished'
+        }), 409
+    
+    return send_file(status['artifact'], mimetype='application/zip', as_attachment=True,
+                     download_name=f'{job_id}.zip')
+
+
+def build_renditions(data):
+    """
+    Build the requested renditions from a request payload.
+    
+    Args:
+        data: The JSON payload of a renditions request, whose ``renditions``
+            list holds ``"png:8"`` style strings or ``{"format", "boxSize"}`` objects
+        
+    Returns:
+        The renditions
+    """
+    specs = data.get('renditions') or []
+    if not isinstance(specs, list) or not specs:
+        raise ValueError('renditions must be a non-empty list')
+    if len(specs) > max_renditions:
+        raise ValueError(f'At most {max_renditions} renditions can be requested at once')
+    
+    renditions = []
+    for spec in specs:
+        if isinstance(spec, dict):
+            box_size = spec.get('boxSize')
+            renditions.append(Rendition(str(spec.get('format', '')), int(box_size) if box_size is not None else None))
+        else:
+            renditions.append(parse_rendition(str(spec)))
+    return renditions
+
+
+@app.route('/api/renditions', methods=['POST'])
+def generate_renditions():
+    """Generate several renditions of a QR code, profiling it when requested."""
+    if profiling_requested():
+        return profiled('renditions', generate_renditions_response)
+    return generate_renditions_response()
+
+
+def generate_renditions_response():
+    """Encode a QR code once and return every requested format and size."""
+    try:
+        data = request.json
+        title = data.get('title', 'QR Code')
+        content, short_url = shorten_content(data, build_qr_content(data))
+        options = build_qr_options(data)
+        options.pop('box_size', None)
+        
+        renditions = build_renditions(data)
+        
+        cost = sum(
+            estimate_cost(
+                content,
+                box_size=rendition.box_size or qr_generator.default_box_size,
+                title=options.get('title'),
+                rasterize=rendition.format != 'svg'
+            )
+            for rendition in renditions
+        )
+        if not rate_limiter.allow(client_id(), cost):
+            return rate_limit_exceeded()
+        
+        with admission.slot(cost):
+            results = render_renditions(qr_generator, content, renditions, **options)
+        
+        # Store every rendition in memory for download
+        sanitized_title = sanitize_filename(title)
+        short_uuid = uuid.uuid4().hex[:8]
+        body = []
+        for rendition, rendition_data in results:
+            box_size = rendition.box_size or qr_generator.default_box_size
+            filename = f"{sanitized_title}_{short_uuid}_{box_size}.{rendition.format}"
+            encoded_string = base64.b64encode(rendition_data).decode('utf-8')
+            qr_codes[filename] = encoded_string
+            body.append({
+                'format': rendition.format,
+                'boxSize': box_size,
+                'mediaType': rendition.media_type,
+                'url': f"data:{rendition.media_type};base64,{encoded_string}",
+                'filename': filename
+            })
+        
+        response = {
+            'success': True,
+            'renditions': body
+        }
+        if short_url:
+            response['shortUrl'] = short_url
+        return jsonify(response)
+        
+    except ImageBudgetError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 413
+        
+    except Overloaded as e:
+        return overloaded(e)
+        
+    except (TypeError, ValueError) as e:
+        # Malformed renditions, or options a format cannot honour
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/shortlinks', methods=['POST'])
+def create_shortlink():
+    """Register a short link to a URL."""
+    try:
+        data = request.json
+        target = data.get('url', '')
+        
+        if not rate_limiter.allow(client_id(), 1):
+            return rate_limit_exceeded()
+        
+        short_url = shortlinks().short_url(target, shortlink_base_url)
+        return jsonify({
+            'success': True,
+            'id': short_url.rsplit('/', 1)[-1],
+            'shortUrl': short_url,
+            'target': target
+        })
+        
+    except (TypeError, ValueError) as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/S/<link_id>', methods=['GET'])
+@app.route('/s/<link_id>', methods=['GET'])
+def follow_shortlink(link_id):
+    """Redirect a short link to its target."""
+    target = shortlinks().resolve(link_id) if shortlink_base_url and DEFAULT_SHORTLINK_DB else None
+    if target is None:
+        return jsonify({
+            'success': False,
+            'error': 'Link not found'
+        }), 404
+    return redirect(target, code=302)
+
+
+@app.route('/api/preview', methods=['POST'])
+def preview_qr():
+    """
+    Render a live preview of a QR code.
+    
+    Intermediate stages are cached, so edits that only change the colors or
+    the title re-run just the affected stages. Previews are not stored for
+    download.
+    """
+    try:
+        data = request.json
+        content = build_qr_content(data)
+        options = build_qr_options(data)
+        
+        matrix_mode = data.get('render') == 'matrix' and 'style' not in options
+        cost = estimate_cost(
+            content,
+            box_size=options['box_size'],
+            title=options.get('title'),
+            rasterize=not matrix_mode
+        )
+        if not rate_limiter.allow(client_id(), cost):
+            return rate_limit_exceeded()
+        
+        if matrix_mode:
+            return jsonify(build_matrix_response(content, options))
+        
+        with admission.slot(cost):
+            png_data = preview_renderer.render_png(content, **options)
+        encoded_string = base64.b64encode(png_data).decode('utf-8')
+        
+        return jsonify({
+            'success': True,
+            'qrCodeUrl': f"data:image/png;base64,{encoded_string}"
         })
         
+    except ImageBudgetError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 413
+        
+    except Overloaded as e:
+        return overloaded(e)
+        
     except Exception as e:
         return jsonify({
             'success': False,
@@ -204,10 +885,29 @@ def generate_qr():
 @app.route('/api/download/<filename>', methods=['GET'])
 def download_qr(filename):
     """Download a generated QR code."""
+    if filename not in qr_codes and filename in pending_renders:
+        # Render codes generated in matrix mode on first download, at the
+        # full raster cost their generate request did not pay
+        spec = pending_renders[filename]
+        cost = raster_cost(spec)
+        if not rate_limiter.allow(client_id(), cost):
+            return rate_limit_exceeded()
+        try:
+            qr_codes[filename] = render_admitted(spec, cost)
+        except Overloaded as e:
+            return overloaded(e)
+        except ImageBudgetError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 413
+        pending_renders.pop(filename, None)
+    
     if filename in qr_codes:
         # Create a response with the image data
         image_data = base64.b64decode(qr_codes[filename])
-        response = Response(image_data, mimetype='image/png')
+        extension = filename.rsplit('.', 1)[-1].lower()
+        response = Response(image_data, mimetype=FORMATS.get(extension, 'image/png'))
         # Extract the original filename from the storage key
         original_filename = filename
         response.headers.set('Content-Disposition', f'attachment; filename="{original_filename}"')
@@ -218,6 +918,19 @@ def download_qr(filename):
             'error': 'File not found'
         }), 404
 
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Report render coalescing, preview cache and admission metrics."""
+    return jsonify({
+        'success': True,
+        'renders': render_flights.stats(),
+        'preview_cache': preview_renderer.stats(),
+        'admission': admission.stats(),
+        'rate_limit': rate_limiter.stats(),
+        'jobs': _job_queue.stats() if _job_queue is not None else None,
+        'shortlinks': _shortlinks.stats() if _shortlinks is not None else None
+    })
+
 # For local development
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
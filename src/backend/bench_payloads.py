@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+"""
+Benchmark of the columnar payload builders against per-row format_* calls.
+
+Builds WiFi, contact, event, geo and email payloads for synthetic rows,
+once with a format_*_data call per row and once with the matching
+format_*_columns builder, and checks that both produce the same payloads.
+Rows reuse a realistic number of distinct dates and subjects.
+
+Exits with status 1 if any payload differs.
+
+Usage:
+    python bench_payloads.py --rows 200000 [--repeat 3]
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from qr_generator.utils import (
+    _iso_to_ics,
+    format_contact_columns,
+    format_contact_data,
+    format_email_columns,
+    format_email_data,
+    format_event_columns,
+    format_event_data,
+    format_geo_columns,
+    format_geo_data,
+    format_wifi_columns,
+    format_wifi_data,
+)
+
+
+def make_columns(rows, seed=0):
+    """Build synthetic columns for every payload type."""
+    rng = random.Random(seed)
+    # Events of an import cluster on a few hundred distinct slots
+    slots = [f"2026-{m:02d}-{d:02d}T{h:02d}:{q:02d}" for m in (5, 6) for d in range(1, 29) for h in (9, 14, 19) for q in (0, 30)]
+    subjects = [f"Order #{n}, ready for pickup" for n in range(50)]
+
+    def maybe(value, p=0.7):
+        return value if rng.random() < p else None
+
+    names = [f"Guest {i}; table {i % 40}" for i in range(rows)]
+    return {
+        "wifi": (
+            format_wifi_data,
+            format_wifi_columns,
+            dict(
+                ssids=[f"Venue-{i % 300}" for i in range(rows)],
+                passwords=[maybe(f"pw:{i};x") for i in range(rows)],
+                securities=[rng.choice(("WPA", "WEP", "nopass")) for _ in range(rows)],
+            ),
+        ),
+        "contact": (
+            format_contact_data,
+            format_contact_columns,
+            dict(
+                names=names,
+                phones=[maybe(f"+1555{i:07d}") for i in range(rows)],
+                emails=[maybe(f"guest{i}@example.com") for i in range(rows)],
+                companies=[maybe("Example, Inc.") for _ in range(rows)],
+                titles=[maybe("Developer") for _ in range(rows)],
+                websites=[maybe("https://example.com") for _ in range(rows)],
+            ),
+        ),
+        "event": (
+            format_event_data,
+            format_event_columns,
+            dict(
+                names=names,
+                starts=[rng.choice(slots) for _ in range(rows)],
+                ends=[maybe(rng.choice(slots)) for _ in range(rows)],
+                locations=[maybe("Hall A, level 2") for _ in range(rows)],
+            ),
+        ),
+        "geo": (
+            format_geo_data,
+            format_geo_columns,
+            dict(
+                latitudes=[f"{rng.uniform(-90, 90):.6f}" for _ in range(rows)],
+                longitudes=[f"{rng.uniform(-180, 180):.6f}" for _ in range(rows)],
+            ),
+        ),
+        "email": (
+            format_email_data,
+            format_email_columns,
+            dict(
+                recipients=[f"guest{i}@example.com" for i in range(rows)],
+                subjects=[maybe(rng.choice(subjects)) for _ in range(rows)],
+                bodies=[maybe(f"Hi guest {i}") for i in range(rows)],
+            ),
+        ),
+    }
+
+
+def per_row(format_row, columns):
+    """Build payloads with one format_*_data call per row."""
+    return [format_row(*row) for row in zip(*columns.values())]
+
+
+def best_of(repeat, build):
+    """Run a build with a cold date cache and return the fastest time and the result."""
+    best, result = None, None
+    for _ in range(repeat):
+        _iso_to_ics.cache_clear()
+        began = time.perf_counter()
+        result = build()
+        elapsed = time.perf_counter() - began
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=200000, help="Rows per payload type")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement; the fastest counts")
+    args = parser.parse_args(argv)
+
+    ok = True
+    print(f"{'payload':<8} {'per-row':>10} {'columnar':>10} {'speedup':>8}")
+    for kind, (format_row, format_columns, columns) in make_columns(args.rows).items():
+        row_time, expected = best_of(args.repeat, lambda: per_row(format_row, columns))
+        column_time, payloads = best_of(args.repeat, lambda: format_columns(**columns))
+        print(f"{kind:<8} {row_time:>9.3f}s {column_time:>9.3f}s {row_time / column_time:>7.2f}x")
+        if payloads != expected:
+            ok = False
+            mismatch = next(i for i, (a, b) in enumerate(zip(payloads, expected)) if a != b)
+            print(f"FAIL: {kind} payload {mismatch} differs: {payloads[mismatch]!r} != {expected[mismatch]!r}")
+
+    print("ok: columnar payloads match per-row payloads" if ok else "FAIL: payloads differ")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+"""
+Benchmark of the pooled render path against fresh allocations per render.
+
+Renders a mix of plain, colored and titled codes to base64 PNG data, as the
+generate endpoint does, once allocating a new image, canvas and stream per
+render and once through the thread's scratch buffers and reusable encode
+stream. Each path runs in its own process, so peak RSS and page faults are
+measured cleanly, and both must produce the same data.
+
+Exits with status 1 if the paths produce different data.
+
+Usage:
+    python bench_render.py --renders 2000 [--encoder numpy]
+"""
+
+import argparse
+import base64
+import gc
+import hashlib
+import io
+import json
+import resource
+import subprocess
+import sys
+import time
+
+from qr_generator import QRGenerator
+
+CASES = [
+    dict(content="https://example.com"),
+    dict(content="https://example.com/menu", fg_color="#1a237e", bg_color="#fffde7"),
+    dict(content="WIFI:S:Office;T:WPA;P:secret;;", title="WiFi: Office"),
+    dict(content="Hello World", box_size=10, border=2),
+    dict(content="x" * 300, error_correction=3),
+    dict(content="mailto:team@example.com", title="Mail", version=5),
+]
+
+
+def fresh(generator, case):
+    """Render to base64 with a new image, canvas and stream."""
+    buffer = io.BytesIO()
+    generator.render(**case).save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def pooled(generator, case):
+    """Render to base64 through the scratch buffers and the reusable stream."""
+    img = generator.render(reuse_buffer=True, **case)
+    with generator.encode_image(img, "PNG") as png_data:
+        return base64.b64encode(png_data).decode("ascii")
+
+
+def measure(path, renders, encoder):
+    """Run one path in this process and report time, memory, page faults, GC runs and a digest."""
+    render = {"fresh": fresh, "pooled": pooled}[path]
+    generator = QRGenerator(encoder=encoder)
+    # Warm caches and title templates, which both paths share
+    for case in CASES:
+        render(generator, case)
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    collections = sum(stats["collections"] for stats in gc.get_stats())
+    digest = hashlib.sha256()
+    began = time.perf_counter()
+    for i in range(renders):
+        digest.update(render(generator, CASES[i % len(CASES)]).encode("ascii"))
+    elapsed = time.perf_counter() - began
+    after = resource.getrusage(resource.RUSAGE_SELF)
+    return {
+        "seconds": elapsed,
+        "peak_rss_kib": after.ru_maxrss,
+        "rss_growth_kib": after.ru_maxrss - usage.ru_maxrss,
+        # Every fresh large image is mapped and zeroed by the kernel anew
+        "page_faults": after.ru_minflt - usage.ru_minflt,
+        "gc_collections": sum(stats["collections"] for stats in gc.get_stats()) - collections,
+        "allocations": generator.buffer_allocations,
+        "digest": digest.hexdigest(),
+    }
+
+
+def run_child(path, renders, encoder):
+    """Measure one path in a fresh interpreter."""
+    command = [sys.executable, __file__, "--child", path, "--renders", str(renders)]
+    if encoder:
+        command += ["--encoder", encoder]
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--renders", type=int, default=2000, help="Renders per path")
+    parser.add_argument("--encoder", choices=["qrcode", "numpy"], help="Matrix encoder backend")
+    parser.add_argument("--child", choices=["fresh", "pooled"], help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(measure(args.child, args.renders, args.encoder)))
+        return 0
+
+    results = {path: run_child(path, args.renders, args.encoder) for path in ("fresh", "pooled")}
+    print(
+        f"{'path':<8} {'ms/render':>10} {'peak RSS':>10} {'RSS growth':>11} "
+        f"{'faults/render':>14} {'GC runs':>8} {'scratch':>8}"
+    )
+    for path, result in results.items():
+        print(
+            f"{path:<8} {result['seconds'] * 1000 / args.renders:>10.3f} "
+            f"{result['peak_rss_kib'] / 1024:>8.1f}MB {result['rss_growth_kib'] / 1024:>9.1f}MB "
+            f"{result['page_faults'] / args.renders:>14.1f} {result['gc_collections']:>8} {result['allocations']:>8}"
+        )
+
+    if results["fresh"]["digest"] != results["pooled"]["digest"]:
+        print("FAIL: pooled renders differ from fresh renders")
+        return 1
+    print(f"ok: {args.renders} pooled renders match fresh renders")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,9 +5,13 @@ QR Code Generator CLI.
 A command-line interface for generating QR codes from various input types.
 """
 
+import functools
+import json
 import os
 import sys
+import time
 import click
+from PIL import Image
 from typing import Optional, Tuple
 
 from qr_generator import QRGenerator
@@ -16,23 +20,114 @@ from qr_generator.utils import (
     format_wifi_data,
     format_contact_data,
 )
+from qr_generator.batch import SHARD_STRATEGIES, parse_shard, read_manifest, run_batch
+from qr_generator.build import IncrementalBuilder
+from qr_generator.dedup import LINK_MODES
+from qr_generator.imposition import PAGE_SIZES, SheetSpec, impose_pdf
+from qr_generator.jobs import DEFAULT_ARTIFACT_DIR, DEFAULT_JOB_DB, DEFAULT_RETENTION, JobQueue, run_worker, start_workers
+from qr_generator.occlusion import LEVELS_BY_NAME
+from qr_generator.planner import DEFAULT_MAX_BYTES, DEFAULT_MAX_PIXELS, MAX_BOX_SIZE, PixelBudget
+from qr_generator.renditions import FORMATS as RENDITION_FORMATS, Rendition, parse_rendition, render_renditions
+from qr_generator.shortlinks import ShortLinkRegistry
+from qr_generator.sprites import LAYOUTS, SpriteSheetWriter
+from qr_generator.structured_append import DEFAULT_MAX_VERSION, MAX_PARTS, generate_structured_append
+from qr_generator.styles import EYE_STYLES, GRADIENT_TYPES, MODULE_STYLES, style_from_options
+from qr_generator.worker import serve_stream, serve_unix_socket
 
 
 @click.group()
-def cli():
+@click.option("--encoder", type=click.Choice(["qrcode", "numpy"]), envvar="QR_ENCODER",
+              help="Matrix encoder backend (default: qrcode)")
+@click.option("--max-pixels", type=click.IntRange(1), default=DEFAULT_MAX_PIXELS, show_default=True,
+              envvar="QR_MAX_PIXELS", help="Largest image to render, in pixels (env QR_MAX_PIXELS)")
+@click.option("--max-bytes", type=click.IntRange(1), default=DEFAULT_MAX_BYTES, show_default=True,
+              envvar="QR_MAX_BYTES", help="Largest estimated image memory per render, in bytes (env QR_MAX_BYTES)")
+@click.option("--downscale", is_flag=True, envvar="QR_DOWNSCALE",
+              help="Shrink the box size of oversized codes instead of failing")
+@click.pass_context
+def cli(
+    ctx,
+    encoder: Optional[str] = None,
+    max_pixels: int = DEFAULT_MAX_PIXELS,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    downscale: bool = False,
+):
     """QR Code Generator CLI."""
-    pass
+    ctx.obj = {
+        "encoder": encoder,
+        "budget": PixelBudget(max_pixels=max_pixels, max_bytes=max_bytes, downscale=downscale),
+    }
+
+
+def make_generator() -> QRGenerator:
+    """Create a QR generator using the encoder and budget selected on the command line."""
+    obj = click.get_current_context().obj or {}
+    return QRGenerator(encoder=obj.get("encoder"), budget=obj.get("budget"))
+
+
+def profile_option(command):
+    """
+    Add a --profile option to a command.
+
+    Without the option the command runs unwrapped; the profiler is only
+    imported and started when a profile directory is given.
+    """
+    @click.option("--profile", "profile_dir", type=click.Path(file_okay=False),
+                  help="Profile this command, writing pstats, collapsed stacks and a summary to this directory")
+    @functools.wraps(command)
+    def wrapper(*args, profile_dir: Optional[str] = None, **kwargs):
+        if profile_dir is None:
+            return command(*args, **kwargs)
+
+        from qr_generator.profiling import Profiler, format_summary
+
+        name = f"{click.get_current_context().info_name}-{time.strftime('%Y%m%d-%H%M%S')}"
+        profiler = Profiler(profile_dir, name=name)
+        try:
+            with profiler:
+                return command(*args, **kwargs)
+        finally:
+            # Commands exit through sys.exit on errors, so report in any case
+            if profiler.summary is not None:
+                click.echo(format_summary(profiler.summary), err=True)
+
+    return wrapper
+
+
+def link_option(command):
+    """Add a --link option choosing how outputs that duplicate an earlier code are written."""
+    return click.option(
+        "--link", type=click.Choice(LINK_MODES + ("none",)), default="hardlink", show_default=True,
+        help="Write outputs of a code already rendered as links or copies of it; none renders every output",
+    )(command)
 
 
 @cli.command()
+@profile_option
 @click.option("--content", required=True, help="Content to encode in the QR code")
 @click.option("--output", required=True, help="Output file path")
 @click.option("--title", help="Title to display above the QR code")
 @click.option("--version", type=int, help="QR code version (1-40)")
-@click.option("--box-size", type=int, help="Size of each box in pixels")
+@click.option("--box-size", type=click.IntRange(1, MAX_BOX_SIZE), help="Size of each box in pixels")
 @click.option("--border", type=int, help="Border size in boxes")
 @click.option("--fg-color", help="Foreground color (color of the QR code)")
 @click.option("--bg-color", help="Background color")
+@click.option("--mask-pattern", type=click.IntRange(0, 7), help="Mask pattern (0-7); skips the mask search")
+@click.option("--target-width", type=click.IntRange(1), help="Width of the QR code in pixels; picks the box size")
+@click.option("--module-style", type=click.Choice(MODULE_STYLES), help="Shape of the modules")
+@click.option("--eye-style", type=click.Choice(EYE_STYLES), help="Shape of the three corner eyes")
+@click.option("--eye-color", help="Color of the corner eyes")
+@click.option("--gradient", help="Gradient fill as START,END colors, replacing the foreground color")
+@click.option("--gradient-type", type=click.Choice(GRADIENT_TYPES), default="linear", help="Gradient type")
+@click.option("--gradient-angle", type=float, default=0.0, help="Direction of a linear gradient in degrees")
+@click.option("--rendition", "renditions", multiple=True,
+              help="Also write FORMAT[:BOX_SIZE] (png, webp or svg) from the same encode; repeatable. "
+                   "Files are named after --output, e.g. qr-8.png, which must then be a png, webp or svg file")
+@click.option("--shorten", is_flag=True, help="Encode a short link to the URL instead of the URL itself")
+@click.option("--short-base-url", envvar="SHORTLINK_BASE_URL",
+              help="Scheme and host serving the short links (env SHORTLINK_BASE_URL)")
+@click.option("--shortlink-db", envvar="SHORTLINK_DB_PATH",
+              help="Persistent short-link database (env SHORTLINK_DB_PATH)")
 def generate(
     content: str,
     output: str,
@@ -42,10 +137,51 @@ def generate(
     border: Optional[int] = None,
     fg_color: Optional[str] = None,
     bg_color: Optional[str] = None,
+    mask_pattern: Optional[int] = None,
+    target_width: Optional[int] = None,
+    module_style: Optional[str] = None,
+    eye_style: Optional[str] = None,
+    eye_color: Optional[str] = None,
+    gradient: Optional[str] = None,
+    gradient_type: str = "linear",
+    gradient_angle: float = 0.0,
+    renditions: Tuple[str, ...] = (),
+    shorten: bool = False,
+    short_base_url: Optional[str] = None,
+    shortlink_db: Optional[str] = None,
 ):
     """Generate a QR code from the given content."""
     try:
-        qr = QRGenerator()
+        if shorten:
+            if not short_base_url or not shortlink_db:
+                raise ValueError(
+                    "--shorten needs --short-base-url (or SHORTLINK_BASE_URL) "
+                    "and --shortlink-db (or SHORTLINK_DB_PATH)"
+                )
+            content = ShortLinkRegistry(shortlink_db).short_url(content, short_base_url)
+            click.echo(f"Short link: {content}")
+
+        qr = make_generator()
+        style = style_from_options(module_style, eye_style, gradient, gradient_type, gradient_angle, eye_color)
+        if renditions:
+            if target_width is not None:
+                raise ValueError("--target-width cannot be combined with --rendition")
+            write_renditions(
+                qr,
+                content,
+                output,
+                [parse_rendition(spec) for spec in renditions],
+                box_size=box_size,
+                title=title,
+                version=version,
+                border=border,
+                fg_color=fg_color,
+                bg_color=bg_color,
+                mask_pattern=mask_pattern,
+                style=style,
+            )
+            return
+
         output_path = qr.generate(
             content=content,
             output_path=output,
@@ -55,6 +191,9 @@ def generate(
             border=border,
             fg_color=fg_color,
             bg_color=bg_color,
+            mask_pattern=mask_pattern,
+            target_width=target_width,
+            style=style,
         )
         click.echo(f"QR code generated successfully: {output_path}")
         
@@ -67,17 +206,47 @@ def generate(
         sys.exit(1)
 
 
+def write_renditions(
+    qr: QRGenerator, content: str, output: str, renditions, box_size: Optional[int] = None, **options
+) -> None:
+    """Render the output and every rendition from one encode, writing the renditions next to the output path."""
+    stem, extension = os.path.splitext(output)
+    format = extension[1:].lower() or "png"
+    if format not in RENDITION_FORMATS:
+        raise ValueError(
+            f"--output must be a .png, .webp or .svg file when combined with --rendition, not {output}"
+        )
+    directory = os.path.dirname(os.path.abspath(output))
+    os.makedirs(directory, exist_ok=True)
+
+    primary = Rendition(format, box_size)
+    for rendition, data in render_renditions(qr, content, [primary, *renditions], **options):
+        if rendition is primary:
+            path = output
+        else:
+            path = f"{stem}-{rendition.box_size or qr.default_box_size}.{rendition.format}"
+        with open(path, "wb") as f:
+            f.write(data)
+        click.echo(f"QR code generated successfully: {path}")
+
+    click.echo(f"Content type detected: {detect_content_type(content)}")
+
+
 @cli.command()
+@profile_option
 @click.option("--content", required=True, help="Content to encode in the QR code")
 @click.option("--output", required=True, help="Output file path")
 @click.option("--logo", required=True, help="Logo image path")
 @click.option("--title", help="Title to display above the QR code")
 @click.option("--logo-size", type=float, default=0.2, help="Logo size as a fraction of QR code size (0.0-1.0)")
 @click.option("--version", type=int, help="QR code version (1-40)")
-@click.option("--box-size", type=int, help="Size of each box in pixels")
+@click.option("--box-size", type=click.IntRange(1, MAX_BOX_SIZE), help="Size of each box in pixels")
 @click.option("--border", type=int, help="Border size in boxes")
 @click.option("--fg-color", help="Foreground color (color of the QR code)")
 @click.option("--bg-color", help="Background color")
+@click.option("--target-width", type=click.IntRange(1), help="Width of the QR code in pixels; picks the box size")
+@click.option("--error-correction", type=click.Choice(list(LEVELS_BY_NAME)),
+              help="Error correction level; by default the lowest level the logo leaves decodable")
 def generate_with_logo(
     content: str,
     output: str,
@@ -89,10 +258,26 @@ def generate_with_logo(
     border: Optional[int] = None,
     fg_color: Optional[str] = None,
     bg_color: Optional[str] = None,
+    target_width: Optional[int] = None,
+    error_correction: Optional[str] = None,
 ):
     """Generate a QR code with a logo in the center."""
     try:
-        qr = QRGenerator()
+        qr = make_generator()
+        with Image.open(logo) as logo_img:
+            report = qr.plan_logo(
+                content,
+                logo_img,
+                logo_size,
+                version=version,
+                error_correction=LEVELS_BY_NAME.get(error_correction),
+                box_size=box_size,
+                border=border,
+                target_width=target_width,
+                fg_color=fg_color,
+                bg_color=bg_color,
+                title=title,
+            )
         output_path = qr.generate_with_logo(
             content=content,
             output_path=output,
@@ -104,8 +289,16 @@ def generate_with_logo(
             border=border,
             fg_color=fg_color,
             bg_color=bg_color,
+            target_width=target_width,
+            error_correction=report.error_correction,
+            report=report,
         )
         click.echo(f"QR code with logo generated successfully: {output_path}")
+        click.echo(
+            f"Error correction: {report.level_name} (version {report.version}), "
+            f"logo covers {report.covered_modules} modules, "
+            f"{report.usage:.0%} of the correction capacity"
+        )
         
         # Detect and display content type
         content_type = detect_content_type(content)
@@ -116,7 +309,69 @@ def generate_with_logo(
         sys.exit(1)
 
 
+@cli.command("structured-append")
+@profile_option
+@click.option("--content", help="Content to encode")
+@click.option("--input", "input_file", type=click.File("r", encoding="utf-8"),
+              help="File holding the content to encode ('-' for stdin)")
+@click.option("--output", required=True,
+              help="Output file path; separate codes are named after it, e.g. doc-2-of-5.png")
+@click.option("--sheet", is_flag=True, help="Tile the codes into one image instead of one file per code")
+@click.option("--columns", type=click.IntRange(1, MAX_PARTS), help="Codes per row of the sheet")
+@click.option("--max-version", type=click.IntRange(1, 40), default=DEFAULT_MAX_VERSION, show_default=True,
+              help="Largest version of each code")
+@click.option("--error-correction", type=click.Choice(list(LEVELS_BY_NAME)), default="M", show_default=True,
+              help="Error correction level")
+@click.option("--title", help="Title to display above every code, numbered")
+@click.option("--box-size", type=click.IntRange(1, MAX_BOX_SIZE), help="Size of each box in pixels")
+@click.option("--border", type=click.IntRange(0), help="Border size in boxes")
+@click.option("--fg-color", help="Foreground color (color of the QR code)")
+@click.option("--bg-color", help="Background color")
+def structured_append(
+    output: str,
+    content: Optional[str] = None,
+    input_file=None,
+    sheet: bool = False,
+    columns: Optional[int] = None,
+    max_version: int = DEFAULT_MAX_VERSION,
+    error_correction: str = "M",
+    title: Optional[str] = None,
+    box_size: Optional[int] = None,
+    border: Optional[int] = None,
+    fg_color: Optional[str] = None,
+    bg_color: Optional[str] = None,
+):
+    """Split content too large for one QR code across up to 16 linked codes."""
+    try:
+        if (content is None) == (input_file is None):
+            raise ValueError("Give exactly one of --content and --input")
+        if input_file is not None:
+            content = input_file.read()
+
+        paths = generate_structured_append(
+            make_generator(),
+            content,
+            output,
+            sheet=sheet,
+            columns=columns,
+            error_correction=LEVELS_BY_NAME[error_correction],
+            max_version=max_version,
+            box_size=box_size,
+            border=border,
+            fg_color=fg_color,
+            bg_color=bg_color,
+            title=title,
+        )
+        for path in paths:
+            click.echo(f"QR code generated successfully: {path}")
+
+    except Exception as e:
+        click.echo(f"Error generating linked QR codes: {str(e)}", err=True)
+        sys.exit(1)
+
+
 @cli.command()
+@profile_option
 @click.option("--ssid", required=True, help="WiFi network name")
 @click.option("--password", help="WiFi password")
 @click.option("--security", type=click.Choice(["WPA", "WEP", "nopass"]), default="WPA", help="Security type")
@@ -124,7 +379,7 @@ def generate_with_logo(
 @click.option("--title", help="Title to display above the QR code")
 @click.option("--logo", help="Logo image path (optional)")
 @click.option("--version", type=int, help="QR code version (1-40)")
-@click.option("--box-size", type=int, help="Size of each box in pixels")
+@click.option("--box-size", type=click.IntRange(1, MAX_BOX_SIZE), help="Size of each box in pixels")
 def wifi(
     ssid: str,
     password: Optional[str],
@@ -140,7 +395,7 @@ def wifi(
         # Format WiFi data
         wifi_data = format_wifi_data(ssid, password, security)
         
-        qr = QRGenerator()
+        qr = make_generator()
         
         if logo:
             output_path = qr.generate_with_logo(
@@ -168,6 +423,7 @@ def wifi(
 
 
 @cli.command()
+@profile_option
 @click.option("--name", required=True, help="Contact name")
 @click.option("--phone", help="Phone number")
 @click.option("--email", help="Email address")
@@ -178,7 +434,7 @@ def wifi(
 @click.option("--qr-title", help="Title to display above the QR code")
 @click.option("--logo", help="Logo image path (optional)")
 @click.option("--version", type=int, help="QR code version (1-40)")
-@click.option("--box-size", type=int, help="Size of each box in pixels")
+@click.option("--box-size", type=click.IntRange(1, MAX_BOX_SIZE), help="Size of each box in pixels")
 def contact(
     name: str,
     phone: Optional[str],
@@ -204,7 +460,7 @@ def contact(
             website=website,
         )
         
-        qr = QRGenerator()
+        qr = make_generator()
         
         if logo:
             output_path = qr.generate_with_logo(
@@ -231,5 +487,223 @@ def contact(
         sys.exit(1)
 
 
+@cli.command()
+@profile_option
+@click.option("--input", "input_file", required=True, type=click.File("r"), help="File with one content per line ('-' for stdin)")
+@click.option("--output-dir", required=True, help="Directory for the sheets and their index")
+@click.option("--layout", type=click.Choice(sorted(LAYOUTS)), default="a4", help="Sheet layout")
+@click.option("--prefix", default="sheet", help="File name prefix of the sheets")
+@click.option("--version", type=int, help="QR code version (1-40)")
+@click.option("--box-size", type=click.IntRange(1, MAX_BOX_SIZE),
+              help="Size of each box in pixels (defaults to filling the cell)")
+@click.option("--border", type=int, help="Border size in boxes")
+@click.option("--fg-color", default="black", help="Foreground color (color of the QR code)")
+@click.option("--bg-color", default="white", help="Background color")
+def sprite_sheet(
+    input_file,
+    output_dir: str,
+    layout: str,
+    prefix: str,
+    version: Optional[int] = None,
+    box_size: Optional[int] = None,
+    border: Optional[int] = None,
+    fg_color: str = "black",
+    bg_color: str = "white",
+):
+    """Pack many QR codes into sheet images with a JSON index of tiles."""
+    try:
+        mode = "L" if fg_color in ("black", "white") and bg_color in ("black", "white") else "RGB"
+        with SpriteSheetWriter(output_dir, layout, prefix, fg_color, bg_color, mode, make_generator()) as writer:
+            count = 0
+            for line in input_file:
+                content = line.rstrip("\n")
+                if not content:
+                    continue
+                writer.add(content, version=version, border=border, box_size=box_size)
+                count += 1
+        click.echo(f"{count} QR codes written to sheets in {output_dir}")
+
+    except Exception as e:
+        click.echo(f"Error generating sprite sheets: {str(e)}", err=True)
+        sys.exit(1)
+
+
+@cli.command()
+@profile_option
+@click.option("--input", "input_file", required=True, type=click.File("r"),
+              help="Jobs file: JSON lines with content/title, or one content per line ('-' for stdin)")
+@click.option("--output", required=True, help="Output PDF path")
+@click.option("--rows", type=int, required=True, help="Label rows per page")
+@click.option("--columns", type=int, required=True, help="Label columns per page")
+@click.option("--page-size", type=click.Choice(sorted(PAGE_SIZES)), default="a4", help="Page size")
+@click.option("--margin", type=float, default=10.0, help="Page margin in mm")
+@click.option("--gap", type=float, default=0.0, help="Space between labels in mm")
+@click.option("--bleed", type=float, default=0.0, help="Bleed in mm")
+@click.option("--title", help="Title printed on every label without its own title")
+@click.option("--label-color", help="Background color of each label")
+def impose(
+    input_file,
+    output: str,
+    rows: int,
+    columns: int,
+    page_size: str,
+    margin: float,
+    gap: float,
+    bleed: float,
+    title: Optional[str] = None,
+    label_color: Optional[str] = None,
+):
+    """Lay out QR code labels on sheets and write a multi-page PDF."""
+
+    def jobs():
+        for line in input_file:
+            line = line.strip()
+            if not line:
+                continue
+            job = json.loads(line) if line.startswith("{") else {"content": line}
+            if title and not job.get("title"):
+                job["title"] = title
+            yield job
+
+    try:
+        sheet = SheetSpec(rows, columns, page_size, margin=margin, gap=gap, bleed=bleed, label_color=label_color)
+        count = impose_pdf(jobs(), output, sheet, make_generator())
+        click.echo(f"{count} labels imposed successfully: {output}")
+
+    except Exception as e:
+        click.echo(f"Error imposing labels: {str(e)}", err=True)
+        sys.exit(1)
+
+
+@cli.command()
+@profile_option
+@click.option("--manifest", "manifest_file", required=True, type=click.File("r"),
+              help="Manifest: JSON lines of worker jobs (with an optional output name), or one content per line")
+@click.option("--output-dir", required=True, help="Directory for the outputs and the shard's journal")
+@click.option("--shard", default="1/1", show_default=True, help="Shard of the manifest to run, as K/N")
+@click.option("--shard-by", type=click.Choice(SHARD_STRATEGIES), default="index", show_default=True,
+              help="Assign items to shards by manifest position or by item hash")
+@click.option("--retry-failed", is_flag=True, help="Run items again whose last attempt failed")
+@link_option
+def batch(
+    manifest_file,
+    output_dir: str,
+    shard: str = "1/1",
+    shard_by: str = "index",
+    retry_failed: bool = False,
+    link: str = "hardlink",
+):
+    """Generate a shard of a manifest, resuming from its journal."""
+    try:
+        shard_number, shard_count = parse_shard(shard)
+        report = run_batch(
+            read_manifest(manifest_file),
+            output_dir,
+            make_generator(),
+            shard=shard_number,
+            shards=shard_count,
+            strategy=shard_by,
+            retry_failed=retry_failed,
+            link=None if link == "none" else link,
+        )
+        click.echo(
+            f"Shard {shard}: {report.generated} generated ({report.linked} linked duplicates, "
+            f"dedup ratio {report.dedup_ratio:.2f}), {report.skipped} already done, "
+            f"{report.failed} failed of {report.total} items"
+        )
+        if report.failed:
+            sys.exit(1)
+
+    except Exception as e:
+        click.echo(f"Error running batch: {str(e)}", err=True)
+        sys.exit(1)
+
+
+@cli.command()
+@profile_option
+@click.option("--source", required=True, type=click.Path(exists=True, dir_okay=False),
+              help="CSV with a header of job keys (content, name, title, ...), or a JSON lines manifest")
+@click.option("--output-dir", required=True, help="Directory for the outputs and the build manifest")
+@click.option("--watch", is_flag=True, help="Keep running and rebuild when the source or a logo changes")
+@click.option("--interval", type=float, default=1.0, show_default=True, help="Seconds between checks in watch mode")
+@link_option
+def build(source: str, output_dir: str, watch: bool = False, interval: float = 1.0, link: str = "hardlink"):
+    """Regenerate only the codes whose inputs changed, and remove orphaned outputs."""
+
+    def report_build(report):
+        click.echo(
+            f"{report.built} built ({report.linked} linked duplicates, dedup ratio {report.dedup_ratio:.2f}), "
+            f"{report.unchanged} unchanged, {report.removed} removed, "
+            f"{len(report.failed)} failed of {report.total} codes"
+        )
+        for name, error in report.failed:
+            click.echo(f"Error generating {name}: {error}", err=True)
+
+    try:
+        builder = IncrementalBuilder(output_dir, make_generator(), None if link == "none" else link)
+        if watch:
+            click.echo(f"Watching {source}", err=True)
+            try:
+                builder.watch(source, report_build, interval=interval)
+            except KeyboardInterrupt:
+                pass
+            return
+
+        report = builder.build(source)
+        report_build(report)
+        if report.failed:
+            sys.exit(1)
+
+    except Exception as e:
+        click.echo(f"Error building QR codes: {str(e)}", err=True)
+        sys.exit(1)
+
+
+@cli.command()
+@profile_option
+@click.option("--socket", "socket_path", help="Listen on this Unix socket instead of stdin/stdout")
+def serve(socket_path: Optional[str] = None):
+    """Run a persistent worker answering newline-delimited JSON jobs."""
+    qr = make_generator()
+
+    if socket_path:
+        click.echo(f"QR worker listening on {socket_path}", err=True)
+        try:
+            serve_unix_socket(qr, socket_path)
+        except KeyboardInterrupt:
+            pass
+    else:
+        serve_stream(qr, sys.stdin, sys.stdout)
+
+
+@cli.command("job-worker")
+@profile_option
+@click.option("--db", "db_path", default=DEFAULT_JOB_DB, show_default=True, help="Job queue database (env JOB_DB_PATH)")
+@click.option("--artifacts", "artifact_dir", default=DEFAULT_ARTIFACT_DIR, show_default=True,
+              help="Directory for job outputs and archives (env JOB_ARTIFACT_DIR)")
+@click.option("--processes", type=click.IntRange(1), default=1, show_default=True, help="Number of worker processes")
+@click.option("--once", is_flag=True, help="Exit when the queue is empty (single process only)")
+@click.option("--retention", type=click.FloatRange(min=0), default=DEFAULT_RETENTION, show_default=True,
+              help="Seconds finished jobs and their artifacts are kept (env JOB_RETENTION_SECONDS)")
+def job_worker(db_path: str, artifact_dir: str, processes: int = 1, once: bool = False,
+               retention: float = DEFAULT_RETENTION):
+    """Run background job workers for jobs submitted to /api/jobs."""
+    if once and processes > 1:
+        raise click.UsageError("--once runs a single worker and cannot be combined with --processes")
+    obj = click.get_current_context().obj or {}
+    try:
+        if processes == 1:
+            count = run_worker(JobQueue(db_path), artifact_dir, make_generator(), once=once, retention=retention)
+            click.echo(f"{count} jobs processed", err=True)
+            return
+
+        click.echo(f"Starting {processes} job workers on {db_path}", err=True)
+        for process in start_workers(db_path, artifact_dir, processes, obj.get("encoder"), obj.get("budget"),
+                                     retention=retention):
+            process.join()
+    except KeyboardInterrupt:
+        pass
+
+
 if __name__ == "__main__":
     cli()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+"""
+Thin client for the persistent QR worker.
+
+Accepts the same commands and options as main.py, but forwards each job to a
+running ``main.py serve --socket`` worker. Only the standard library is
+imported, so each invocation skips loading click, qrcode and PIL. When no
+worker is reachable the job is run in-process through main.py instead; once
+a job has reached a worker it is never run again in-process, unless the
+worker replied that it does not support the job.
+
+Commands and options this client does not mirror are passed to main.py
+in-process, so options added to main.py keep working without a client change.
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+
+
+DEFAULT_SOCKET = os.environ.get("QR_WORKER_SOCKET", "/tmp/qr-generator.sock")
+
+SUCCESS_MESSAGES = {
+    "generate": "QR code generated successfully",
+    "generate-with-logo": "QR code with logo generated successfully",
+    "wifi": "WiFi QR code generated successfully",
+    "contact": "Contact QR code generated successfully",
+}
+
+
+def build_parser():
+    """Build an argument parser mirroring the main.py commands."""
+    parser = argparse.ArgumentParser(description="QR Code Generator worker client.")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help="Worker Unix socket path")
+    # Also accept --socket after the command, without overriding an earlier one
+    socket_option = argparse.ArgumentParser(add_help=False)
+    socket_option.add_argument("--socket", default=argparse.SUPPRESS, help="Worker Unix socket path")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_qr_options(command, colors=True):
+        command.add_argument("--version", type=int, help="QR code version (1-40)")
+        command.add_argument("--box-size", type=int, help="Size of each box in pixels")
+        if colors:
+            command.add_argument("--border", type=int, help="Border size in boxes")
+            command.add_argument("--fg-color", help="Foreground color (color of the QR code)")
+            command.add_argument("--bg-color", help="Background color")
+            command.add_argument("--target-width", type=int, help="Width of the QR code in pixels; picks the box size")
+
+    generate = commands.add_parser("generate", parents=[socket_option])
+    generate.add_argument("--content", required=True, help="Content to encode in the QR code")
+    generate.add_argument("--output", required=True, help="Output file path")
+    generate.add_argument("--title", help="Title to display above the QR code")
+    add_qr_options(generate)
+    generate.add_argument("--mask-pattern", type=int, choices=range(8), help="Mask pattern (0-7)")
+    generate.add_argument("--module-style", choices=["square", "gapped", "dot", "rounded"], help="Shape of the modules")
+    generate.add_argument("--eye-style", choices=["square", "rounded", "circle"], help="Shape of the three corner eyes")
+    generate.add_argument("--eye-color", help="Color of the corner eyes")
+    generate.add_argument("--gradient", help="Gradient fill as START,END colors, replacing the foreground color")
+    generate.add_argument("--gradient-type", choices=["linear", "radial"], help="Gradient type")
+    generate.add_argument("--gradient-angle", type=float, help="Direction of a linear gradient in degrees")
+
+    with_logo = commands.add_parser("generate-with-logo", parents=[socket_option])
+    with_logo.add_argument("--content", required=True, help="Content to encode in the QR code")
+    with_logo.add_argument("--output", required=True, help="Output file path")
+    with_logo.add_argument("--logo", required=True, help="Logo image path")
+    with_logo.add_argument("--title", help="Title to display above the QR code")
+    with_logo.add_argument("--logo-size", type=float, default=0.2, help="Logo size as a fraction of QR code size")
+    add_qr_options(with_logo)
+    with_logo.add_argument("--error-correction", choices=["L", "M", "Q", "H"], help="Error correction level")
+
+    wifi = commands.add_parser("wifi", parents=[socket_option])
+    wifi.add_argument("--ssid", required=True, help="WiFi network name")
+    wifi.add_argument("--password", help="WiFi password")
+    wifi.add_argument("--security", choices=["WPA", "WEP", "nopass"], default="WPA", help="Security type")
+    wifi.add_argument("--output", required=True, help="Output file path")
+    wifi.add_argument("--title", help="Title to display above the QR code")
+    wifi.add_argument("--logo", help="Logo image path (optional)")
+    add_qr_options(wifi, colors=False)
+
+    contact = commands.add_parser("contact", parents=[socket_option])
+    contact.add_argument("--name", required=True, help="Contact name")
+    contact.add_argument("--phone", help="Phone number")
+    contact.add_argument("--email", help="Email address")
+    contact.add_argument("--company", help="Company name")
+    contact.add_argument("--job-title", help="Job title")
+    contact.add_argument("--website", help="Website URL")
+    contact.add_argument("--output", required=True, help="Output file path")
+    contact.add_argument("--qr-title", help="Title to display above the QR code")
+    contact.add_argument("--logo", help="Logo image path (optional)")
+    add_qr_options(contact, colors=False)
+
+    return parser
+
+
+class WorkerUnavailable(ConnectionError):
+    """No worker accepted the connection, so the job was not sent."""
+
+
+def send_job(socket_path, job):
+    """
+    Send one job to the worker and wait for its reply.
+
+    Args:
+        socket_path: Path of the worker's Unix socket
+        job: The job description
+
+    Returns:
+        The decoded reply
+
+    Raises:
+        WorkerUnavailable: If no worker listens on the socket
+        ConnectionError: If the worker failed after the job was sent
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        try:
+            conn.connect(socket_path)
+        except OSError as e:
+            raise WorkerUnavailable(f"No worker at {socket_path}: {e}") from e
+        conn.sendall(json.dumps(job).encode("utf-8") + b"\n")
+        conn.shutdown(socket.SHUT_WR)
+        with conn.makefile("r", encoding="utf-8") as reader:
+            line = reader.readline()
+
+    if not line:
+        raise ConnectionError("Worker closed the connection without replying")
+    return json.loads(line)
+
+
+def strip_socket_option(argv):
+    """Remove the client's --socket option, in either --socket PATH or --socket=PATH form."""
+    stripped = []
+    skip = False
+    for arg in argv:
+        if skip:
+            skip = False
+        elif arg == "--socket":
+            skip = True
+        elif not arg.startswith("--socket="):
+            stripped.append(arg)
+    return stripped
+
+
+def run_in_process(argv):
+    """Run a command through main.py in this process."""
+    from main import cli
+    cli(strip_socket_option(argv))
+
+
+def main(argv=None):
+    """Parse arguments, forward the job and report the result like main.py."""
+    argv = sys.argv[1:] if argv is None else argv
+    command_argv = strip_socket_option(argv)
+    if not command_argv or command_argv[0] not in SUCCESS_MESSAGES:
+        # Global options, help and commands the worker does not run
+        run_in_process(argv)
+        return
+    args, unknown = build_parser().parse_known_args(argv)
+    if unknown:
+        # Options main.py has but this client does not mirror
+        run_in_process(argv)
+        return
+
+    job = {key: value for key, value in vars(args).items() if key != "socket" and value is not None}
+    # Ask the worker to refuse options it does not know instead of ignoring them
+    job["strict"] = True
+    # The worker runs in its own directory, so paths are resolved here
+    for key in ("output", "logo"):
+        if key in job:
+            job[key] = os.path.abspath(job[key])
+
+    try:
+        reply = send_job(args.socket, job)
+    except WorkerUnavailable:
+        # No worker available: run the command in-process instead
+        run_in_process(argv)
+        return
+    except (ConnectionError, OSError, ValueError) as e:
+        # The worker may already have written the output; do not run it again
+        print(f"Error generating QR code: worker failed: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if reply.get("unsupported"):
+        # An older worker refused the job without running it
+        run_in_process(argv)
+        return
+    if reply.get("success"):
+        print(f"{SUCCESS_MESSAGES[args.command]}: {reply['output']}")
+        if args.command in ("generate", "generate-with-logo"):
+            print(f"Content type detected: {reply['content_type']}")
+    else:
+        print(f"Error generating QR code: {reply.get('error', 'Unknown error')}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ A flexible Python package for generating QR codes from various input types.
 """
 
 from .generator import QRGenerator
+from .templates import TitleTemplate
 
 __version__ = '0.1.0'
-__all__ = ['QRGenerator']
+__all__ = ['QRGenerator', 'TitleTemplate']
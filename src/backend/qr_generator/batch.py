@@ -0,0 +1,285 @@
+"""
+Resumable, shardable batch generation from a manifest.
+
+A manifest lists one item per line: a worker job as a JSON object (see
+worker.run_job), or a bare content string. Items are assigned to one of N
+shards by their index or by a hash of the item, so several machines can
+work through the same manifest without coordination. Every output has a
+stable path, and every finished item is appended to a per-shard journal; a
+restarted run skips the items its journal already records. Items that
+render the same code as an earlier item of the shard are linked to its
+output instead of being rendered again.
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, IO, Iterable, Iterator, Optional, Set, Tuple
+
+from .dedup import Deduplicator
+from .generator import QRGenerator
+
+SHARD_STRATEGIES = ("index", "hash")
+
+# Seconds between journal syncs to disk
+JOURNAL_SYNC_INTERVAL = 1.0
+
+
+def read_manifest(f: IO[str]) -> Iterator[Dict[str, Any]]:
+    """
+    Read manifest items, skipping blank lines.
+
+    Args:
+        f: The manifest file: JSON objects or bare contents, one per line
+
+    Yields:
+        Each item as a worker job
+    """
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        yield json.loads(line) if line.startswith("{") else {"content": line}
+
+
+def item_key(item: Dict[str, Any]) -> str:
+    """
+    Identify an item by a hash of its canonical JSON form.
+
+    Args:
+        item: The manifest item
+
+    Returns:
+        The hex SHA-256 digest
+    """
+    canonical = json.dumps(item, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def shard_of(index: int, key: str, shards: int, strategy: str = "index") -> int:
+    """
+    Assign an item to a shard.
+
+    Index sharding spreads consecutive items evenly; hash sharding keeps an
+    item on the same shard when the manifest is reordered or extended.
+
+    Args:
+        index: Position of the item in the manifest
+        key: The item key
+        shards: Number of shards
+        strategy: "index" or "hash"
+
+    Returns:
+        The shard number, from 0 to shards - 1
+    """
+    if strategy == "hash":
+        return int(key[:16], 16) % shards
+    return index % shards
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """
+    Parse a shard given as K/N, with K counted from 1.
+
+    Args:
+        spec: The shard spec, e.g. "2/8"
+
+    Returns:
+        The zero-based shard number and the number of shards
+
+    Raises:
+        ValueError: If the spec is malformed
+    """
+    shard, _, shards = spec.partition("/")
+    try:
+        shard_number, shard_count = int(shard), int(shards)
+    except ValueError:
+        raise ValueError(f"Invalid shard: {spec}; expected K/N, e.g. 1/4") from None
+    if not 1 <= shard_number <= shard_count:
+        raise ValueError(f"Invalid shard: {spec}; K must be between 1 and N")
+    return shard_number - 1, shard_count
+
+
+def output_name(item: Dict[str, Any], key: str) -> str:
+    """
+    Get the stable output path of an item, relative to the output directory.
+
+    Args:
+        item: The manifest item; its ``name`` is used when present
+        key: The item key
+
+    Returns:
+        The relative output path
+
+    Raises:
+        ValueError: If the name would leave the output directory
+    """
+    name = item.get("name")
+    if not name:
+        return f"qr-{key[:16]}.png"
+    name = os.path.normpath(str(name))
+    if os.path.isabs(name) or name.startswith(".."):
+        raise ValueError(f"Output name must stay inside the output directory: {item['name']}")
+    return name
+
+
+def journal_path(output_dir: str, shard: int, shards: int) -> str:
+    """Get the path of a shard's journal."""
+    return os.path.join(output_dir, f".journal-{shard + 1}-of-{shards}.jsonl")
+
+
+def read_journal(path: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Read the latest journal entry of every item.
+
+    A torn last line, left by a crash while it was written, is ignored.
+
+    Args:
+        path: Path of the journal
+
+    Returns:
+        Journal entries by item key
+    """
+    entries: Dict[str, Dict[str, Any]] = {}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                entries[entry["key"]] = entry
+    return entries
+
+
+class BatchReport:
+    """
+    Counts of a batch run over one shard.
+    """
+
+    def __init__(self, shard: int, shards: int):
+        """
+        Initialize the report.
+
+        Args:
+            shard: Zero-based shard number
+            shards: Number of shards
+        """
+        self.shard = shard
+        self.shards = shards
+        self.total = 0
+        self.generated = 0
+        self.skipped = 0
+        self.failed = 0
+        self.linked = 0
+        self.dedup_ratio = 1.0
+
+    def __repr__(self) -> str:
+        return (
+            f"BatchReport(shard={self.shard + 1}/{self.shards}, total={self.total}, "
+            f"generated={self.generated}, skipped={self.skipped}, linked={self.linked}, failed={self.failed})"
+        )
+
+
+def run_batch(
+    items: Iterable[Dict[str, Any]],
+    output_dir: str,
+    generator: Optional[QRGenerator] = None,
+    shard: int = 0,
+    shards: int = 1,
+    strategy: str = "index",
+    retry_failed: bool = False,
+    link: Optional[str] = "hardlink",
+) -> BatchReport:
+    """
+    Generate the items of one shard, skipping those already journaled.
+
+    Items that render the same code as an earlier item, of this run or a
+    journaled one, are linked to its output; they count as generated and
+    as linked.
+
+    Args:
+        items: Manifest items, in manifest order
+        output_dir: Directory the outputs and the journal are written to
+        generator: The QR generator instance to use
+        shard: Zero-based shard number
+        shards: Number of shards
+        strategy: Shard assignment, "index" or "hash"
+        retry_failed: Run items again whose last attempt failed
+        link: How duplicate codes are written, one of dedup.LINK_MODES;
+            None renders every item
+
+    Returns:
+        The counts of the run
+    """
+    if strategy not in SHARD_STRATEGIES:
+        raise ValueError(f"Unknown shard strategy: {strategy}")
+    generator = generator or QRGenerator()
+    os.makedirs(output_dir, exist_ok=True)
+
+    path = journal_path(output_dir, shard, shards)
+    journal = read_journal(path)
+    report = BatchReport(shard, shards)
+    seen: Set[str] = set()
+
+    dedup = Deduplicator(generator, link)
+    for entry in journal.values():
+        if entry["success"] and entry.get("render"):
+            dedup.add(entry["render"], os.path.join(output_dir, entry["output"]))
+
+    # Rewrite the journal compacted, dropping any torn line
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        for entry in journal.values():
+            f.write(json.dumps(entry) + "\n")
+    os.replace(path + ".tmp", path)
+
+    with open(path, "a", encoding="utf-8") as f:
+        last_sync = time.monotonic()
+        for index, item in enumerate(items):
+            key = item_key(item)
+            if shard_of(index, key, shards, strategy) != shard:
+                continue
+            report.total += 1
+
+            name = output_name(item, key)
+            # Finished items are skipped unless their output has gone missing
+            entry = journal.get(key)
+            if entry is None:
+                done = False
+            elif entry["success"]:
+                done = os.path.exists(os.path.join(output_dir, entry["output"]))
+            else:
+                done = not retry_failed
+            if done or key in seen:
+                report.skipped += 1
+                continue
+            seen.add(key)
+
+            output = os.path.join(output_dir, name)
+            os.makedirs(os.path.dirname(output), exist_ok=True)
+            job = dict(item)
+            job.pop("name", None)
+            job["output"] = output
+            render = dedup.key(job)
+            reply = dedup.run(job, render)
+
+            entry = {"key": key, "index": index, "output": name, "render": render, "success": reply["success"]}
+            if reply["success"]:
+                report.generated += 1
+                if "duplicate_of" in reply:
+                    report.linked += 1
+            else:
+                entry["error"] = reply.get("error")
+                report.failed += 1
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+
+            if time.monotonic() - last_sync >= JOURNAL_SYNC_INTERVAL:
+                os.fsync(f.fileno())
+                last_sync = time.monotonic()
+
+        os.fsync(f.fileno())
+
+    report.dedup_ratio = dedup.ratio
+    return report
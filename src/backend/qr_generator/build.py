@@ -0,0 +1,277 @@
+"""
+Incremental builds of a set of QR codes from a source file.
+
+A build manifest in the output directory records, for every output file, a
+fingerprint of everything that went into it: the row's content and options,
+the bytes of its logo, the title font and the package version. A rebuild
+only regenerates rows whose fingerprint changed or whose output is missing,
+and removes outputs whose rows are gone.
+"""
+
+import csv
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from . import __version__
+from .batch import item_key, output_name, read_manifest
+from .dedup import Deduplicator, _FileDigests
+from .generator import QRGenerator
+from .templates import load_title_font
+
+MANIFEST_NAME = ".qr-build.json"
+
+# CSV columns holding numbers; every other column is passed on as text
+_INT_COLUMNS = ("version", "box_size", "border", "mask_pattern", "target_width")
+_FLOAT_COLUMNS = ("logo_size", "gradient_angle")
+
+
+def read_rows(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Read the rows of a source file as worker jobs.
+
+    CSV files need a header row whose columns are job keys (``content``,
+    ``name``, ``title``, ``fg_color``, ...); empty cells are left out. Any
+    other file is read as a batch manifest.
+
+    Args:
+        path: Path of the source file
+
+    Yields:
+        Each row as a worker job
+    """
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if not path.lower().endswith(".csv"):
+            yield from read_manifest(f)
+            return
+
+        for row in csv.DictReader(f):
+            item: Dict[str, Any] = {}
+            for column, value in row.items():
+                if column is None or value is None or value == "":
+                    continue
+                column = column.strip()
+                if column in _INT_COLUMNS:
+                    item[column] = int(value)
+                elif column in _FLOAT_COLUMNS:
+                    item[column] = float(value)
+                else:
+                    item[column] = value
+            if item:
+                yield item
+
+
+def _title_font_fingerprint(file_digest: Callable[[str], str]) -> str:
+    """Identify the title font by its file's digest, or PIL's built-in font."""
+    path = getattr(load_title_font(30), "path", None)
+    return file_digest(path) if isinstance(path, str) else "default"
+
+
+class BuildReport:
+    """
+    Counts of one incremental build.
+    """
+
+    def __init__(self):
+        """Initialize the report."""
+        self.total = 0
+        self.built = 0
+        self.unchanged = 0
+        self.removed = 0
+        self.linked = 0
+        self.dedup_ratio = 1.0
+        self.failed: List[Tuple[str, str]] = []
+
+    def __repr__(self) -> str:
+        return (
+            f"BuildReport(total={self.total}, built={self.built}, unchanged={self.unchanged}, "
+            f"removed={self.removed}, linked={self.linked}, failed={len(self.failed)})"
+        )
+
+
+class IncrementalBuilder:
+    """
+    Build the codes of a source file into a directory, regenerating only changed rows.
+    """
+
+    def __init__(self, output_dir: str, generator: Optional[QRGenerator] = None, link: Optional[str] = "hardlink"):
+        """
+        Initialize the builder.
+
+        Args:
+            output_dir: Directory the outputs and the build manifest are written to
+            generator: The QR generator instance to use
+            link: How rows that render the same code as an earlier row are
+                written, one of dedup.LINK_MODES; None renders every row
+        """
+        self.output_dir = output_dir
+        self.generator = generator or QRGenerator()
+        self.link = link
+        self.manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+        self._file_digest = _FileDigests()
+
+    def _load_manifest(self) -> Dict[str, str]:
+        """Read the fingerprints of the last build by output name."""
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f).get("outputs", {})
+        except (OSError, ValueError):
+            return {}
+
+    def _save_manifest(self, outputs: Dict[str, str]) -> None:
+        """Write the build manifest atomically."""
+        partial = self.manifest_path + ".tmp"
+        with open(partial, "w", encoding="utf-8") as f:
+            json.dump({"version": __version__, "outputs": outputs}, f, indent=1, sort_keys=True)
+        os.replace(partial, self.manifest_path)
+
+    def fingerprint(self, item: Dict[str, Any]) -> str:
+        """
+        Fingerprint everything an output depends on.
+
+        Args:
+            item: The row as a worker job
+
+        Returns:
+            The hex SHA-256 digest
+        """
+        digest = hashlib.sha256(item_key(item).encode("ascii"))
+        digest.update(__version__.encode("ascii"))
+        if item.get("logo"):
+            digest.update(self._file_digest(item["logo"]).encode("ascii"))
+        if item.get("title") or item.get("qr_title") or item.get("command") in ("wifi", "contact"):
+            digest.update(_title_font_fingerprint(self._file_digest).encode("ascii"))
+        return digest.hexdigest()
+
+    def build(self, source: str) -> BuildReport:
+        """
+        Bring the output directory up to date with a source file.
+
+        Args:
+            source: Path of the source file (CSV or manifest)
+
+        Returns:
+            The counts of the build
+
+        Raises:
+            ValueError: If two different rows write the same output
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        previous = self._load_manifest()
+        current: Dict[str, str] = {}
+        report = BuildReport()
+
+        rows = []
+        for item in read_rows(source):
+            name = output_name(item, item_key(item))
+            fingerprint = self.fingerprint(item)
+            if name in current:
+                if current[name] != fingerprint:
+                    raise ValueError(f"Several rows write {name}")
+                continue
+            current[name] = fingerprint
+            rows.append((name, item))
+
+        # Unchanged outputs are already rendered, so changed rows of the
+        # same code are linked to them
+        dedup = Deduplicator(self.generator, self.link)
+        jobs = {}
+        for name, item in rows:
+            job = dict(item)
+            job.pop("name", None)
+            job["output"] = os.path.join(self.output_dir, name)
+            if previous.get(name) == current[name] and os.path.exists(job["output"]):
+                if self.link is not None:
+                    dedup.add(dedup.key(job), job["output"])
+            else:
+                jobs[name] = job
+
+        outputs: Dict[str, str] = {}
+        settled = set()
+        try:
+            for name, _ in rows:
+                settled.add(name)
+                report.total += 1
+                job = jobs.get(name)
+                if job is None:
+                    outputs[name] = current[name]
+                    report.unchanged += 1
+                    continue
+
+                os.makedirs(os.path.dirname(job["output"]), exist_ok=True)
+                reply = dedup.run(job)
+                if reply["success"]:
+                    outputs[name] = current[name]
+                    report.built += 1
+                    if "duplicate_of" in reply:
+                        report.linked += 1
+                else:
+                    report.failed.append((name, reply.get("error")))
+
+            # Remove outputs whose rows are gone
+            for name in previous:
+                if name not in current:
+                    try:
+                        os.remove(os.path.join(self.output_dir, name))
+                    except FileNotFoundError:
+                        pass
+                    settled.add(name)
+                    report.removed += 1
+        finally:
+            # After an interruption, outputs not reached yet keep their old
+            # fingerprints, so the next build picks up where this one stopped
+            for name, fingerprint in previous.items():
+                if name not in settled:
+                    outputs[name] = fingerprint
+            self._save_manifest(outputs)
+            report.dedup_ratio = dedup.ratio
+
+        return report
+
+    def watch(
+        self,
+        source: str,
+        on_build: Optional[Callable[[BuildReport], None]] = None,
+        interval: float = 1.0,
+        stop: Optional[threading.Event] = None,
+    ) -> None:
+        """
+        Rebuild whenever the source file or a logo it uses changes.
+
+        Files are polled, so no file system notification support is needed.
+
+        Args:
+            source: Path of the source file
+            on_build: Called with the report of every build
+            interval: Seconds between polls
+            stop: Event that stops watching
+        """
+        stop = stop or threading.Event()
+        last_state = None
+        while not stop.is_set():
+            state = self._watch_state(source)
+            if state != last_state:
+                report = self.build(source)
+                last_state = self._watch_state(source)
+                if on_build is not None:
+                    on_build(report)
+            stop.wait(interval)
+
+    def _watch_state(self, source: str) -> Tuple[Tuple[str, int, int], ...]:
+        """Get the size and mtime of the source file and its logos."""
+        paths = [source]
+        try:
+            paths.extend(sorted({item["logo"] for item in read_rows(source) if item.get("logo")}))
+        except (OSError, ValueError):
+            pass
+
+        state = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                state.append((path, stat.st_size, stat.st_mtime_ns))
+            except OSError:
+                state.append((path, -1, -1))
+        return tuple(state)
@@ -0,0 +1,255 @@
+"""
+Content-addressed deduplication of batch outputs.
+
+Batch inputs often ask for the same code many times, e.g. the same WiFi
+credentials for every room. Each job is keyed by a hash of what it writes:
+its resolved content, its normalized options, the bytes of its logo and the
+image format of its output.
+The first job of each key is rendered; every later one gets a hard link,
+symlink or copy of that output instead.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from PIL import Image
+
+from .generator import QRGenerator
+from .occlusion import LEVELS_BY_NAME
+from .spec import RenderSpec
+from .styles import style_from_options
+from .utils import format_contact_data, format_wifi_data
+from .worker import _qr_options, run_job
+
+LINK_MODES = ("hardlink", "symlink", "copy")
+
+# Job keys that name an output rather than describe the code
+_OUTPUT_KEYS = ("id", "name", "output")
+
+
+class _FileDigests:
+    """SHA-256 digests of files, recomputed only when their size or mtime changes."""
+
+    def __init__(self):
+        self._digests: Dict[str, Tuple[int, int, str]] = {}
+
+    def __call__(self, path: str) -> str:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return "missing"
+        cached = self._digests.get(path)
+        if cached is not None and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+            return cached[2]
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        self._digests[path] = (stat.st_size, stat.st_mtime_ns, digest.hexdigest())
+        return digest.hexdigest()
+
+
+def _rendered_code(job: Dict[str, Any]) -> Tuple[RenderSpec, bool, Optional[float], Optional[int]]:
+    """
+    Resolve a job to what run_job renders for it.
+
+    Returns:
+        The spec of the code, whether a logo is added, and the logo size
+        and error correction passed to generate_with_logo
+    """
+    command = job.get("command", "generate").replace("_", "-")
+    if command == "generate":
+        style = style_from_options(
+            job.get("module_style"),
+            job.get("eye_style"),
+            job.get("gradient"),
+            job.get("gradient_type", "linear"),
+            job.get("gradient_angle", 0.0),
+            job.get("eye_color"),
+        )
+        spec = RenderSpec(job["content"], title=job.get("title"), style=style, **_qr_options(job))
+        return spec, False, None, None
+    if command == "generate-with-logo":
+        spec = RenderSpec(job["content"], title=job.get("title"), **_qr_options(job))
+        return spec, True, job.get("logo_size", 0.2), LEVELS_BY_NAME.get(job.get("error_correction"))
+    if command == "wifi":
+        content = format_wifi_data(job["ssid"], job.get("password"), job.get("security", "WPA"))
+        title = job.get("title") or f"WiFi: {job['ssid']}"
+    elif command == "contact":
+        content = format_contact_data(
+            name=job["name"],
+            phone=job.get("phone"),
+            email=job.get("email"),
+            company=job.get("company"),
+            title=job.get("job_title"),
+            website=job.get("website"),
+        )
+        title = job.get("qr_title") or f"Contact: {job['name']}"
+    else:
+        raise ValueError(f"Unknown command: {command}")
+    spec = RenderSpec(content, title=title, **_qr_options(job))
+    return spec, bool(job.get("logo")), 0.2 if job.get("logo") else None, None
+
+
+def _output_format(output: Optional[str]) -> Optional[str]:
+    """Get the PIL format an output path is saved in, or its extension if PIL does not know it."""
+    if not output:
+        return None
+    extension = os.path.splitext(output)[1].lower()
+    return Image.registered_extensions().get(extension, extension)
+
+
+def render_key(job: Dict[str, Any], file_digest: Optional[Callable[[str], str]] = None) -> str:
+    """
+    Identify the file a job writes, independent of where it is written.
+
+    Jobs that write the same file get the same key: a WiFi job and a
+    generate job for the same payload and title, or colors spelled
+    differently, saved in the same format. Jobs that cannot be resolved
+    are keyed by their fields.
+
+    Args:
+        job: The worker job, with the ``output`` path whose extension
+            selects the image format
+        file_digest: Digest function for logo files; defaults to hashing
+            the file every call
+
+    Returns:
+        The hex SHA-256 digest
+    """
+    try:
+        spec, logo, logo_size, error_correction = _rendered_code(job)
+    except (KeyError, TypeError, ValueError):
+        fields = {key: value for key, value in job.items() if key not in _OUTPUT_KEYS}
+        canonical = json.dumps(fields, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    logo_digest = (file_digest or _FileDigests())(job["logo"]) if logo else None
+    canonical = repr((spec.digest, logo_digest, logo_size, error_correction, _output_format(job.get("output"))))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def link_output(source: str, target: str, mode: str = "hardlink") -> str:
+    """
+    Make target a hard link, symlink or copy of source, replacing it atomically.
+
+    Hard links fall back to a copy where the filesystem does not support
+    them, or across filesystems. Symlinks are relative, so the output
+    directory can be moved.
+
+    Args:
+        source: Path of the rendered output
+        target: Path of the duplicate output
+        mode: One of LINK_MODES
+
+    Returns:
+        The mode actually used
+    """
+    if mode not in LINK_MODES:
+        raise ValueError(f"Unknown link mode: {mode}")
+    os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+    partial = target + ".link"
+    if os.path.lexists(partial):
+        os.remove(partial)
+
+    if mode == "hardlink":
+        try:
+            os.link(source, partial)
+        except OSError:
+            mode = "copy"
+    if mode == "symlink":
+        os.symlink(os.path.relpath(os.path.abspath(source), os.path.dirname(os.path.abspath(target))), partial)
+    elif mode == "copy":
+        shutil.copyfile(source, partial)
+    os.replace(partial, target)
+    return mode
+
+
+class Deduplicator:
+    """
+    Run batch jobs, rendering each distinct code once and linking the rest.
+
+    Outputs are always replaced rather than overwritten in place, so
+    rendering a job never writes through a hard link into the outputs of
+    other jobs.
+    """
+
+    def __init__(self, generator: QRGenerator, link: Optional[str] = "hardlink"):
+        """
+        Initialize the deduplicator.
+
+        Args:
+            generator: The QR generator instance to use
+            link: How duplicates are written, one of LINK_MODES; None renders every job
+        """
+        if link is not None and link not in LINK_MODES:
+            raise ValueError(f"Unknown link mode: {link}")
+        self.generator = generator
+        self.link = link
+        self.jobs = 0
+        self.rendered = 0
+        self.linked = 0
+        self._outputs: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        self._file_digest = _FileDigests()
+
+    @property
+    def ratio(self) -> float:
+        """Jobs per rendered code; 1.0 when nothing was deduplicated."""
+        return self.jobs / max(self.rendered, 1) if self.linked else 1.0
+
+    def key(self, job: Dict[str, Any]) -> str:
+        """Get the render key of a job, see render_key."""
+        return render_key(job, self._file_digest)
+
+    def add(self, key: str, output: str, reply: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Record an existing output, e.g. from an earlier run, as the source of a key.
+
+        Args:
+            key: The render key
+            output: Path of the output
+            reply: The worker reply of the output
+        """
+        if key not in self._outputs:
+            self._outputs[key] = (output, dict(reply or {"success": True}))
+
+    def run(self, job: Dict[str, Any], key: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Run a job, or link its output to an earlier output of the same code.
+
+        Args:
+            job: The worker job, with its ``output`` path
+            key: The job's render key, if already computed
+
+        Returns:
+            The worker reply; linked outputs carry ``duplicate_of``, the
+            path they were linked to
+        """
+        self.jobs += 1
+        output = job["output"]
+        if self.link is not None:
+            key = key or self.key(job)
+            source = self._outputs.get(key)
+            if source is not None and os.path.exists(source[0]):
+                path, reply = source
+                try:
+                    if os.path.abspath(path) != os.path.abspath(output):
+                        link_output(path, output, self.link)
+                except OSError:
+                    # E.g. symlinks are not permitted here; render instead
+                    pass
+                else:
+                    self.linked += 1
+                    return dict(reply, id=job.get("id"), output=output, duplicate_of=path)
+
+        if os.path.lexists(output):
+            os.remove(output)
+        reply = run_job(self.generator, job)
+        self.rendered += 1
+        if reply["success"] and self.link is not None:
+            self.add(key, output, reply)
+        return reply
@@ -0,0 +1,66 @@
+"""
+Pluggable matrix encoder backends for QR code generation.
+
+An encoder compiles a qrcode.QRCode whose data has been added: it picks the
+version, computes error correction codewords, selects the mask pattern and
+fills in the module matrix. Every backend must produce the same matrix as
+qrcode's own implementation.
+"""
+
+from typing import Dict, Union
+
+import qrcode
+
+
+class QRCodeEncoder:
+    """
+    Reference encoder that delegates to qrcode.QRCode.make.
+    """
+
+    name = "qrcode"
+
+    def encode(self, qr: qrcode.QRCode) -> qrcode.QRCode:
+        """
+        Compile a QR code in place.
+
+        The version given to the QR code is treated as the minimum version, and
+        a mask pattern set on it is used instead of searching for the best one.
+
+        Args:
+            qr: QR code instance with its data added
+
+        Returns:
+            The same QR code instance, compiled
+        """
+        qr.make(fit=True)
+        return qr
+
+
+_ENCODERS: Dict[str, QRCodeEncoder] = {}
+
+
+def get_encoder(encoder: Union[str, QRCodeEncoder, None] = None) -> QRCodeEncoder:
+    """
+    Resolve an encoder backend by name.
+
+    Args:
+        encoder: "qrcode" (default), "numpy", or an encoder instance
+
+    Returns:
+        The encoder instance
+    """
+    if isinstance(encoder, QRCodeEncoder):
+        return encoder
+
+    name = encoder or QRCodeEncoder.name
+    if name not in _ENCODERS:
+        if name == QRCodeEncoder.name:
+            _ENCODERS[name] = QRCodeEncoder()
+        elif name == "numpy":
+            # Imported here, not at the top, because numpy_encoder imports this module
+            from .numpy_encoder import NumpyEncoder
+            _ENCODERS[name] = NumpyEncoder()
+        else:
+            raise ValueError(f"Unknown encoder: {name}. Available encoders: qrcode, numpy")
+
+    return _ENCODERS[name]
@@ -2,19 +2,58 @@
 Core QR code generation functionality.
 """
 
+import io
 import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
 import qrcode
-from PIL import Image, ImageDraw, ImageFont
-from typing import Optional, Tuple, Union
+from PIL import Image, ImageColor
+from typing import Iterator, List, Optional, Tuple, Union
+
+from .encoders import QRCodeEncoder, get_encoder
+from .occlusion import LEVELS, OcclusionReport, choose_error_correction, fit_logo
+from .planner import RGB_BYTES_PER_PIXEL, PixelBudget, RenderPlan
+from .spec import RenderSpec
+from .styles import QRStyle
+from .templates import TitleTemplate, get_title_template
+
+# Memory of the scratch images kept per thread; larger images are not kept
+MAX_SCRATCH_BYTES = 32 * 1024 * 1024
+
+# Smallest scratch pixel array; larger ones are rounded up to a power of two
+MIN_ARRAY_BYTES = 64 * 1024
+
+# Largest encode stream kept per thread
+MAX_STREAM_BYTES = 8 * 1024 * 1024
 
 
 class QRGenerator:
     """
     A flexible QR code generator that supports various input types and customization options.
+
+    A single instance may be shared by many threads. Rendering keeps no
+    per-call state on the instance; caches are locked or read-only, and
+    scratch images are kept per thread. Change the defaults before sharing
+    an instance.
     """
 
-    def __init__(self):
-        """Initialize the QR code generator."""
+    def __init__(
+        self,
+        encoder: Union[str, QRCodeEncoder, None] = None,
+        budget: Optional[PixelBudget] = None,
+    ):
+        """
+        Initialize the QR code generator.
+
+        Args:
+            encoder: Matrix encoder backend, "qrcode" (default) or "numpy"
+            budget: Pixel and memory limits for rendered images
+        """
+        self.encoder = get_encoder(encoder)
+        self.budget = budget or PixelBudget()
         self.default_version = 1
         self.default_error_correction = qrcode.constants.ERROR_CORRECT_M
         self.default_box_size = 20  # Increased from 10 to 20 for larger QR codes
@@ -23,6 +62,9 @@ class QRGenerator:
         self.default_bg_color = "white"
         self.default_title_bg_color = "#42f593"  # Default blue background for title
         self.default_title_text_color = "white"  # Default white text for title
+        self.buffer_allocations = 0
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
 
     def generate(
         self,
@@ -35,6 +77,10 @@ class QRGenerator:
         fg_color: Optional[Union[str, Tuple[int, int, int]]] = None,
         bg_color: Optional[Union[str, Tuple[int, int, int]]] = None,
         title: Optional[str] = None,
+        template: Optional[TitleTemplate] = None,
+        mask_pattern: Optional[int] = None,
+        target_width: Optional[int] = None,
+        style: Optional[QRStyle] = None,
     ) -> str:
         """
         Generate a QR code from the given content and save it to the specified path.
@@ -48,46 +94,411 @@ class QRGenerator:
             border: Border size in boxes
             fg_color: Foreground color (color of the QR code)
             bg_color: Background color
+            title: Title to display above the QR code
+            template: Pre-rendered title band/frame shared across many codes;
+                used for the title area instead of the default band
+            mask_pattern: Mask pattern (0-7) to use instead of searching for the best one
+            target_width: Width of the QR code in pixels; picks the box size instead of box_size
+            style: Module shape, eye style and gradient fill; rendered with the
+                vectorized styled renderer instead of qrcode's image factory
 
         Returns:
             The path to the generated QR code image
+
+        Raises:
+            ImageBudgetError: If the image would exceed the generator's budget
+        """
+        spec = RenderSpec(
+            content,
+            version=version,
+            error_correction=error_correction,
+            box_size=box_size,
+            border=border,
+            fg_color=fg_color,
+            bg_color=bg_color,
+            title=title,
+            mask_pattern=mask_pattern,
+            target_width=target_width,
+            style=style,
+        )
+        img = self.render_spec(spec, template=template, reuse_buffer=True)
+
+        # Ensure the directory exists
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+
+        # Save the image; untitled codes are always written as PNG data,
+        # matching qrcode's own image wrapper
+        img.save(output_path, format=None if (spec.title or template) else "PNG")
+
+        return output_path
+
+    def render(
+        self,
+        content: str,
+        version: Optional[int] = None,
+        error_correction: Optional[int] = None,
+        box_size: Optional[int] = None,
+        border: Optional[int] = None,
+        fg_color: Optional[Union[str, Tuple[int, int, int]]] = None,
+        bg_color: Optional[Union[str, Tuple[int, int, int]]] = None,
+        title: Optional[str] = None,
+        template: Optional[TitleTemplate] = None,
+        mask_pattern: Optional[int] = None,
+        target_width: Optional[int] = None,
+        style: Optional[QRStyle] = None,
+        reuse_buffer: bool = False,
+    ) -> Image.Image:
+        """
+        Render a QR code image in memory without saving it.
+
+        Takes the same options as generate. The image size is checked against
+        the budget after encoding and before any image is allocated.
+
+        Args:
+            reuse_buffer: Rasterize and composite into scratch images owned
+                by the calling thread instead of new images. The result is
+                only valid until the thread's next render, so it must be
+                saved or copied right away.
+
+        Returns:
+            The rendered image
+        """
+        spec = RenderSpec(
+            content,
+            version=version,
+            error_correction=error_correction,
+            box_size=box_size,
+            border=border,
+            fg_color=fg_color,
+            bg_color=bg_color,
+            title=title,
+            mask_pattern=mask_pattern,
+            target_width=target_width,
+            style=style,
+        )
+        return self.render_spec(spec, template=template, reuse_buffer=reuse_buffer)
+
+    def render_spec(
+        self,
+        spec: RenderSpec,
+        template: Optional[TitleTemplate] = None,
+        reuse_buffer: bool = False,
+    ) -> Image.Image:
+        """
+        Render the QR code described by a spec in memory.
+
+        Args:
+            spec: The render options; unset options take the generator's defaults
+            template: Title template to use instead of the default band
+            reuse_buffer: Rasterize and composite into the calling thread's
+                scratch images, as in render
+
+        Returns:
+            The rendered image
+        """
+        spec = spec.resolve(self)
+        qr = self._make_qr(
+            spec.content, spec.version, spec.error_correction, spec.box_size, spec.border, spec.mask_pattern
+        )
+        qr.box_size = self.plan(
+            qr, qr.box_size, spec.fg_color, spec.bg_color, spec.title, template, spec.target_width, spec.style
+        ).box_size
+        qr_img = self.rasterize(qr, spec.fg_color, spec.bg_color, spec.style, reuse_buffer)
+
+        # If a title is provided, add it to the image
+        if spec.title or template:
+            return self._add_title_to_image(qr_img, spec.title, template, reuse_buffer)
+        return qr_img
+
+    def rasterize(
+        self,
+        qr: qrcode.QRCode,
+        fg_color: Optional[Union[str, Tuple[int, int, int]]] = None,
+        bg_color: Optional[Union[str, Tuple[int, int, int]]] = None,
+        style: Optional[QRStyle] = None,
+        reuse_buffer: bool = False,
+    ) -> Image.Image:
+        """
+        Rasterize a compiled QR code into an image.
+
+        Args:
+            qr: The compiled QR code
+            fg_color: Foreground color (color of the QR code)
+            bg_color: Background color
+            style: Module shape, eye style and gradient fill
+            reuse_buffer: Draw unstyled codes into the calling thread's
+                scratch image, valid until the thread's next render
+
+        Returns:
+            The QR code image, without title
         """
         # Set default values if not provided
-        version = version or self.default_version
-        error_correction = error_correction or self.default_error_correction
-        box_size = box_size or self.default_box_size
-        border = border or self.default_border
         fg_color = fg_color or self.default_fg_color
         bg_color = bg_color or self.default_bg_color
 
+        if style is not None:
+            return style.render(qr.get_matrix(), qr.box_size, qr.border, fg_color, bg_color)
+
+        if reuse_buffer:
+            img = self._rasterize_into_scratch(qr, fg_color, bg_color)
+            if img is not None:
+                return img
+
+        # Create an image from the QR code
+        return qr.make_image(fill_color=fg_color, back_color=bg_color).get_image()
+
+    def _rasterize_into_scratch(
+        self,
+        qr: qrcode.QRCode,
+        fg_color: Union[str, Tuple[int, int, int]],
+        bg_color: Union[str, Tuple[int, int, int]],
+    ) -> Optional[Image.Image]:
+        """
+        Rasterize a code into the calling thread's scratch image.
+
+        Produces the same pixels and image mode as qrcode's PIL factory,
+        which allocates a new image and draws every dark module as its own
+        rectangle. The modules are scaled up with one broadcast into a
+        scratch pixel array instead.
+
+        Returns:
+            The image, or None for colors only qrcode's factory handles
+        """
+        fill = fg_color.lower() if isinstance(fg_color, str) else fg_color
+        back = bg_color.lower() if isinstance(bg_color, str) else bg_color
+        if back == "transparent":
+            return None
+        if fill == "black" and back == "white":
+            mode, rawmode, dark, light = "1", "1;8", 0, 255
+        else:
+            try:
+                dark = _rgb(fill)
+                light = _rgb(back)
+            except ValueError:
+                return None
+            if dark is None or light is None:
+                return None
+            mode = rawmode = "RGB"
+
+        modules = np.array(qr.get_matrix(), dtype=bool)
+        count, box = len(modules), qr.box_size
+        bands = 1 if mode == "1" else 3
+        side = count * box
+        pixels = self._scratch_array(side * side * bands).reshape(count, box, count, box, bands)
+        palette = np.array([light, dark], dtype=np.uint8).reshape(2, bands)
+        pixels[...] = palette[modules.view(np.uint8)][:, None, :, None, :]
+
+        img = self._scratch_buffer((side, side), mode)
+        img.frombytes(pixels, "raw", rawmode)
+        return img
+
+    def plan(
+        self,
+        qr: qrcode.QRCode,
+        box_size: Optional[int] = None,
+        fg_color: Optional[Union[str, Tuple[int, int, int]]] = None,
+        bg_color: Optional[Union[str, Tuple[int, int, int]]] = None,
+        title: Optional[str] = None,
+        template: Optional[TitleTemplate] = None,
+        target_width: Optional[int] = None,
+        style: Optional[QRStyle] = None,
+    ) -> RenderPlan:
+        """
+        Plan the render of a compiled QR code within the generator's budget.
+
+        Args:
+            qr: The compiled QR code
+            box_size: Requested size of each box in pixels
+            fg_color: Foreground color (color of the QR code)
+            bg_color: Background color
+            title: Title to display above the QR code
+            template: Title template to use instead of the default band
+            target_width: Width of the QR code in pixels; overrides box_size
+            style: Module shape, eye style and gradient fill
+
+        Returns:
+            The plan, with the box size to render at
+
+        Raises:
+            ImageBudgetError: If the image would exceed the budget
+        """
+        return self._plan_size(
+            qr.modules_count, qr.border, box_size, fg_color, bg_color, title, template, target_width, style
+        )
+
+    def _plan_size(
+        self,
+        modules_count: int,
+        border: int,
+        box_size: Optional[int] = None,
+        fg_color: Optional[Union[str, Tuple[int, int, int]]] = None,
+        bg_color: Optional[Union[str, Tuple[int, int, int]]] = None,
+        title: Optional[str] = None,
+        template: Optional[TitleTemplate] = None,
+        target_width: Optional[int] = None,
+        style: Optional[QRStyle] = None,
+    ) -> RenderPlan:
+        """Plan a render of a code with the given number of modules; see plan."""
+        if title and template is None:
+            template = get_title_template(
+                title, self.default_title_bg_color, self.default_title_text_color
+            )
+
+        # qrcode rasterizes plain black-on-white codes as 1-byte bilevel images
+        fg_color = fg_color or self.default_fg_color
+        bg_color = bg_color or self.default_bg_color
+        mono = style is None and fg_color == "black" and bg_color == "white"
+
+        return self.budget.plan(
+            modules_count,
+            box_size or self.default_box_size,
+            border,
+            band_height=template.band_height if template else 0,
+            frame_width=template.frame_width if template else 0,
+            bytes_per_pixel=1 if mono else RGB_BYTES_PER_PIXEL,
+            target_width=target_width,
+        )
+
+    def make_matrix(
+        self,
+        content: str,
+        version: Optional[int] = None,
+        error_correction: Optional[int] = None,
+        border: Optional[int] = None,
+        mask_pattern: Optional[int] = None,
+    ) -> List[List[bool]]:
+        """
+        Encode content into a QR module matrix without rasterizing it.
+
+        Args:
+            content: The content to encode in the QR code
+            version: QR code version (1-40, controls size)
+            error_correction: Error correction level
+            border: Border size in boxes
+            mask_pattern: Mask pattern (0-7) to use instead of searching for the best one
+
+        Returns:
+            Rows of modules including the border, True for dark modules
+        """
+        return self._make_qr(content, version, error_correction, 1, border, mask_pattern).get_matrix()
+
+    def _make_qr(
+        self,
+        content: str,
+        version: Optional[int] = None,
+        error_correction: Optional[int] = None,
+        box_size: Optional[int] = None,
+        border: Optional[int] = None,
+        mask_pattern: Optional[int] = None,
+    ) -> qrcode.QRCode:
+        """Create a QR code instance, add the content and compile it with the encoder."""
+        # Set default values if not provided
+        # Only None takes the default: border 0 and ERROR_CORRECT_M (0) are valid
+        if version is None:
+            version = self.default_version
+        if error_correction is None:
+            error_correction = self.default_error_correction
+        if box_size is None:
+            box_size = self.default_box_size
+        if border is None:
+            border = self.default_border
+
         # Create QR code instance
         qr = qrcode.QRCode(
             version=version,
             error_correction=error_correction,
             box_size=box_size,
             border=border,
+            mask_pattern=mask_pattern,
         )
 
         # Add data to the QR code
         qr.add_data(content)
-        qr.make(fit=True)
 
-        # Create an image from the QR code
-        qr_img = qr.make_image(fill_color=fg_color, back_color=bg_color)
-        
-        # If a title is provided, add it to the image
-        if title:
-            img = self._add_title_to_image(qr_img, title)
-        else:
-            img = qr_img
-            
-        # Ensure the directory exists
-        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        return self.encoder.encode(qr)
+
+    def plan_logo(
+        self,
+        content: str,
+        logo_img: Image.Image,
+        logo_size: float = 0.2,
+        version: Optional[int] = None,
+        error_correction: Optional[int] = None,
+        box_size: Optional[int] = None,
+        border: Optional[int] = None,
+        target_width: Optional[int] = None,
+        fg_color: Optional[Union[str, Tuple[int, int, int]]] = None,
+        bg_color: Optional[Union[str, Tuple[int, int, int]]] = None,
+        title: Optional[str] = None,
+        template: Optional[TitleTemplate] = None,
+        style: Optional[QRStyle] = None,
+    ) -> OcclusionReport:
+        """
+        Check which modules a logo covers and pick the error correction level.
 
-        # Save the image
-        img.save(output_path)
+        The box size of every candidate version is planned exactly as the
+        render plans it, title band and budget included, so the analysed
+        footprint is the one generate_with_logo draws.
 
-        return output_path
+        Args:
+            content: The content to encode in the QR code
+            logo_img: The logo image
+            logo_size: Size of the logo as a fraction of the QR code size (0.0-1.0)
+            version: QR code version (1-40, controls size)
+            error_correction: Error correction level to check; the weakest
+                level that keeps the code decodable is picked when omitted
+            box_size: Size of each box in pixels
+            border: Border size in boxes
+            target_width: Width of the QR code in pixels; picks the box size instead of box_size
+            fg_color: Foreground color (color of the QR code)
+            bg_color: Background color
+            title: Title to display above the QR code
+            template: Title template to use instead of the default band
+            style: Module shape, eye style and gradient fill
+
+        Returns:
+            The occlusion report of the chosen level, with the box size to render at
+
+        Raises:
+            LogoOcclusionError: If the logo covers too much of the code
+            ImageBudgetError: If the image would exceed the budget
+        """
+        spec = RenderSpec(
+            content,
+            version=version,
+            box_size=box_size,
+            border=border,
+            fg_color=fg_color,
+            bg_color=bg_color,
+            title=title,
+            target_width=target_width,
+            style=style,
+        ).resolve(self)
+        qr = qrcode.QRCode()
+        qr.add_data(content)
+
+        def planned_box_size(modules_count: int) -> int:
+            return self._plan_size(
+                modules_count,
+                spec.border,
+                spec.box_size,
+                spec.fg_color,
+                spec.bg_color,
+                spec.title,
+                template,
+                spec.target_width,
+                spec.style,
+            ).box_size
+
+        return choose_error_correction(
+            qr.data_list,
+            logo_img,
+            logo_size,
+            planned_box_size,
+            spec.border,
+            version=spec.version,
+            levels=LEVELS if error_correction is None else (error_correction,),
+        )
 
     def generate_with_logo(
         self,
@@ -96,125 +507,216 @@ class QRGenerator:
         logo_path: str,
         logo_size: Optional[float] = 0.2,  # Logo size as a fraction of QR code size
         title: Optional[str] = None,
+        template: Optional[TitleTemplate] = None,
+        error_correction: Optional[int] = None,
+        report: Optional[OcclusionReport] = None,
         **kwargs
     ) -> str:
         """
         Generate a QR code with a logo in the center.
 
+        The modules under the logo are checked before rendering; see plan_logo.
+
         Args:
             content: The content to encode in the QR code
             output_path: The path where the QR code image will be saved
             logo_path: Path to the logo image
             logo_size: Size of the logo as a fraction of the QR code size (0.0-1.0)
+            title: Title to display above the QR code
+            template: Pre-rendered title band/frame shared across many codes
+            error_correction: Error correction level; the weakest level that
+                keeps the code decodable is picked when omitted
+            report: Result of plan_logo for the same options, to skip the
+                analysis; planned here when omitted
             **kwargs: Additional arguments to pass to the generate method
 
         Returns:
             The path to the generated QR code image with logo
-        """
-        # First generate a regular QR code
-        self.generate(content, output_path, **kwargs)
-
-        # Open the QR code image
-        qr_img = Image.open(output_path)
-        qr_width, qr_height = qr_img.size
 
+        Raises:
+            LogoOcclusionError: If the logo covers too much of the code
+        """
         # Open the logo image
         logo_img = Image.open(logo_path)
 
-        # Calculate the size of the logo
-        logo_max_size = int(min(qr_width, qr_height) * logo_size)
-        logo_width, logo_height = logo_img.size
-
-        # Resize the logo to fit within the QR code
-        if logo_width > logo_max_size or logo_height > logo_max_size:
-            logo_img = logo_img.resize(
-                (logo_max_size, int(logo_height * logo_max_size / logo_width))
-                if logo_width > logo_height
-                else (int(logo_width * logo_max_size / logo_height), logo_max_size)
+        if report is None:
+            report = self.plan_logo(
+                content,
+                logo_img,
+                logo_size,
+                version=kwargs.get("version"),
+                error_correction=error_correction,
+                box_size=kwargs.get("box_size"),
+                border=kwargs.get("border"),
+                target_width=kwargs.get("target_width"),
+                fg_color=kwargs.get("fg_color"),
+                bg_color=kwargs.get("bg_color"),
+                title=title,
+                template=template,
+                style=kwargs.get("style"),
             )
-            logo_width, logo_height = logo_img.size
 
-        # Calculate position to place the logo (center)
-        position = ((qr_width - logo_width) // 2, (qr_height - logo_height) // 2)
+        # First render a regular QR code, at the version and box size the
+        # footprint was analysed at
+        options = dict(kwargs, version=report.version, box_size=report.box_size, target_width=None)
+        qr_img = self.render(content, error_correction=report.error_correction, reuse_buffer=True, **options)
 
-        # Create a new image for the result
-        result = Image.new("RGBA", (qr_width, qr_height), (0, 0, 0, 0))
+        # Ensure the directory exists
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+
+        # Scale the logo and center it
+        logo_img, position = fit_logo(logo_img, qr_img.size, logo_size)
 
-        # Paste the QR code onto the new image
+        # Paste the QR code onto a scratch image; it covers every pixel, so
+        # the scratch image needs no clearing
+        result = self._scratch_buffer(qr_img.size, "RGBA")
         result.paste(qr_img, (0, 0))
 
         # Paste the logo onto the new image
         result.paste(logo_img, position, logo_img if logo_img.mode == 'RGBA' else None)
 
         # If a title is provided, add it to the image
-        if title:
-            final_img = self._add_title_to_image(result, title)
+        if title or template:
+            final_img = self._add_title_to_image(result, title, template, reuse_buffer=True)
             final_img.save(output_path)
         else:
             result.save(output_path)
 
         return output_path
         
-    def _add_title_to_image(self, img: Image.Image, title: str) -> Image.Image:
+    def _add_title_to_image(
+        self,
+        img: Image.Image,
+        title: str,
+        template: Optional[TitleTemplate] = None,
+        reuse_buffer: bool = False,
+    ) -> Image.Image:
         """
         Add a title to the QR code image.
         
         Args:
             img: The QR code image
             title: The title text to add
+            template: Pre-rendered title template to use instead of the default band
+            reuse_buffer: Draw into the calling thread's scratch image
             
         Returns:
             The QR code image with the title added
         """
-        # Convert the image to RGB if it's not already
-        if img.mode != 'RGB':
-            img = img.convert('RGB')
-        
-        # Get the size of the original image
-        qr_width, qr_height = img.size
-        
-        # Define title area height - increased for better visibility
-        title_height = 80
-        
-        # Create a new blank image with space for the title
-        new_img = Image.new('RGB', (qr_width, qr_height + title_height), 'white')
-        
-        # Create a drawing context for the new image
-        draw = ImageDraw.Draw(new_img)
-        
-        # Draw the title background
-        draw.rectangle([(0, 0), (qr_width, title_height)], fill=self.default_title_bg_color)
-        
-        # Copy the QR code to the bottom part of the new image
-        for y in range(qr_height):
-            for x in range(qr_width):
-                pixel = img.getpixel((x, y))
-                new_img.putpixel((x, y + title_height), pixel)
-        
-        # Try to use a larger font
-        font_size = 30
-        try:
-            # Try common system fonts
-            if os.name == 'nt':  # Windows
-                font = ImageFont.truetype("arial.ttf", font_size)
-            else:  # Linux/Mac
-                font = ImageFont.truetype("DejaVuSans.ttf", font_size)
-        except:
-            # Fall back to default
-            font = ImageFont.load_default()
+        if template is None:
+            template = get_title_template(
+                title, self.default_title_bg_color, self.default_title_text_color
+            )
         
-        # Try to center the text
+        out = self._scratch_buffer(template.canvas_size(img.size)) if reuse_buffer else None
+        return template.apply(img, out)
+
+    @contextmanager
+    def encode_image(self, img: Image.Image, format: str = "PNG", **params) -> Iterator[memoryview]:
+        """
+        Encode an image into the calling thread's reusable stream.
+
+        Use as a context manager; the yielded view of the encoded data is
+        released on exit, so copy or write it out inside the block. Nested
+        calls on one thread encode into a new stream.
+
+        Args:
+            img: The image to encode
+            format: PIL format name
+            **params: Encoder options passed to Image.save
+
+        Yields:
+            A memoryview of the encoded data
+        """
+        stream = getattr(self._local, "stream", None)
+        if stream is None:
+            stream = io.BytesIO()
+        # Writes to the stream fail while a view of it is exported
+        self._local.stream = None
+
+        buffer = data = None
         try:
-            # For newer Pillow versions
-            text_width = draw.textlength(title, font=font)
-        except AttributeError:
-            # Fallback for older Pillow versions
-            text_width = font.getsize(title)[0]
-        
-        text_x = (qr_width - text_width) // 2
-        text_y = (title_height - font_size) // 2  # Center vertically in title area
-        
-        # Draw the title
-        draw.text((text_x, text_y), title, fill=self.default_title_text_color, font=font)
-        
-        return new_img
+            stream.seek(0)
+            img.save(stream, format=format, **params)
+            buffer = stream.getbuffer()
+            data = buffer[:stream.tell()]
+            yield data
+        finally:
+            if buffer is not None:
+                data.release()
+                buffer.release()
+            if stream.tell() <= MAX_STREAM_BYTES:
+                self._local.stream = stream
+
+    def _scratch_buffer(self, size: Tuple[int, int], mode: str = "RGB") -> Image.Image:
+        """
+        Get the calling thread's scratch image of the given size and mode.
+
+        Args:
+            size: Width and height of the image
+            mode: PIL image mode
+
+        Returns:
+            An image owned by the calling thread, with undefined contents
+        """
+        return self._scratch(("image", mode, size), lambda: Image.new(mode, size))
+
+    def _scratch_array(self, nbytes: int) -> np.ndarray:
+        """
+        Get the calling thread's flat scratch array, sliced to nbytes.
+
+        One array serves every image size; it grows to the next power of
+        two when a larger image needs it.
+
+        Args:
+            nbytes: Number of bytes needed
+
+        Returns:
+            A uint8 array owned by the calling thread, with undefined contents
+        """
+        array = self._scratch_buffers().get("array")
+        if array is not None and array.nbytes < nbytes:
+            del self._scratch_buffers()["array"]
+        capacity = max(MIN_ARRAY_BYTES, 1 << (nbytes - 1).bit_length())
+        return self._scratch("array", lambda: np.empty(capacity, dtype=np.uint8))[:nbytes]
+
+    def _scratch_buffers(self) -> "OrderedDict":
+        """Get the calling thread's scratch buffers, least recently used first."""
+        buffers = getattr(self._local, "buffers", None)
+        if buffers is None:
+            buffers = self._local.buffers = OrderedDict()
+        return buffers
+
+    def _scratch(self, key, allocate):
+        """Get the calling thread's scratch buffer under key, allocating it if needed."""
+        buffers = self._scratch_buffers()
+        buffer = buffers.pop(key, None)
+        if buffer is None:
+            buffer = allocate()
+            with self._stats_lock:
+                self.buffer_allocations += 1
+        buffers[key] = buffer
+
+        # Evict least recently used buffers beyond the memory limit
+        total = sum(_buffer_bytes(scratch) for scratch in buffers.values())
+        while total > MAX_SCRATCH_BYTES and buffers:
+            _, evicted = buffers.popitem(last=False)
+            total -= _buffer_bytes(evicted)
+        return buffer
+
+
+def _rgb(color: Union[str, Tuple[int, ...]]) -> Optional[Tuple[int, int, int]]:
+    """Resolve a color as PIL draws it on an RGB image, or None for colors with alpha."""
+    if isinstance(color, str):
+        return ImageColor.getcolor(color, "RGB")
+    if len(color) != 3:
+        return None
+    return tuple(color)
+
+
+def _buffer_bytes(buffer: Union[Image.Image, np.ndarray]) -> int:
+    """Approximate memory of a scratch array or PIL image, which stores RGB pixels in four bytes."""
+    if isinstance(buffer, np.ndarray):
+        return buffer.nbytes
+    width, height = buffer.size
+    return width * height * (1 if buffer.mode in ("1", "L", "P") else 4)
@@ -0,0 +1,315 @@
+"""
+Print imposition of QR code labels into multi-page PDF files.
+
+Jobs are consumed as a stream and laid out on a grid of labels. Every QR code
+is drawn as vector rectangles built from its module matrix, and each page is
+written to disk as soon as it is full, so memory use does not grow with the
+number of jobs.
+"""
+
+import zlib
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional, Tuple, Union
+
+from PIL import ImageColor
+
+from .generator import QRGenerator
+from .spec import RenderSpec
+
+MM_TO_PT = 72 / 25.4
+
+# Page sizes in millimetres
+PAGE_SIZES = {
+    "a4": (210.0, 297.0),
+    "letter": (215.9, 279.4),
+    "a3": (297.0, 420.0),
+}
+
+# Helvetica advance widths (1/1000 em) for ASCII 32-126, used to center titles
+_HELVETICA_WIDTHS = [
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556,
+    278, 278, 584, 584, 584, 556, 1015,
+    667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833,
+    722, 778, 667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611,
+    278, 278, 278, 469, 556, 333,
+    556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833,
+    556, 556, 556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500,
+    334, 260, 334, 584,
+]
+
+
+class SheetSpec:
+    """
+    Label sheet geometry, in millimetres.
+    """
+
+    def __init__(
+        self,
+        rows: int,
+        columns: int,
+        page_size: Union[str, Tuple[float, float]] = "a4",
+        margin: float = 10.0,
+        gap: float = 0.0,
+        bleed: float = 0.0,
+        padding: float = 3.0,
+        title_size: float = 10.0,
+        label_color: Optional[Union[str, Tuple[int, int, int]]] = None,
+    ):
+        """
+        Initialize the sheet spec.
+
+        Args:
+            rows: Number of label rows per page
+            columns: Number of label columns per page
+            page_size: Page size name from PAGE_SIZES or (width, height) in mm
+            margin: Page margin around the label grid in mm
+            gap: Space between labels in mm
+            bleed: Bleed added around the page and around label backgrounds in mm
+            padding: Blank space inside each label around its content in mm
+            title_size: Font size of label titles in points
+            label_color: Background color of each label (None leaves it unprinted)
+        """
+        if isinstance(page_size, str):
+            try:
+                page_size = PAGE_SIZES[page_size.lower()]
+            except KeyError:
+                raise ValueError(f"Unknown page size: {page_size}. Available sizes: {', '.join(PAGE_SIZES)}")
+
+        self.rows = rows
+        self.columns = columns
+        self.page_width, self.page_height = page_size
+        self.margin = margin
+        self.gap = gap
+        self.bleed = bleed
+        self.padding = padding
+        self.title_size = title_size
+        self.label_color = label_color
+
+        self.label_width = (self.page_width - 2 * margin - (columns - 1) * gap) / columns
+        self.label_height = (self.page_height - 2 * margin - (rows - 1) * gap) / rows
+        if self.label_width <= 2 * padding or self.label_height <= 2 * padding:
+            raise ValueError("Sheet spec leaves no room for labels")
+
+    @property
+    def labels_per_page(self) -> int:
+        """Number of labels on one page."""
+        return self.rows * self.columns
+
+    def label_box(self, slot: int) -> Tuple[float, float, float, float]:
+        """
+        Get the trim box of a label in PDF points.
+
+        Args:
+            slot: Label index on the page, row by row from the top left
+
+        Returns:
+            (x, y, width, height) with y measured from the bottom of the media box
+        """
+        row, column = divmod(slot, self.columns)
+        x = self.bleed + self.margin + column * (self.label_width + self.gap)
+        top = self.bleed + self.margin + row * (self.label_height + self.gap)
+        y = self.bleed + self.page_height - top - self.label_height
+        return (x * MM_TO_PT, y * MM_TO_PT, self.label_width * MM_TO_PT, self.label_height * MM_TO_PT)
+
+
+def _pdf_color(color: Union[str, Tuple[int, int, int]]) -> str:
+    """Format a color as PDF RGB operands."""
+    r, g, b = ImageColor.getrgb(color)[:3] if isinstance(color, str) else color
+    return f"{r / 255:.4g} {g / 255:.4g} {b / 255:.4g}"
+
+
+def _pdf_text(text: str) -> bytes:
+    """Encode text as a PDF literal string in WinAnsi encoding."""
+    raw = text.encode("cp1252", errors="replace")
+    return b"(" + raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def _text_width(text: str, size: float) -> float:
+    """Approximate the width of Helvetica text in points."""
+    total = 0
+    for char in text:
+        code = ord(char)
+        total += _HELVETICA_WIDTHS[code - 32] if 32 <= code <= 126 else 556
+    return total * size / 1000
+
+
+def matrix_path(matrix: List[List[bool]], x: float, y: float, module: float) -> str:
+    """
+    Build PDF path operators for the dark modules of a matrix.
+
+    Horizontal runs of dark modules are merged into one rectangle each.
+
+    Args:
+        matrix: Module rows, True for dark modules
+        x: Left edge of the code in points
+        y: Top edge of the code in points
+        module: Module size in points
+
+    Returns:
+        Rectangle operators, to be followed by a fill operator
+    """
+    parts = []
+    for r, row in enumerate(matrix):
+        top = y - (r + 1) * module
+        start = None
+        for c, dark in enumerate(row + [False]):
+            if dark and start is None:
+                start = c
+            elif not dark and start is not None:
+                parts.append(f"{x + start * module:.3f} {top:.3f} {(c - start) * module:.3f} {module:.3f} re")
+                start = None
+    return "\n".join(parts)
+
+
+class _PdfStream:
+    """Minimal PDF writer that emits pages as they are completed."""
+
+    def __init__(self, f: BinaryIO, media_box: Tuple[float, float], trim_box: Tuple[float, ...]):
+        self.f = f
+        self.media_box = media_box
+        self.trim_box = trim_box
+        self.offsets: Dict[int, int] = {}
+        self.page_ids: List[int] = []
+        # Objects 1-3 are the catalog, the page tree and the font
+        self.next_id = 4
+
+        f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self._write_object(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+
+    def _write_object(self, obj_id: int, body: bytes) -> None:
+        self.offsets[obj_id] = self.f.tell()
+        self.f.write(f"{obj_id} 0 obj\n".encode() + body + b"\nendobj\n")
+
+    def add_page(self, content: bytes) -> None:
+        """Compress and write one page with its content stream."""
+        content_id, page_id = self.next_id, self.next_id + 1
+        self.next_id += 2
+
+        data = zlib.compress(content)
+        self._write_object(
+            content_id,
+            f"<< /Length {len(data)} /Filter /FlateDecode >>\nstream\n".encode() + data + b"\nendstream",
+        )
+        media = " ".join(f"{v:.3f}" for v in (0, 0) + self.media_box)
+        trim = " ".join(f"{v:.3f}" for v in self.trim_box)
+        self._write_object(
+            page_id,
+            (
+                f"<< /Type /Page /Parent 2 0 R /MediaBox [{media}] /TrimBox [{trim}] "
+                f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>"
+            ).encode(),
+        )
+        self.page_ids.append(page_id)
+
+    def close(self) -> None:
+        """Write the page tree, catalog, cross-reference table and trailer."""
+        kids = " ".join(f"{page_id} 0 R" for page_id in self.page_ids)
+        self._write_object(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.page_ids)} >>".encode())
+        self._write_object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+
+        xref_offset = self.f.tell()
+        size = self.next_id
+        lines = [f"xref\n0 {size}\n", "0000000000 65535 f \n"]
+        for obj_id in range(1, size):
+            lines.append(f"{self.offsets[obj_id]:010d} 00000 n \n")
+        self.f.write("".join(lines).encode())
+        self.f.write(f"trailer\n<< /Size {size} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+
+
+def impose_pdf(
+    jobs: Iterable[Dict[str, Any]],
+    output_path: str,
+    sheet: SheetSpec,
+    generator: Optional[QRGenerator] = None,
+) -> int:
+    """
+    Lay out a stream of QR code jobs on label sheets and write a multi-page PDF.
+
+    Args:
+        jobs: Iterable of jobs, each with ``content`` and optionally ``title``,
+            ``version``, ``error_correction`` (a qrcode constant or "L", "M",
+            "Q" or "H"), ``border``, ``fg_color``, ``bg_color`` and ``title_color``
+        output_path: Path of the PDF file to write
+        sheet: The label sheet spec
+        generator: QR generator used to encode content
+
+    Returns:
+        The number of labels written
+
+    Raises:
+        ValueError: If a job's options are invalid or its label leaves no
+            room for the code
+    """
+    generator = generator or QRGenerator()
+
+    bleed = sheet.bleed * MM_TO_PT
+    media_box = ((sheet.page_width + 2 * sheet.bleed) * MM_TO_PT, (sheet.page_height + 2 * sheet.bleed) * MM_TO_PT)
+    trim_box = (bleed, bleed, media_box[0] - bleed, media_box[1] - bleed)
+    padding = sheet.padding * MM_TO_PT
+    label_fill = _pdf_color(sheet.label_color) if sheet.label_color else None
+
+    count = 0
+    page: List[str] = []
+
+    with open(output_path, "wb") as f:
+        pdf = _PdfStream(f, media_box, trim_box)
+
+        for job in jobs:
+            slot = count % sheet.labels_per_page
+            if slot == 0 and page:
+                pdf.add_page("\n".join(page).encode("latin-1"))
+                page = []
+
+            x, y, width, height = sheet.label_box(slot)
+
+            if label_fill:
+                page.append(f"{label_fill} rg {x - bleed:.3f} {y - bleed:.3f} "
+                            f"{width + 2 * bleed:.3f} {height + 2 * bleed:.3f} re f")
+
+            top = y + height - padding
+            title = job.get("title")
+            if title:
+                size = sheet.title_size
+                text_x = x + (width - _text_width(title, size)) / 2
+                top -= size
+                page.append(
+                    f"{_pdf_color(job.get('title_color', 'black'))} rg BT /F1 {size:g} Tf "
+                    f"{text_x:.3f} {top + size * 0.2:.3f} Td "
+                    + _pdf_text(title).decode("latin-1")
+                    + " Tj ET"
+                )
+                top -= size * 0.4
+
+            # Options are validated and level names mapped as for every other command
+            spec = RenderSpec(
+                job["content"],
+                version=job.get("version"),
+                error_correction=job.get("error_correction"),
+                border=job.get("border"),
+            )
+            matrix = generator.make_matrix(spec.content, spec.version, spec.error_correction, spec.border)
+            side = min(width - 2 * padding, top - (y + padding))
+            if side <= 0:
+                raise ValueError(
+                    f"Label {count + 1} leaves no room for the code; "
+                    f"use a shorter title, less padding or larger labels"
+                )
+            module = side / len(matrix)
+            code_x = x + (width - side) / 2
+            code_top = top - (top - (y + padding) - side) / 2
+
+            # Light modules and the quiet zone must stay light on colored labels
+            bg_color = job.get("bg_color", "white" if label_fill else None)
+            if bg_color:
+                page.append(f"{_pdf_color(bg_color)} rg {code_x:.3f} {code_top - side:.3f} {side:.3f} {side:.3f} re f")
+
+            page.append(f"{_pdf_color(job.get('fg_color', 'black'))} rg")
+            page.append(matrix_path(matrix, code_x, code_top, module))
+            page.append("f")
+            count += 1
+
+        if page:
+            pdf.add_page("\n".join(page).encode("latin-1"))
+        pdf.close()
+
+    return count
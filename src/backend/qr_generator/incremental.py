@@ -0,0 +1,197 @@
+"""
+Incremental rendering with per-stage caches.
+
+Rendering a QR code runs three stages: encoding the content into a module
+matrix, rasterizing the matrix with colors, and adding the title band. Each
+stage result is cached under the parameters it depends on, so a change to
+the colors only re-runs rasterization and a change to the title only re-runs
+the title stage.
+"""
+
+import io
+from typing import Dict, Hashable, List, Optional, Tuple, Union
+
+import qrcode
+from PIL import Image
+
+from .cache import LRUCache
+from .generator import QRGenerator
+from .spec import RenderSpec
+from .styles import QRStyle
+
+Color = Union[str, Tuple[int, int, int]]
+
+# Bytes each stage cache of an IncrementalRenderer may hold
+DEFAULT_STAGE_CACHE_BYTES = 64 * 1024 * 1024
+
+
+def _image_nbytes(img: Image.Image) -> int:
+    """Get the size of an image's pixel data."""
+    return img.width * img.height * len(img.getbands())
+
+
+def _matrix_nbytes(qr: qrcode.QRCode) -> int:
+    """Estimate the size of a compiled code, one list slot per module."""
+    return 8 * qr.modules_count * qr.modules_count
+
+
+class IncrementalRenderer:
+    """
+    Render QR codes, reusing cached intermediate stages across calls.
+    """
+
+    def __init__(self, generator: Optional[QRGenerator] = None, max_bytes: int = DEFAULT_STAGE_CACHE_BYTES):
+        """
+        Initialize the renderer.
+
+        Args:
+            generator: QR generator providing defaults and stage implementations
+            max_bytes: Maximum size of the cached results of each stage, counting
+                images by their pixel data
+        """
+        self.generator = generator or QRGenerator()
+        self._matrices = LRUCache(None, max_bytes, _matrix_nbytes)
+        self._rasters = LRUCache(None, max_bytes, _image_nbytes)
+        self._images = LRUCache(None, max_bytes, _image_nbytes)
+
+    def _encode(self, spec: RenderSpec) -> Tuple[Hashable, qrcode.QRCode]:
+        """Matrix stage: depends on the content and the encoding options only."""
+        key = spec.matrix_key
+        qr = self._matrices.get(key)
+        if qr is None:
+            qr = self.generator._make_qr(
+                spec.content, spec.version, spec.error_correction, None, spec.border, spec.mask_pattern
+            )
+            self._matrices.put(key, qr)
+        return key, qr
+
+    def _rasterize(
+        self, matrix_key: Hashable, qr: qrcode.QRCode, box_size: int, spec: RenderSpec
+    ) -> Tuple[Hashable, Image.Image]:
+        """Raster stage: depends on the matrix, box size, colors and style."""
+        key = (matrix_key, box_size, spec.fg_color, spec.bg_color, spec.style)
+        img = self._rasters.get(key)
+        if img is None:
+            # Compiled codes are shared between raster entries, so never mutate them
+            qr = _with_box_size(qr, box_size)
+            img = self.generator.rasterize(qr, spec.fg_color, spec.bg_color, spec.style)
+            self._rasters.put(key, img)
+        return key, img
+
+    def matrix(
+        self,
+        content: str,
+        version: Optional[int] = None,
+        error_correction: Optional[int] = None,
+        border: Optional[int] = None,
+    ) -> List[List[bool]]:
+        """
+        Get the module matrix of a QR code from the cached matrix stage.
+
+        Args:
+            content: The content to encode in the QR code
+            version: QR code version (1-40, controls size)
+            error_correction: Error correction level
+            border: Border size in boxes
+
+        Returns:
+            Rows of modules including the border, True for dark modules
+        """
+        spec = RenderSpec(content, version, error_correction, border=border).resolve(self.generator)
+        _, qr = self._encode(spec)
+        return qr.get_matrix()
+
+    def render(
+        self,
+        content: str,
+        version: Optional[int] = None,
+        error_correction: Optional[int] = None,
+        box_size: Optional[int] = None,
+        border: Optional[int] = None,
+        fg_color: Optional[Color] = None,
+        bg_color: Optional[Color] = None,
+        title: Optional[str] = None,
+        style: Optional[QRStyle] = None,
+    ) -> Image.Image:
+        """
+        Render a QR code, recomputing only the stages invalidated by changed options.
+
+        Takes the same options as QRGenerator.render. The returned image is
+        shared with the cache and must not be modified.
+
+        Returns:
+            The rendered image
+        """
+        # Equal renders share cache entries however their options were spelled
+        spec = RenderSpec(
+            content,
+            version=version,
+            error_correction=error_correction,
+            box_size=box_size,
+            border=border,
+            fg_color=fg_color,
+            bg_color=bg_color,
+            title=title,
+            style=style,
+        ).resolve(self.generator)
+
+        matrix_key, qr = self._encode(spec)
+        # Check the image size against the budget before rasterizing
+        box_size = self.generator.plan(
+            qr, spec.box_size, spec.fg_color, spec.bg_color, spec.title, style=spec.style
+        ).box_size
+        raster_key, qr_img = self._rasterize(matrix_key, qr, box_size, spec)
+
+        if not spec.title:
+            return qr_img
+
+        key = (raster_key, spec.title)
+        img = self._images.get(key)
+        if img is None:
+            img = self.generator._add_title_to_image(qr_img, spec.title)
+            self._images.put(key, img)
+        return img
+
+    def render_png(self, content: str, **options) -> bytes:
+        """
+        Render a QR code and encode it as PNG.
+
+        Args:
+            content: The content to encode in the QR code
+            **options: Options accepted by render
+
+        Returns:
+            The PNG data
+        """
+        buffer = io.BytesIO()
+        self.render(content, **options).save(buffer, format="PNG")
+        return buffer.getvalue()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Get cache statistics per stage.
+
+        Returns:
+            Entry count, size in bytes, hits and misses for the matrix,
+            raster and title stages
+        """
+        return {
+            "matrix": self._matrices.stats(),
+            "raster": self._rasters.stats(),
+            "title": self._images.stats(),
+        }
+
+
+def _with_box_size(qr: qrcode.QRCode, box_size: int) -> qrcode.QRCode:
+    """Get a shallow copy of a compiled QR code with a different box size."""
+    sized = qrcode.QRCode(
+        version=qr.version,
+        error_correction=qr.error_correction,
+        box_size=box_size,
+        border=qr.border,
+    )
+    sized.modules = qr.modules
+    sized.modules_count = qr.modules_count
+    sized.data_cache = qr.data_cache
+    sized.data_list = qr.data_list
+    return sized
@@ -0,0 +1,571 @@
+"""
+Durable background jobs for large generation requests.
+
+Jobs are lists of worker jobs (see worker.run_job) stored in a local SQLite
+queue. Worker processes claim jobs under a lease, report progress as items
+complete and write every output, plus a ``results.jsonl`` line per item, to
+an artifact directory that is zipped when the job is done. Items that
+render the same code as an earlier item of the job are linked to its
+output, and their result line names it in ``duplicate_of``. A worker that
+dies loses its lease; the job is then claimed again and resumes after the
+last item recorded on disk, up to the job's attempt limit. Results are
+recorded only by the worker holding the lease, so a worker that lost its
+lease cannot overwrite them. Workers periodically expire finished jobs past
+their retention period, deleting them with their artifacts.
+"""
+
+import json
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from contextlib import closing
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from .dedup import Deduplicator
+from .generator import QRGenerator
+from .planner import PixelBudget
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    items TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0,
+    failed_items INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    worker TEXT,
+    lease_until REAL,
+    error TEXT,
+    artifact TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created);
+"""
+
+DEFAULT_JOB_DB = os.environ.get(
+    "JOB_DB_PATH", os.path.join(tempfile.gettempdir(), "qr-jobs", "jobs.sqlite3")
+)
+DEFAULT_ARTIFACT_DIR = os.environ.get(
+    "JOB_ARTIFACT_DIR", os.path.join(tempfile.gettempdir(), "qr-jobs", "artifacts")
+)
+
+# Seconds between progress updates while a job runs
+PROGRESS_INTERVAL = 0.5
+
+# Name of the item results of a job, in its directory and archive
+RESULTS_NAME = "results.jsonl"
+
+# Seconds finished jobs and their artifacts are kept
+DEFAULT_RETENTION = float(os.environ.get("JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+
+# Seconds between the retention sweeps of a worker
+SWEEP_INTERVAL = 300.0
+
+
+class JobQueue:
+    """
+    A job queue in a SQLite database shared by the web tier and worker processes.
+
+    Every call opens its own connection, so a queue can be used from any
+    thread or process.
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 60.0, max_attempts: int = 3):
+        """
+        Initialize the queue, creating the database if needed.
+
+        Args:
+            path: Path of the SQLite database
+            lease_seconds: Seconds a worker holds a job without reporting progress
+            max_attempts: Default number of times a job is tried before it fails
+        """
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection in autocommit mode; transactions are explicit."""
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def submit(self, items: Sequence[Dict[str, Any]], max_attempts: Optional[int] = None) -> str:
+        """
+        Queue a job.
+
+        Args:
+            items: Worker jobs to run; ``output`` is ignored and an optional
+                ``name`` sets the file name inside the job's artifact
+            max_attempts: Number of times the job is tried before it fails
+
+        Returns:
+            The job ID
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, items, total, max_attempts, created, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, QUEUED, json.dumps(list(items)), len(items), max_attempts or self.max_attempts, now, now),
+            )
+        return job_id
+
+    def claim(self, worker: str) -> Optional[Dict[str, Any]]:
+        """
+        Claim the oldest queued job, or a running job whose lease has expired.
+
+        Args:
+            worker: ID of the claiming worker
+
+        Returns:
+            The job with its items, or None if there is nothing to do
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            while True:
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE status = ? OR (status = ? AND lease_until < ?) "
+                    "ORDER BY created LIMIT 1",
+                    (QUEUED, RUNNING, now),
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+
+                if row["attempts"] >= row["max_attempts"]:
+                    # The last attempt's worker died
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, error = ?, worker = NULL, updated = ? WHERE id = ?",
+                        (FAILED, row["error"] or "Worker stopped responding", now, row["id"]),
+                    )
+                    continue
+
+                conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, worker = ?, lease_until = ?, updated = ? "
+                    "WHERE id = ?",
+                    (RUNNING, worker, now + self.lease_seconds, now, row["id"]),
+                )
+                conn.execute("COMMIT")
+
+                job = dict(row)
+                job["items"] = json.loads(job["items"])
+                job["attempts"] += 1
+                return job
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _update_held(self, sql: str, params: Sequence[Any], commit: Optional[Callable[[], None]]) -> bool:
+        """
+        Update a job the worker named in the update still holds.
+
+        The job stays locked while commit runs, so no other worker can claim
+        it between the lease check and the commit.
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            held = conn.execute(sql, params).rowcount == 1
+            if held and commit is not None:
+                commit()
+            conn.execute("COMMIT")
+            return held
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def progress(
+        self,
+        job_id: str,
+        worker: str,
+        completed: int,
+        failed_items: int,
+        commit: Optional[Callable[[], None]] = None,
+    ) -> bool:
+        """
+        Record progress and renew the lease.
+
+        Args:
+            job_id: The job ID
+            worker: ID of the worker running the job
+            completed: Number of items done
+            failed_items: Number of items that failed
+            commit: Publishes the worker's results; called only if the
+                worker still holds the job
+
+        Returns:
+            Whether the worker still holds the job
+        """
+        now = time.time()
+        return self._update_held(
+            "UPDATE jobs SET completed = ?, failed_items = ?, lease_until = ?, updated = ? "
+            "WHERE id = ? AND worker = ? AND status = ?",
+            (completed, failed_items, now + self.lease_seconds, now, job_id, worker, RUNNING),
+            commit,
+        )
+
+    def finish(
+        self,
+        job_id: str,
+        worker: str,
+        artifact: str,
+        failed_items: int,
+        commit: Optional[Callable[[], None]] = None,
+    ) -> bool:
+        """
+        Mark a job done.
+
+        Args:
+            job_id: The job ID
+            worker: ID of the worker running the job
+            artifact: Path of the result archive
+            failed_items: Number of items that failed
+            commit: Publishes the worker's results and archive; called only
+                if the worker still holds the job
+
+        Returns:
+            Whether the worker still held the job
+        """
+        now = time.time()
+        return self._update_held(
+            "UPDATE jobs SET status = ?, completed = total, failed_items = ?, artifact = ?, error = NULL, "
+            "worker = NULL, lease_until = NULL, updated = ? WHERE id = ? AND worker = ? AND status = ?",
+            (DONE, failed_items, artifact, now, job_id, worker, RUNNING),
+            commit,
+        )
+
+    def fail(self, job_id: str, worker: str, error: str) -> None:
+        """
+        Record a failed attempt, queueing the job again unless it is out of attempts.
+
+        Args:
+            job_id: The job ID
+            worker: ID of the worker running the job
+            error: Description of the failure
+        """
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts < max_attempts THEN ? ELSE ? END, "
+                "error = ?, worker = NULL, lease_until = NULL, updated = ? WHERE id = ? AND worker = ?",
+                (QUEUED, FAILED, error, now, job_id, worker),
+            )
+
+    def expire(self, artifact_dir: str, retention: float) -> List[str]:
+        """
+        Delete finished jobs older than the retention period, with their artifacts.
+
+        The jobs stay locked while their files are removed, so a job is only
+        forgotten once its artifacts are gone.
+
+        Args:
+            artifact_dir: Directory of job outputs and archives
+            retention: Seconds a job is kept after it finished or failed
+
+        Returns:
+            The IDs of the deleted jobs
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            job_ids = [row["id"] for row in conn.execute(
+                "SELECT id FROM jobs WHERE status IN (?, ?) AND updated < ?",
+                (DONE, FAILED, time.time() - retention),
+            )]
+            for job_id in job_ids:
+                conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+                shutil.rmtree(os.path.join(artifact_dir, job_id), ignore_errors=True)
+                archive = os.path.join(artifact_dir, f"{job_id}.zip")
+                if os.path.exists(archive):
+                    os.remove(archive)
+            conn.execute("COMMIT")
+            return job_ids
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the status of a job.
+
+        Args:
+            job_id: The job ID
+
+        Returns:
+            The job's state and progress, or None if there is no such job
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT id, status, total, completed, failed_items, attempts, max_attempts, error, artifact, "
+                "created, updated FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        status = dict(row)
+        status["progress"] = status["completed"] / status["total"] if status["total"] else 1.0
+        return status
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Count jobs per state.
+
+        Returns:
+            The number of queued, running, done and failed jobs
+        """
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        counts.update({status: count for status, count in rows})
+        return counts
+
+
+def _item_filename(item: Dict[str, Any], index: int) -> str:
+    """Pick a safe file name for an item's output inside the job directory."""
+    name = os.path.basename(str(item.get("name") or "")).lstrip(".")
+    return f"{index:06d}-{name}" if name else f"{index:06d}.png"
+
+
+def _recorded_results(results_path: str) -> List[Dict[str, Any]]:
+    """Read the item results written by earlier attempts, dropping a torn last line."""
+    results = []
+    if os.path.exists(results_path):
+        with open(results_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    results.append(json.loads(line))
+                except ValueError:
+                    break
+    return results
+
+
+def process_job(
+    queue: JobQueue,
+    job: Dict[str, Any],
+    artifact_dir: str,
+    generator: QRGenerator,
+    worker: str,
+    link: Optional[str] = "hardlink",
+) -> bool:
+    """
+    Run the items of a claimed job and archive the outputs.
+
+    Args:
+        queue: The queue the job was claimed from
+        job: The claimed job
+        artifact_dir: Directory for job outputs and archives
+        generator: The QR generator instance to use
+        worker: ID of the worker running the job
+        link: How items that render the same code as an earlier item are
+            written, one of dedup.LINK_MODES; None renders every item
+
+    Returns:
+        Whether the job finished; False if the lease was lost to another worker
+    """
+    job_id = job["id"]
+    job_dir = os.path.join(artifact_dir, job_id)
+    os.makedirs(job_dir, exist_ok=True)
+    results_path = os.path.join(job_dir, RESULTS_NAME)
+    # Results are written to a file of this worker's own and published over
+    # results.jsonl only while the worker holds the job
+    partial = f"{results_path}.{worker}"
+
+    def publish() -> None:
+        published = f"{partial}.publish"
+        shutil.copyfile(partial, published)
+        os.replace(published, results_path)
+
+    # Resume after the items finished by earlier attempts
+    results = _recorded_results(results_path)
+    failed_items = sum(1 for result in results if not result.get("success"))
+
+    dedup = Deduplicator(generator, link)
+    if link is not None:
+        for index, result in enumerate(results):
+            if result.get("success"):
+                output = os.path.join(job_dir, result["output"])
+                dedup.add(dedup.key(dict(job["items"][index], output=output)), output, result)
+
+    archive = os.path.join(artifact_dir, f"{job_id}.zip")
+    archive_partial = f"{archive}.{worker}.part"
+    try:
+        with open(partial, "w", encoding="utf-8") as f:
+            for result in results:
+                f.write(json.dumps(result) + "\n")
+
+            last_report = time.monotonic()
+            for index in range(len(results), len(job["items"])):
+                item = dict(job["items"][index])
+                filename = _item_filename(item, index)
+                item["output"] = os.path.join(job_dir, filename)
+                item["id"] = index
+
+                reply = dedup.run(item)
+                if reply.get("success"):
+                    reply["output"] = filename
+                    if "duplicate_of" in reply:
+                        reply["duplicate_of"] = os.path.basename(reply["duplicate_of"])
+                else:
+                    failed_items += 1
+                f.write(json.dumps(reply) + "\n")
+                f.flush()
+
+                if time.monotonic() - last_report >= PROGRESS_INTERVAL:
+                    last_report = time.monotonic()
+                    if not queue.progress(job_id, worker, index + 1, failed_items, commit=publish):
+                        return False
+
+        # Images are already compressed
+        with zipfile.ZipFile(archive_partial, "w", zipfile.ZIP_STORED) as zf:
+            for name in sorted(os.listdir(job_dir)):
+                if not name.startswith(RESULTS_NAME):
+                    zf.write(os.path.join(job_dir, name), name)
+            zf.write(partial, RESULTS_NAME)
+
+        def commit() -> None:
+            publish()
+            os.replace(archive_partial, archive)
+
+        return queue.finish(job_id, worker, archive, failed_items, commit=commit)
+    finally:
+        for path in (partial, archive_partial):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def run_worker(
+    queue: JobQueue,
+    artifact_dir: str,
+    generator: Optional[QRGenerator] = None,
+    poll_interval: float = 1.0,
+    stop: Optional[threading.Event] = None,
+    once: bool = False,
+    retention: Optional[float] = DEFAULT_RETENTION,
+) -> int:
+    """
+    Claim and run jobs until stopped.
+
+    Args:
+        queue: The job queue
+        artifact_dir: Directory for job outputs and archives
+        generator: The QR generator instance to use
+        poll_interval: Seconds to wait when the queue is empty
+        stop: Event that stops the worker between jobs
+        once: Return as soon as the queue is empty
+        retention: Seconds finished jobs are kept before they are expired;
+            None keeps them forever
+
+    Returns:
+        The number of jobs processed
+    """
+    generator = generator or QRGenerator()
+    stop = stop or threading.Event()
+    worker = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    count = 0
+    last_sweep = None
+
+    while not stop.is_set():
+        if retention is not None and (last_sweep is None or time.monotonic() - last_sweep >= SWEEP_INTERVAL):
+            last_sweep = time.monotonic()
+            queue.expire(artifact_dir, retention)
+
+        job = queue.claim(worker)
+        if job is None:
+            if once:
+                break
+            stop.wait(poll_interval)
+            continue
+
+        try:
+            process_job(queue, job, artifact_dir, generator, worker)
+        except Exception as e:
+            queue.fail(job["id"], worker, str(e))
+        count += 1
+
+    return count
+
+
+def _worker_main(
+    db_path: str,
+    artifact_dir: str,
+    encoder: Optional[str],
+    budget: Optional[PixelBudget],
+    lease_seconds: float,
+    retention: Optional[float],
+) -> None:
+    """Entry point of a worker process."""
+    try:
+        queue = JobQueue(db_path, lease_seconds=lease_seconds)
+        run_worker(queue, artifact_dir, QRGenerator(encoder=encoder, budget=budget), retention=retention)
+    except KeyboardInterrupt:
+        pass
+
+
+def start_workers(
+    db_path: str,
+    artifact_dir: str,
+    processes: int = 1,
+    encoder: Optional[str] = None,
+    budget: Optional[PixelBudget] = None,
+    lease_seconds: float = 60.0,
+    retention: Optional[float] = DEFAULT_RETENTION,
+) -> List[multiprocessing.Process]:
+    """
+    Start worker processes.
+
+    Args:
+        db_path: Path of the SQLite database
+        artifact_dir: Directory for job outputs and archives
+        processes: Number of worker processes
+        encoder: Matrix encoder backend of the workers
+        budget: Pixel and memory limits of the workers
+        lease_seconds: Seconds a worker holds a job without reporting progress
+        retention: Seconds finished jobs are kept before they are expired;
+            None keeps them forever
+
+    Returns:
+        The started (daemon) processes
+    """
+    workers = []
+    for index in range(processes):
+        process = multiprocessing.Process(
+            target=_worker_main,
+            args=(db_path, artifact_dir, encoder, budget, lease_seconds, retention),
+            name=f"qr-job-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+        workers.append(process)
+    return workers
@@ -0,0 +1,481 @@
+"""
+NumPy-vectorized QR matrix encoder.
+
+Produces exactly the same module matrices as qrcode.QRCode.make, but computes
+Reed-Solomon codewords from precomputed Galois-field tables and applies and
+scores all eight mask patterns with array operations instead of Python loops.
+"""
+
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import qrcode
+from qrcode import base, exceptions, util
+
+from .encoders import QRCodeEncoder
+
+
+def _gf_tables() -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Build GF(256) exponent, logarithm and full multiplication tables."""
+    exp = np.zeros(512, dtype=np.int32)
+    log = np.zeros(256, dtype=np.int32)
+    value = 1
+    for i in range(255):
+        exp[i] = value
+        log[value] = i
+        value <<= 1
+        if value & 0x100:
+            value ^= 0x11D
+    exp[255:510] = exp[:255]
+
+    nonzero = np.arange(1, 256)
+    mul = np.zeros((256, 256), dtype=np.uint8)
+    mul[1:, 1:] = exp[log[nonzero][:, None] + log[nonzero][None, :]]
+    return exp, log, mul
+
+
+def _freeze(*arrays: np.ndarray) -> None:
+    """Make arrays read-only, so cached tables can be shared between threads."""
+    for array in arrays:
+        array.flags.writeable = False
+
+
+GF_EXP, GF_LOG, GF_MUL = _gf_tables()
+_freeze(GF_EXP, GF_LOG, GF_MUL)
+
+
+@lru_cache(maxsize=None)
+def _generator_polynomial(ec_count: int) -> np.ndarray:
+    """Get the Reed-Solomon generator polynomial coefficients, highest degree first."""
+    poly = np.array([1], dtype=np.uint8)
+    for i in range(ec_count):
+        # Multiply by (x + alpha^i)
+        shifted = np.append(poly, 0)
+        scaled = np.insert(GF_MUL[poly, GF_EXP[i]], 0, 0)
+        poly = shifted ^ scaled
+    _freeze(poly)
+    return poly
+
+
+def reed_solomon_remainders(blocks: np.ndarray, ec_count: int) -> np.ndarray:
+    """
+    Compute error correction codewords for equally sized data blocks at once.
+
+    Args:
+        blocks: Array of shape (block_count, data_count) with data codewords
+        ec_count: Number of error correction codewords per block
+
+    Returns:
+        Array of shape (block_count, ec_count)
+    """
+    generator = _generator_polynomial(ec_count)[1:]
+    remainder = np.zeros((blocks.shape[0], ec_count), dtype=np.uint8)
+    for i in range(blocks.shape[1]):
+        factor = blocks[:, i] ^ remainder[:, 0]
+        remainder[:, :-1] = remainder[:, 1:]
+        remainder[:, -1] = 0
+        remainder ^= GF_MUL[factor[:, None], generator[None, :]]
+    return remainder
+
+
+class _BitWriter:
+    """Bit buffer compatible with qrcode's BitBuffer, backed by a single integer."""
+
+    def __init__(self):
+        self.value = 0
+        self.length = 0
+
+    def put(self, num: int, length: int) -> None:
+        self.value = (self.value << length) | (num & ((1 << length) - 1))
+        self.length += length
+
+    def put_bit(self, bit: bool) -> None:
+        self.put(1 if bit else 0, 1)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def to_bytes(self) -> bytes:
+        return self.value.to_bytes(self.length // 8, "big")
+
+
+def create_codewords(
+    version: int,
+    error_correction: int,
+    data_list: Sequence[util.QRData],
+    header: Optional[Tuple[int, int]] = None,
+) -> List[int]:
+    """
+    Build the final interleaved data and error correction codewords.
+
+    Mirrors qrcode.util.create_data.
+
+    Args:
+        version: QR code version
+        error_correction: Error correction level
+        data_list: Data segments to encode
+        header: Optional (value, bit_length) written before the first segment
+
+    Returns:
+        The codewords in placement order
+    """
+    buffer = _BitWriter()
+    if header is not None:
+        buffer.put(*header)
+    for data in data_list:
+        buffer.put(data.mode, 4)
+        buffer.put(len(data), util.length_in_bits(data.mode, version))
+        data.write(buffer)
+
+    rs_blocks = base.rs_blocks(version, error_correction)
+    bit_limit = sum(block.data_count * 8 for block in rs_blocks)
+    if len(buffer) > bit_limit:
+        raise exceptions.DataOverflowError(
+            "Code length overflow. Data size (%s) > size available (%s)" % (len(buffer), bit_limit)
+        )
+
+    # Terminator and byte alignment
+    buffer.put(0, min(bit_limit - len(buffer), 4))
+    if len(buffer) % 8:
+        buffer.put(0, 8 - len(buffer) % 8)
+
+    data = buffer.to_bytes()
+    pad = bytes([util.PAD0, util.PAD1]) * (bit_limit // 16 + 1)
+    data = np.frombuffer(data + pad[:bit_limit // 8 - len(data)], dtype=np.uint8)
+
+    # Error correction per group of equally sized blocks
+    dcdata: List[np.ndarray] = []
+    ecdata: List[np.ndarray] = []
+    offset = 0
+    index = 0
+    while index < len(rs_blocks):
+        block = rs_blocks[index]
+        count = 1
+        while index + count < len(rs_blocks) and (
+            rs_blocks[index + count].data_count == block.data_count
+            and rs_blocks[index + count].total_count == block.total_count
+        ):
+            count += 1
+        group = data[offset:offset + count * block.data_count].reshape(count, block.data_count)
+        remainders = reed_solomon_remainders(group, block.total_count - block.data_count)
+        dcdata.extend(group)
+        ecdata.extend(remainders)
+        offset += count * block.data_count
+        index += count
+
+    # Interleave column by column, skipping the gaps of shorter blocks
+    codewords: List[int] = []
+    for blocks in (dcdata, ecdata):
+        longest = max(len(block) for block in blocks)
+        table = np.full((len(blocks), longest), -1, dtype=np.int16)
+        for row, block in enumerate(blocks):
+            table[row, :len(block)] = block
+        column_major = table.T.ravel()
+        codewords.extend(column_major[column_major >= 0].tolist())
+    return codewords
+
+
+def best_fit(data_list: Sequence[util.QRData], error_correction: int, start: Optional[int] = None) -> int:
+    """
+    Find the smallest version that fits the data.
+
+    Mirrors qrcode.QRCode.best_fit without its bit-by-bit buffer.
+
+    Args:
+        data_list: Data segments to encode
+        error_correction: Error correction level
+        start: Minimum version
+
+    Returns:
+        The version
+    """
+    if start is None:
+        start = 1
+    util.check_version(start)
+
+    mode_sizes = util.mode_sizes_for_version(start)
+    buffer = _BitWriter()
+    for data in data_list:
+        buffer.put(data.mode, 4)
+        buffer.put(len(data), mode_sizes[data.mode])
+        data.write(buffer)
+
+    version = bisect_left(util.BIT_LIMIT_TABLE[error_correction], len(buffer), start)
+    if version == 41:
+        raise exceptions.DataOverflowError()
+
+    # Length fields grow with the version; retry if the guess was too low
+    if mode_sizes is not util.mode_sizes_for_version(version):
+        return best_fit(data_list, error_correction, version)
+    return version
+
+
+class _VersionLayout:
+    """Precomputed function patterns, data positions and masks for one version."""
+
+    def __init__(self, version: int):
+        self.version = version
+        n = self.modules_count = version * 4 + 17
+
+        # Lay out the function patterns with qrcode itself, in test mode
+        reference = qrcode.QRCode(version=version)
+        reference.modules_count = n
+        reference.modules = [[None] * n for _ in range(n)]
+        reference.setup_position_probe_pattern(0, 0)
+        reference.setup_position_probe_pattern(n - 7, 0)
+        reference.setup_position_probe_pattern(0, n - 7)
+        reference.setup_position_adjust_pattern()
+        reference.setup_timing_pattern()
+        reference.setup_type_info(True, 0)
+        if version >= 7:
+            reference.setup_type_number(True)
+
+        self.function = np.array([[bool(m) for m in row] for row in reference.modules], dtype=bool)
+        free = np.array([[m is None for m in row] for row in reference.modules], dtype=bool)
+
+        # Data placement order, following qrcode's map_data
+        rows: List[int] = []
+        cols: List[int] = []
+        row, inc = n - 1, -1
+        for col in range(n - 1, 0, -2):
+            if col <= 6:
+                col -= 1
+            while True:
+                for c in (col, col - 1):
+                    if free[row][c]:
+                        rows.append(row)
+                        cols.append(c)
+                row += inc
+                if row < 0 or n <= row:
+                    row -= inc
+                    inc = -inc
+                    break
+        self.data_rows = np.array(rows, dtype=np.intp)
+        self.data_cols = np.array(cols, dtype=np.intp)
+
+        # Mask pattern values at every data position, for all eight masks
+        i = self.data_rows
+        j = self.data_cols
+        self.masks = np.stack([
+            (i + j) % 2 == 0,
+            i % 2 == 0,
+            j % 3 == 0,
+            (i + j) % 3 == 0,
+            (i // 2 + j // 3) % 2 == 0,
+            (i * j) % 2 + (i * j) % 3 == 0,
+            ((i * j) % 2 + (i * j) % 3) % 2 == 0,
+            ((i * j) % 3 + (i + j) % 2) % 2 == 0,
+        ])
+
+        # Format information positions, in bit order (vertical, then horizontal)
+        vertical = [(i if i < 6 else i + 1 if i < 8 else n - 15 + i, 8) for i in range(15)]
+        horizontal = [(8, n - i - 1 if i < 8 else 15 - i if i < 9 else 15 - i - 1) for i in range(15)]
+        self.format_positions = (vertical, horizontal)
+
+        # Version information positions, in bit order
+        if version >= 7:
+            self.version_positions = (
+                [(i // 3, i % 3 + n - 11) for i in range(18)],
+                [(i % 3 + n - 11, i // 3) for i in range(18)],
+            )
+        else:
+            self.version_positions = None
+
+
+@lru_cache(maxsize=None)
+def _layout(version: int) -> _VersionLayout:
+    """Get the precomputed layout of a version."""
+    layout = _VersionLayout(version)
+    _freeze(layout.function, layout.data_rows, layout.data_cols, layout.masks)
+    return layout
+
+
+_FINDER_LIKE = np.array([
+    [1, 0, 1, 1, 1, 0, 1, 0, 0, 0, 0],
+    [0, 0, 0, 0, 1, 0, 1, 1, 1, 0, 1],
+], dtype=bool)
+
+
+def _run_penalties(matrices: np.ndarray) -> np.ndarray:
+    """Penalty rule 1 for each matrix: runs of five or more same-colored modules."""
+    count, n, _ = matrices.shape
+    penalties = np.zeros(count, dtype=np.int64)
+    for lines in (matrices, matrices.transpose(0, 2, 1)):
+        # Sentinels around every line turn each line start and end into a boundary
+        padded = np.full((count, n, n + 2), 2, dtype=np.int8)
+        padded[:, :, 1:-1] = lines
+        boundaries = np.flatnonzero(np.diff(padded, axis=2) != 0)
+        lengths = np.diff(boundaries)
+        # Gaps that span two lines have length one and never count
+        long_runs = lengths >= 5
+        owners = boundaries[:-1][long_runs] // (n * (n + 1))
+        penalties += np.bincount(owners, weights=lengths[long_runs] - 2, minlength=count).astype(np.int64)
+    return penalties
+
+
+def lost_points(matrices: np.ndarray) -> List[int]:
+    """
+    Score candidate matrices with the same penalty rules as qrcode.util.lost_point.
+
+    Args:
+        matrices: Boolean array of shape (count, n, n)
+
+    Returns:
+        The penalty score of each matrix
+    """
+    count, n, _ = matrices.shape
+
+    penalties = _run_penalties(matrices)
+
+    # Rule 2: 2x2 blocks of one color
+    top_left = matrices[:, :-1, :-1]
+    blocks = (
+        (top_left == matrices[:, 1:, :-1])
+        & (top_left == matrices[:, :-1, 1:])
+        & (top_left == matrices[:, 1:, 1:])
+    )
+    penalties += 3 * blocks.sum(axis=(1, 2))
+
+    # Rule 3: finder-like 1:1:3:1:1 patterns in rows and columns
+    if n > 10:
+        width = n - 10
+        for lines in (matrices, matrices.transpose(0, 2, 1)):
+            light = ~lines
+            for pattern in _FINDER_LIKE:
+                # AND together shifted views instead of materializing every window
+                match = np.ones((count, n, width), dtype=bool)
+                for k, dark in enumerate(pattern):
+                    match &= (lines if dark else light)[:, :, k:k + width]
+                penalties += 40 * match.sum(axis=(1, 2))
+
+    # Rule 4: dark module balance, computed exactly as qrcode does
+    dark_counts = matrices.sum(axis=(1, 2))
+    scores = []
+    for penalty, dark_count in zip(penalties.tolist(), dark_counts.tolist()):
+        percent = float(dark_count) / (n ** 2)
+        scores.append(penalty + int(abs(percent * 100 - 50) / 5) * 10)
+    return scores
+
+
+def build_matrix(
+    version: int,
+    error_correction: int,
+    codewords: Sequence[int],
+    mask_pattern: Optional[int] = None,
+) -> Tuple[np.ndarray, int]:
+    """
+    Place codewords into a module matrix and apply the mask.
+
+    Args:
+        version: QR code version
+        error_correction: Error correction level
+        codewords: Final codewords from create_codewords
+        mask_pattern: Mask pattern to use, or None to pick the best one
+
+    Returns:
+        The module matrix (without border) and the mask pattern used
+    """
+    layout = _layout(version)
+    n = layout.modules_count
+    positions = len(layout.data_rows)
+
+    bits = np.unpackbits(np.asarray(codewords, dtype=np.uint8))[:positions].astype(bool)
+    if len(bits) < positions:
+        bits = np.concatenate([bits, np.zeros(positions - len(bits), dtype=bool)])
+
+    if mask_pattern is None:
+        # Score all masks in test mode: format, version and dark module stay light
+        candidates = np.repeat(layout.function[None, :, :], 8, axis=0)
+        candidates[:, layout.data_rows, layout.data_cols] = bits[None, :] ^ layout.masks
+        scores = lost_points(candidates)
+        mask_pattern = scores.index(min(scores))
+        matrix = candidates[mask_pattern]
+    else:
+        matrix = layout.function.copy()
+        matrix[layout.data_rows, layout.data_cols] = bits ^ layout.masks[mask_pattern]
+
+    format_bits = util.BCH_type_info((error_correction << 3) | mask_pattern)
+    for positions_ in layout.format_positions:
+        for i, (r, c) in enumerate(positions_):
+            matrix[r, c] = (format_bits >> i) & 1 == 1
+
+    if layout.version_positions is not None:
+        version_bits = util.BCH_type_number(version)
+        for positions_ in layout.version_positions:
+            for i, (r, c) in enumerate(positions_):
+                matrix[r, c] = (version_bits >> i) & 1 == 1
+
+    # Fixed dark module
+    matrix[n - 8, 8] = True
+
+    return matrix, mask_pattern
+
+
+class NumpyEncoder(QRCodeEncoder):
+    """
+    Encoder with Galois-field table Reed-Solomon and vectorized mask selection.
+    """
+
+    name = "numpy"
+
+    def encode(self, qr: qrcode.QRCode) -> qrcode.QRCode:
+        """
+        Compile a QR code in place, producing the same matrix as qrcode.
+
+        Args:
+            qr: QR code instance with its data added
+
+        Returns:
+            The same QR code instance, compiled
+        """
+        qr.version = best_fit(qr.data_list, qr.error_correction, qr._version)
+        codewords = create_codewords(qr.version, qr.error_correction, qr.data_list)
+        matrix, _ = build_matrix(qr.version, qr.error_correction, codewords, qr.mask_pattern)
+
+        qr.modules_count = len(matrix)
+        qr.modules = matrix.tolist()
+        qr.data_cache = codewords
+        return qr
+
+
+def cross_validate(
+    contents: Iterable[str],
+    error_corrections: Sequence[int] = (
+        qrcode.constants.ERROR_CORRECT_L,
+        qrcode.constants.ERROR_CORRECT_M,
+        qrcode.constants.ERROR_CORRECT_Q,
+        qrcode.constants.ERROR_CORRECT_H,
+    ),
+) -> List[Tuple[str, int]]:
+    """
+    Compare the NumPy encoder against qrcode for a set of inputs.
+
+    Args:
+        contents: Contents to encode
+        error_corrections: Error correction levels to check for each content
+
+    Returns:
+        The (content, error_correction) pairs whose matrices differ; inputs
+        that do not fit at a level are skipped
+    """
+    encoder = NumpyEncoder()
+    mismatches = []
+    for content in contents:
+        for error_correction in error_corrections:
+            expected = qrcode.QRCode(error_correction=error_correction)
+            expected.add_data(content)
+            try:
+                expected.make(fit=True)
+            except (exceptions.DataOverflowError, ValueError):
+                # Too long for this level; nothing to compare
+                continue
+
+            actual = qrcode.QRCode(error_correction=error_correction)
+            actual.add_data(content)
+            encoder.encode(actual)
+
+            if actual.version != expected.version or actual.modules != expected.modules:
+                mismatches.append((content, error_correction))
+    return mismatches
@@ -0,0 +1,341 @@
+"""
+Analytic logo occlusion checks.
+
+A logo pasted over a QR code destroys the modules it covers. Instead of
+decoding every output, the covered modules are mapped to the codewords and
+Reed-Solomon blocks they belong to, and compared with what each block can
+correct. That gives the lowest error correction level that keeps a code with
+a logo decodable, without over-provisioning to level H.
+"""
+
+from functools import lru_cache
+from typing import Callable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from PIL import Image
+from qrcode import base, constants, exceptions, util
+
+from .numpy_encoder import _layout, best_fit
+
+# Error correction levels from weakest to strongest
+LEVELS = (
+    constants.ERROR_CORRECT_L,
+    constants.ERROR_CORRECT_M,
+    constants.ERROR_CORRECT_Q,
+    constants.ERROR_CORRECT_H,
+)
+
+LEVEL_NAMES = {
+    constants.ERROR_CORRECT_L: "L",
+    constants.ERROR_CORRECT_M: "M",
+    constants.ERROR_CORRECT_Q: "Q",
+    constants.ERROR_CORRECT_H: "H",
+}
+
+LEVELS_BY_NAME = {name: level for level, name in LEVEL_NAMES.items()}
+
+# Misdecode protection codewords of small versions (ISO/IEC 18004, table 9);
+# these are not available for error correction
+_MISDECODE_PROTECTION = {
+    (1, constants.ERROR_CORRECT_L): 3,
+    (1, constants.ERROR_CORRECT_M): 2,
+    (1, constants.ERROR_CORRECT_Q): 1,
+    (1, constants.ERROR_CORRECT_H): 1,
+    (2, constants.ERROR_CORRECT_L): 2,
+    (3, constants.ERROR_CORRECT_L): 1,
+}
+
+# Share of each block's correction capacity kept free for print and camera noise
+DEFAULT_SAFETY_MARGIN = 0.2
+
+
+class LogoOcclusionError(ValueError):
+    """Raised when a logo covers more of a code than any error correction level can repair."""
+
+
+def fit_logo(logo_img: Image.Image, qr_size: Tuple[int, int], logo_size: float) -> Tuple[Image.Image, Tuple[int, int]]:
+    """
+    Scale a logo to fit the center of a QR code image.
+
+    Args:
+        logo_img: The logo image
+        qr_size: Width and height of the QR code image
+        logo_size: Maximum size of the logo as a fraction of the QR code size
+
+    Returns:
+        The (possibly resized) logo and the position of its top left corner
+    """
+    qr_width, qr_height = qr_size
+
+    # Calculate the size of the logo
+    logo_max_size = int(min(qr_width, qr_height) * logo_size)
+    logo_width, logo_height = logo_img.size
+
+    # Resize the logo to fit within the QR code
+    if logo_width > logo_max_size or logo_height > logo_max_size:
+        logo_img = logo_img.resize(
+            (logo_max_size, int(logo_height * logo_max_size / logo_width))
+            if logo_width > logo_height
+            else (int(logo_width * logo_max_size / logo_height), logo_max_size)
+        )
+        logo_width, logo_height = logo_img.size
+
+    # Calculate position to place the logo (center)
+    position = ((qr_width - logo_width) // 2, (qr_height - logo_height) // 2)
+    return logo_img, position
+
+
+def logo_footprint(
+    logo_img: Image.Image,
+    logo_size: float,
+    modules_count: int,
+    box_size: int,
+    border: int,
+) -> np.ndarray:
+    """
+    Find the modules a logo covers.
+
+    Transparent pixels of RGBA logos do not cover anything, matching how the
+    logo is pasted.
+
+    Args:
+        logo_img: The logo image
+        logo_size: Maximum size of the logo as a fraction of the QR code size
+        modules_count: Number of modules per side, without the border
+        box_size: Size of each module in pixels
+        border: Border size in modules
+
+    Returns:
+        Boolean array of shape (modules_count, modules_count), True where covered
+    """
+    side = (modules_count + 2 * border) * box_size
+    logo_img, (left, top) = fit_logo(logo_img, (side, side), logo_size)
+
+    if logo_img.mode == "RGBA":
+        opaque = np.asarray(logo_img.getchannel("A")) > 0
+    else:
+        opaque = np.ones((logo_img.height, logo_img.width), dtype=bool)
+
+    # Align the logo to module boundaries and test every module it touches
+    first_row, first_col = top // box_size, left // box_size
+    last_row = -(-(top + logo_img.height) // box_size)
+    last_col = -(-(left + logo_img.width) // box_size)
+    aligned = np.zeros(((last_row - first_row) * box_size, (last_col - first_col) * box_size), dtype=bool)
+    y, x = top - first_row * box_size, left - first_col * box_size
+    aligned[y:y + logo_img.height, x:x + logo_img.width] = opaque
+    touched = aligned.reshape(last_row - first_row, box_size, last_col - first_col, box_size).any(axis=(1, 3))
+
+    total = modules_count + 2 * border
+    covered = np.zeros((total, total), dtype=bool)
+    covered[first_row:last_row, first_col:last_col] = touched[:total - first_row, :total - first_col]
+    return covered[border:border + modules_count, border:border + modules_count]
+
+
+@lru_cache(maxsize=None)
+def _codeword_blocks(version: int, error_correction: int) -> Tuple[np.ndarray, Tuple[int, ...]]:
+    """
+    Map every codeword, in placement order, to its Reed-Solomon block.
+
+    Returns:
+        The block of each codeword, and the error correction codewords of each block
+    """
+    blocks = base.rs_blocks(version, error_correction)
+    owners: List[int] = []
+    # Data codewords are interleaved first, then error correction codewords,
+    # column by column, skipping the gaps of shorter blocks
+    for lengths in (
+        [block.data_count for block in blocks],
+        [block.total_count - block.data_count for block in blocks],
+    ):
+        for column in range(max(lengths)):
+            owners.extend(index for index, length in enumerate(lengths) if column < length)
+
+    owners_array = np.array(owners, dtype=np.intp)
+    owners_array.flags.writeable = False
+    return owners_array, tuple(block.total_count - block.data_count for block in blocks)
+
+
+@lru_cache(maxsize=None)
+def _critical_modules(version: int) -> np.ndarray:
+    """Modules a decoder needs intact: finder patterns, separators, timing and format/version info."""
+    layout = _layout(version)
+    n = layout.modules_count
+    critical = np.zeros((n, n), dtype=bool)
+    critical[:9, :9] = True
+    critical[:9, n - 8:] = True
+    critical[n - 8:, :9] = True
+    critical[6, :] = True
+    critical[:, 6] = True
+    for positions in layout.format_positions + (layout.version_positions or ()):
+        for row, col in positions:
+            critical[row, col] = True
+    critical.flags.writeable = False
+    return critical
+
+
+class OcclusionReport:
+    """
+    The damage a logo does to a QR code of a given version and error correction level.
+    """
+
+    def __init__(
+        self,
+        version: int,
+        error_correction: int,
+        covered_modules: int,
+        critical_modules: int,
+        damaged: Sequence[int],
+        capacity: Sequence[int],
+        safety_margin: float,
+        box_size: Optional[int] = None,
+    ):
+        """
+        Initialize the report.
+
+        Args:
+            version: QR code version
+            error_correction: Error correction level
+            covered_modules: Number of modules under the logo
+            critical_modules: Covered finder, timing and format/version modules
+            damaged: Damaged codewords per Reed-Solomon block
+            capacity: Correctable codewords per block
+            safety_margin: Share of each block's capacity kept free
+            box_size: Size of each module in pixels the footprint was found at
+        """
+        self.version = version
+        self.error_correction = error_correction
+        self.covered_modules = covered_modules
+        self.critical_modules = critical_modules
+        self.damaged = list(damaged)
+        self.capacity = list(capacity)
+        self.safety_margin = safety_margin
+        self.box_size = box_size
+
+    @property
+    def usage(self) -> float:
+        """Highest share of a block's correction capacity used by the logo."""
+        return max(
+            (damaged / capacity if capacity else float("inf") if damaged else 0.0)
+            for damaged, capacity in zip(self.damaged, self.capacity)
+        )
+
+    @property
+    def decodable(self) -> bool:
+        """Whether the code stays decodable with the safety margin kept free."""
+        return self.critical_modules == 0 and all(
+            damaged <= int(capacity * (1 - self.safety_margin))
+            for damaged, capacity in zip(self.damaged, self.capacity)
+        )
+
+    @property
+    def level_name(self) -> str:
+        """The error correction level as a letter."""
+        return LEVEL_NAMES[self.error_correction]
+
+    def __repr__(self) -> str:
+        return (
+            f"OcclusionReport(version={self.version}, level={self.level_name}, "
+            f"covered_modules={self.covered_modules}, usage={self.usage:.0%}, decodable={self.decodable})"
+        )
+
+
+def analyze_occlusion(
+    version: int,
+    error_correction: int,
+    covered: np.ndarray,
+    safety_margin: float = DEFAULT_SAFETY_MARGIN,
+) -> OcclusionReport:
+    """
+    Map covered modules to damaged codewords per Reed-Solomon block.
+
+    Every covered data module is assumed to be read wrongly, so each touched
+    codeword counts as an error (two per corrected codeword of capacity).
+
+    Args:
+        version: QR code version
+        error_correction: Error correction level
+        covered: Covered modules, as returned by logo_footprint
+        safety_margin: Share of each block's capacity kept free
+
+    Returns:
+        The report
+    """
+    layout = _layout(version)
+    owners, ec_counts = _codeword_blocks(version, error_correction)
+
+    # Remainder bits after the last codeword carry no data
+    bits = np.flatnonzero(covered[layout.data_rows, layout.data_cols])
+    codewords = np.unique(bits[bits < len(owners) * 8] // 8)
+    damaged = np.bincount(owners[codewords], minlength=len(ec_counts))
+
+    protection = _MISDECODE_PROTECTION.get((version, error_correction), 0)
+    capacity = [(count - protection) // 2 for count in ec_counts]
+
+    return OcclusionReport(
+        version=version,
+        error_correction=error_correction,
+        covered_modules=int(covered.sum()),
+        critical_modules=int((covered & _critical_modules(version)).sum()),
+        damaged=damaged.tolist(),
+        capacity=capacity,
+        safety_margin=safety_margin,
+    )
+
+
+def choose_error_correction(
+    data_list: Sequence[util.QRData],
+    logo_img: Image.Image,
+    logo_size: float,
+    box_size: Union[int, Callable[[int], int]],
+    border: int,
+    version: Optional[int] = None,
+    levels: Sequence[int] = LEVELS,
+    safety_margin: float = DEFAULT_SAFETY_MARGIN,
+) -> OcclusionReport:
+    """
+    Find the weakest error correction level that keeps a code with a logo decodable.
+
+    Each level is checked at the version its data fits in, since a stronger
+    level may need a larger version, which changes the logo footprint.
+
+    Args:
+        data_list: Data segments to encode
+        logo_img: The logo image
+        logo_size: Maximum size of the logo as a fraction of the QR code size
+        box_size: Size of each module in pixels, or a function returning it
+            for a number of modules per side
+        border: Border size in modules
+        version: Minimum version
+        levels: Levels to try, weakest first
+        safety_margin: Share of each block's capacity kept free
+
+    Returns:
+        The report of the chosen level
+
+    Raises:
+        LogoOcclusionError: If no level keeps the code decodable
+    """
+    reports = []
+    for level in levels:
+        try:
+            fitted = best_fit(data_list, level, version)
+        except exceptions.DataOverflowError:
+            continue
+        modules_count = fitted * 4 + 17
+        size = box_size(modules_count) if callable(box_size) else box_size
+        covered = logo_footprint(logo_img, logo_size, modules_count, size, border)
+        report = analyze_occlusion(fitted, level, covered, safety_margin)
+        report.box_size = size
+        if report.decodable:
+            return report
+        reports.append(report)
+
+    if not reports:
+        raise LogoOcclusionError("Content is too long for a QR code")
+
+    best = min(reports, key=lambda report: (report.critical_modules, report.usage))
+    if best.critical_modules:
+        reason = "covers the finder patterns or format information"
+    else:
+        reason = f"would use {best.usage:.0%} of the error correction capacity at level {best.level_name}"
+    raise LogoOcclusionError(f"The logo {reason}; use a smaller logo_size")
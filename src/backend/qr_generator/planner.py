@@ -0,0 +1,205 @@
+"""
+Pixel and memory budgets for rendered QR code images.
+
+The final image size of a code is known as soon as its matrix is encoded, so
+it can be checked before any image buffer is allocated. The planner computes
+the dimensions and an estimate of the peak memory of a render, chooses the box
+size for a target pixel width, and rejects or shrinks renders that exceed the
+budget.
+"""
+
+import os
+from typing import Optional, Tuple
+
+# Largest box size accepted from callers, in pixels per module
+MAX_BOX_SIZE = 100
+
+# Default budget: a 6000 x 6000 image and 512 MiB of image buffers
+DEFAULT_MAX_PIXELS = int(os.environ.get("QR_MAX_PIXELS", 36_000_000))
+DEFAULT_MAX_BYTES = int(os.environ.get("QR_MAX_BYTES", 512 * 1024 * 1024))
+
+# PIL stores RGB and RGBA images with four bytes per pixel
+RGB_BYTES_PER_PIXEL = 4
+
+
+class ImageBudgetError(ValueError):
+    """Raised when a render would exceed the pixel or memory budget."""
+
+
+class RenderPlan:
+    """
+    Final dimensions and estimated memory of a render.
+    """
+
+    def __init__(
+        self,
+        box_size: int,
+        requested_box_size: int,
+        qr_size: Tuple[int, int],
+        image_size: Tuple[int, int],
+        peak_bytes: int,
+    ):
+        """
+        Initialize the plan.
+
+        Args:
+            box_size: Box size the code will be rendered at
+            requested_box_size: Box size asked for before budgeting
+            qr_size: Width and height of the QR code image
+            image_size: Width and height of the final image, including any title
+            peak_bytes: Estimated peak size of the image buffers
+        """
+        self.box_size = box_size
+        self.requested_box_size = requested_box_size
+        self.qr_size = qr_size
+        self.image_size = image_size
+        self.peak_bytes = peak_bytes
+
+    @property
+    def pixels(self) -> int:
+        """Number of pixels in the final image."""
+        return self.image_size[0] * self.image_size[1]
+
+    @property
+    def downscaled(self) -> bool:
+        """Whether the box size was reduced to fit the budget."""
+        return self.box_size < self.requested_box_size
+
+    def __repr__(self) -> str:
+        width, height = self.image_size
+        return f"RenderPlan(box_size={self.box_size}, size={width}x{height}, peak_bytes={self.peak_bytes})"
+
+
+class PixelBudget:
+    """
+    Limits on the size of rendered images.
+    """
+
+    def __init__(
+        self,
+        max_pixels: int = DEFAULT_MAX_PIXELS,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        downscale: bool = False,
+    ):
+        """
+        Initialize the budget.
+
+        Args:
+            max_pixels: Maximum number of pixels in the final image
+            max_bytes: Maximum estimated peak size of the image buffers
+            downscale: Reduce the box size of oversized renders instead of rejecting them
+        """
+        self.max_pixels = max_pixels
+        self.max_bytes = max_bytes
+        self.downscale = downscale
+
+    def estimate(
+        self,
+        modules_count: int,
+        box_size: int,
+        border: int,
+        band_height: int = 0,
+        frame_width: int = 0,
+        bytes_per_pixel: int = RGB_BYTES_PER_PIXEL,
+    ) -> RenderPlan:
+        """
+        Compute the dimensions and peak memory of a render without budgeting it.
+
+        Args:
+            modules_count: Number of modules per side, without the border
+            box_size: Size of each box in pixels
+            border: Border size in boxes
+            band_height: Height of the title band in pixels, 0 for untitled codes
+            frame_width: Width of the title frame in pixels
+            bytes_per_pixel: Bytes per pixel of the rasterized code
+
+        Returns:
+            The plan
+        """
+        side = (modules_count + 2 * border) * box_size
+        qr_pixels = side * side
+        peak_bytes = qr_pixels * bytes_per_pixel
+
+        if band_height or frame_width:
+            image_size = (side + 2 * frame_width, side + band_height + 2 * frame_width)
+            canvas_bytes = image_size[0] * image_size[1] * RGB_BYTES_PER_PIXEL
+            # The cached canvas and its copy, plus an RGB conversion of the code
+            peak_bytes += 2 * canvas_bytes
+            if bytes_per_pixel != RGB_BYTES_PER_PIXEL:
+                peak_bytes += qr_pixels * RGB_BYTES_PER_PIXEL
+        else:
+            image_size = (side, side)
+
+        return RenderPlan(box_size, box_size, (side, side), image_size, peak_bytes)
+
+    def fits(self, plan: RenderPlan) -> bool:
+        """Check whether a plan is within the budget."""
+        return plan.pixels <= self.max_pixels and plan.peak_bytes <= self.max_bytes
+
+    @staticmethod
+    def box_size_for_width(modules_count: int, border: int, target_width: int) -> int:
+        """
+        Get the largest box size whose code is no wider than a target width.
+
+        Args:
+            modules_count: Number of modules per side, without the border
+            border: Border size in boxes
+            target_width: Target width of the QR code in pixels
+
+        Returns:
+            The box size, at least 1
+        """
+        return max(1, min(MAX_BOX_SIZE, target_width // (modules_count + 2 * border)))
+
+    def plan(
+        self,
+        modules_count: int,
+        box_size: int,
+        border: int,
+        band_height: int = 0,
+        frame_width: int = 0,
+        bytes_per_pixel: int = RGB_BYTES_PER_PIXEL,
+        target_width: Optional[int] = None,
+    ) -> RenderPlan:
+        """
+        Plan a render within the budget.
+
+        Args:
+            modules_count: Number of modules per side, without the border
+            box_size: Requested size of each box in pixels
+            border: Border size in boxes
+            band_height: Height of the title band in pixels, 0 for untitled codes
+            frame_width: Width of the title frame in pixels
+            bytes_per_pixel: Bytes per pixel of the rasterized code
+            target_width: Target width of the QR code in pixels; overrides box_size
+
+        Returns:
+            The plan
+
+        Raises:
+            ImageBudgetError: If the render exceeds the budget and cannot be downscaled
+        """
+        if target_width is not None:
+            box_size = self.box_size_for_width(modules_count, border, target_width)
+        if box_size > MAX_BOX_SIZE:
+            raise ImageBudgetError(f"Box size {box_size} exceeds the maximum of {MAX_BOX_SIZE}")
+
+        plan = self.estimate(modules_count, box_size, border, band_height, frame_width, bytes_per_pixel)
+        if self.fits(plan):
+            return plan
+
+        if self.downscale:
+            for smaller in range(box_size - 1, 0, -1):
+                candidate = self.estimate(
+                    modules_count, smaller, border, band_height, frame_width, bytes_per_pixel
+                )
+                if self.fits(candidate):
+                    candidate.requested_box_size = box_size
+                    return candidate
+
+        width, height = plan.image_size
+        raise ImageBudgetError(
+            f"A {width}x{height} image (about {plan.peak_bytes // (1024 * 1024)} MiB) exceeds the "
+            f"budget of {self.max_pixels} pixels and {self.max_bytes // (1024 * 1024)} MiB; "
+            f"use a smaller box size"
+        )
@@ -0,0 +1,200 @@
+"""
+On-demand profiling of a single call.
+
+A Profiler captures, for the code run inside it:
+
+- cProfile statistics, written as a ``.pstats`` file for ``pstats``/snakeviz;
+- sampled call stacks, written in the collapsed format read by flamegraph.pl,
+  speedscope and inferno;
+- tracemalloc allocation statistics, including peak traced memory.
+
+Callers import this module only when profiling is requested, so there is no
+cost when it is off.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+
+class Profiler:
+    """
+    Context manager profiling the calling thread.
+
+    tracemalloc (and cProfile on Python 3.12+) are process-wide, so profiled
+    calls run one at a time; allocations made by other threads meanwhile are
+    included in the memory statistics.
+    """
+
+    _active = threading.Lock()
+
+    def __init__(
+        self,
+        output_dir: str,
+        name: str = "profile",
+        sample_interval: float = 0.001,
+        top: int = 15,
+    ):
+        """
+        Initialize the profiler.
+
+        Args:
+            output_dir: Directory the profile files are written to
+            name: File name prefix of the profile files
+            sample_interval: Seconds between call stack samples
+            top: Number of hotspots and allocation sites in the summary
+        """
+        self.output_dir = output_dir
+        self.name = re.sub(r"[^\w\-.]", "_", name)
+        self.sample_interval = sample_interval
+        self.top = top
+        self.summary: Optional[Dict[str, Any]] = None
+
+        self._profile = cProfile.Profile()
+        self._stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._thread_id = 0
+        self._started_tracemalloc = False
+        self._started = 0.0
+
+    def __enter__(self) -> "Profiler":
+        Profiler._active.acquire()
+        self._thread_id = threading.get_ident()
+        self._sampler = threading.Thread(target=self._sample, name="qr-profile-sampler", daemon=True)
+
+        if tracemalloc.is_tracing():
+            if hasattr(tracemalloc, "reset_peak"):  # Python 3.9+
+                tracemalloc.reset_peak()
+        else:
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+        self._started = time.perf_counter()
+        self._sampler.start()
+        self._profile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._profile.disable()
+        elapsed = time.perf_counter() - self._started
+        self._stop.set()
+        self._sampler.join()
+
+        _, peak = tracemalloc.get_traced_memory()
+        # Leave out the profiler's own allocations
+        allocations = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, tracemalloc.__file__),
+        ]).statistics("lineno")
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+        Profiler._active.release()
+
+        self.summary = self._write(elapsed, peak, allocations)
+
+    def _sample(self) -> None:
+        """Record the profiled thread's call stack until stopped."""
+        while not self._stop.wait(self.sample_interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self._stacks[";".join(reversed(stack))] += 1
+
+    def _write(self, elapsed: float, peak: int, allocations: List[tracemalloc.Statistic]) -> Dict[str, Any]:
+        """Write the profile files and build the summary."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, self.name)
+        files = {
+            "pstats": base + ".pstats",
+            "collapsed": base + ".collapsed",
+            "summary": base + ".txt",
+        }
+
+        self._profile.dump_stats(files["pstats"])
+
+        with open(files["collapsed"], "w", encoding="utf-8") as f:
+            for stack, count in self._stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        stats = pstats.Stats(self._profile)
+        hotspots = []
+        for (filename, line, function), (_, calls, own, cumulative, _) in sorted(
+            stats.stats.items(), key=lambda item: item[1][2], reverse=True
+        )[:self.top]:
+            hotspots.append({
+                "function": f"{function} ({_short_path(filename)}:{line})",
+                "calls": calls,
+                "own_seconds": round(own, 6),
+                "cumulative_seconds": round(cumulative, 6),
+            })
+
+        summary = {
+            "elapsed_seconds": round(elapsed, 6),
+            "peak_traced_bytes": peak,
+            "samples": sum(self._stacks.values()),
+            "hotspots": hotspots,
+            "allocations": [
+                {"site": str(stat.traceback), "bytes": stat.size, "count": stat.count}
+                for stat in allocations[:self.top]
+            ],
+            "files": files,
+        }
+
+        with open(files["summary"], "w", encoding="utf-8") as f:
+            f.write(format_summary(summary))
+            f.write("\n")
+            report = io.StringIO()
+            pstats.Stats(self._profile, stream=report).sort_stats("cumulative").print_stats(self.top)
+            f.write(report.getvalue())
+
+        return summary
+
+
+def _short_path(filename: str) -> str:
+    """Shorten a source path to its last two components, e.g. qrcode/main.py."""
+    parts = filename.replace("\\", "/").split("/")
+    return "/".join(parts[-2:])
+
+
+def format_summary(summary: Dict[str, Any]) -> str:
+    """
+    Format a profile summary as text.
+
+    Args:
+        summary: The summary of a Profiler
+
+    Returns:
+        Hotspots, peak allocation and top allocation sites, one per line
+    """
+    lines = [
+        f"Elapsed: {summary['elapsed_seconds'] * 1000:.1f} ms, "
+        f"peak traced memory: {summary['peak_traced_bytes'] / 1024:.1f} KiB, "
+        f"{summary['samples']} stack samples",
+        "",
+        "Hotspots (own time):",
+    ]
+    for hotspot in summary["hotspots"]:
+        lines.append(
+            f"  {hotspot['own_seconds'] * 1000:9.2f} ms own {hotspot['cumulative_seconds'] * 1000:9.2f} ms cum "
+            f"{hotspot['calls']:8d} calls  {hotspot['function']}"
+        )
+    lines.extend(["", "Allocations:"])
+    for allocation in summary["allocations"]:
+        lines.append(f"  {allocation['bytes'] / 1024:9.1f} KiB {allocation['count']:8d} blocks  {allocation['site']}")
+    lines.extend(["", "Files:"])
+    for kind, path in summary["files"].items():
+        lines.append(f"  {kind}: {path}")
+    return "\n".join(lines)
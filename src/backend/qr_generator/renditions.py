@@ -0,0 +1,224 @@
+"""
+Several renditions of one QR code from a single encode.
+
+A product typically needs the same code as a small preview, a print
+resolution image and a vector file. The content is encoded and the title
+template laid out once; every rendition then only rasterizes (or writes
+vector paths for) the shared module matrix at its own box size.
+"""
+
+from typing import List, Optional, Sequence, Tuple, Union
+from xml.sax.saxutils import escape, quoteattr
+
+from PIL import Image
+
+from .generator import QRGenerator
+from .planner import MAX_BOX_SIZE
+from .styles import QRStyle
+from .templates import TitleTemplate, get_title_template
+
+Color = Union[str, Tuple[int, int, int]]
+
+# Supported formats and their media types
+FORMATS = {
+    "png": "image/png",
+    "webp": "image/webp",
+    "svg": "image/svg+xml",
+}
+
+
+class Rendition:
+    """
+    One requested output of a code: a format and a box size.
+    """
+
+    def __init__(self, format: str, box_size: Optional[int] = None):
+        """
+        Initialize the rendition.
+
+        Args:
+            format: Output format, "png", "webp" or "svg"
+            box_size: Size of each module in pixels (user units for SVG);
+                the generator's default when omitted
+
+        Raises:
+            ValueError: If the format or box size is not supported
+        """
+        format = format.lower()
+        if format not in FORMATS:
+            raise ValueError(f"Unsupported rendition format: {format}. Supported formats: {', '.join(FORMATS)}")
+        if box_size is not None and not 1 <= box_size <= MAX_BOX_SIZE:
+            raise ValueError(f"Rendition box size must be between 1 and {MAX_BOX_SIZE}")
+        self.format = format
+        self.box_size = box_size
+
+    @property
+    def media_type(self) -> str:
+        """The media type of the rendition."""
+        return FORMATS[self.format]
+
+    def __repr__(self) -> str:
+        return f"Rendition({self.format!r}, box_size={self.box_size!r})"
+
+
+def parse_rendition(spec: str) -> Rendition:
+    """
+    Parse a rendition given as FORMAT or FORMAT:BOX_SIZE, e.g. "png:8".
+
+    Args:
+        spec: The rendition spec
+
+    Returns:
+        The rendition
+
+    Raises:
+        ValueError: If the spec is malformed or the format is not supported
+    """
+    format, _, box_size = spec.strip().partition(":")
+    if box_size and not box_size.isdigit():
+        raise ValueError(f"Invalid rendition box size: {spec}")
+    return Rendition(format, int(box_size) if box_size else None)
+
+
+def render_renditions(
+    generator: QRGenerator,
+    content: str,
+    renditions: Sequence[Rendition],
+    version: Optional[int] = None,
+    error_correction: Optional[int] = None,
+    border: Optional[int] = None,
+    fg_color: Optional[Color] = None,
+    bg_color: Optional[Color] = None,
+    title: Optional[str] = None,
+    template: Optional[TitleTemplate] = None,
+    mask_pattern: Optional[int] = None,
+    style: Optional[QRStyle] = None,
+) -> List[Tuple[Rendition, bytes]]:
+    """
+    Encode content once and emit every requested rendition.
+
+    Takes the same options as QRGenerator.render. Every raster rendition is
+    checked against the generator's budget before it is rasterized.
+
+    Args:
+        generator: QR generator providing defaults and stage implementations
+        content: The content to encode in the QR code
+        renditions: The renditions to emit
+
+    Returns:
+        The encoded data of each rendition, in the requested order
+
+    Raises:
+        ImageBudgetError: If a raster rendition would exceed the budget
+        ValueError: If an SVG rendition is requested with a module style
+    """
+    if style is not None and any(rendition.format == "svg" for rendition in renditions):
+        raise ValueError("SVG renditions do not support module styles")
+
+    qr = generator._make_qr(content, version, error_correction, None, border, mask_pattern)
+    fg_color = fg_color or generator.default_fg_color
+    bg_color = bg_color or generator.default_bg_color
+    if title and template is None:
+        template = get_title_template(
+            title, generator.default_title_bg_color, generator.default_title_text_color
+        )
+
+    results = []
+    for rendition in renditions:
+        box_size = rendition.box_size or generator.default_box_size
+        if rendition.format == "svg":
+            data = matrix_svg(qr.get_matrix(), box_size, fg_color, bg_color, template).encode("utf-8")
+        else:
+            # The compiled code is private to this call, so it is resized in place
+            qr.box_size = generator.plan(qr, box_size, fg_color, bg_color, template=template, style=style).box_size
+            img = generator.rasterize(qr, fg_color, bg_color, style, reuse_buffer=True)
+            if template is not None:
+                img = generator._add_title_to_image(img, title, template, reuse_buffer=True)
+            data = _encode_image(generator, img, rendition.format)
+        results.append((rendition, data))
+
+    return results
+
+
+def _encode_image(generator: QRGenerator, img: Image.Image, format: str) -> bytes:
+    """Encode an image losslessly as PNG or WebP, through the generator's reusable stream."""
+    if format == "webp":
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGB")
+        encoded = generator.encode_image(img, "WEBP", lossless=True)
+    else:
+        encoded = generator.encode_image(img, "PNG")
+    with encoded as data:
+        return bytes(data)
+
+
+def _svg_color(color: Color) -> str:
+    """Format a color for an SVG attribute."""
+    if isinstance(color, str):
+        return color
+    return "#%02x%02x%02x" % tuple(color[:3])
+
+
+def matrix_svg(
+    matrix: List[List[bool]],
+    box_size: int,
+    fg_color: Color = "black",
+    bg_color: Color = "white",
+    template: Optional[TitleTemplate] = None,
+) -> str:
+    """
+    Write a module matrix as an SVG document.
+
+    Horizontal runs of dark modules are merged into one path segment each.
+    A title template adds its band, text and frame at the same pixel sizes
+    as the raster image.
+
+    Args:
+        matrix: Module rows including the border, True for dark modules
+        box_size: Size of each module in user units
+        fg_color: Foreground color (color of the QR code)
+        bg_color: Background color
+        template: Title template to draw above the code
+
+    Returns:
+        The SVG document
+    """
+    side = len(matrix) * box_size
+    frame = template.frame_width if template else 0
+    band = template.band_height if template else 0
+    width, height = side + 2 * frame, side + band + 2 * frame
+
+    parts = []
+    for r, row in enumerate(matrix):
+        start = None
+        for c, dark in enumerate(row + [False]):
+            if dark and start is None:
+                start = c
+            elif not dark and start is not None:
+                parts.append(f"M{start} {r}h{c - start}v1h{start - c}z")
+                start = None
+
+    lines = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}" shape-rendering="crispEdges">',
+    ]
+    if template is not None:
+        canvas_color = _svg_color(template.frame_color if frame else "white")
+        lines.append(f'<rect width="{width}" height="{height}" fill={quoteattr(canvas_color)}/>')
+        lines.append(
+            f'<rect x="{frame}" y="{frame}" width="{side}" height="{band}" '
+            f'fill={quoteattr(_svg_color(template.bg_color))}/>'
+        )
+        lines.append(
+            f'<text x="{frame + side / 2:g}" y="{frame + band / 2:g}" text-anchor="middle" dominant-baseline="central" '
+            f'font-family="DejaVu Sans, Arial, sans-serif" font-size="{template.font_size}" '
+            f'fill={quoteattr(_svg_color(template.text_color))}>{escape(template.title)}</text>'
+        )
+    lines.append(f'<g transform="translate({frame} {frame + band})">')
+    lines.append(f'<rect width="{side}" height="{side}" fill={quoteattr(_svg_color(bg_color))}/>')
+    lines.append(
+        f'<path transform="scale({box_size})" fill={quoteattr(_svg_color(fg_color))} d="{"".join(parts)}"/>'
+    )
+    lines.append("</g>")
+    lines.append("</svg>")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,199 @@
+"""
+Short links that keep URL codes at low versions.
+
+A registry maps long targets to compact IDs in a local SQLite database,
+with an in-memory LRU cache in front for redirects. Short URLs are written
+in upper case (``HTTPS://QR.EXAMPLE.COM/S/7K3M9Q``) so that QR codes store
+them in alphanumeric mode, which fits a typical short URL in version 2 or 3.
+"""
+
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+from .cache import LRUCache
+from .utils import is_url
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS links (
+    id TEXT PRIMARY KEY,
+    target TEXT NOT NULL UNIQUE,
+    created REAL NOT NULL
+);
+"""
+
+# Links must outlive the process that created them, so there is no
+# temporary default: short links are disabled until a path is configured
+DEFAULT_SHORTLINK_DB = os.environ.get("SHORTLINK_DB_PATH")
+
+# Crockford base32: digits and upper-case letters without I, L, O and U,
+# all of which QR codes store in alphanumeric mode
+ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_READ_AS = str.maketrans({"I": "1", "L": "1", "O": "0"})
+
+# Route prefix of short URLs
+SHORT_PATH = "/S/"
+
+DEFAULT_ID_LENGTH = 6
+MAX_TARGET_LENGTH = 8192
+
+
+def is_shortenable(target: str) -> bool:
+    """
+    Check whether a target can be shortened.
+
+    Args:
+        target: The content to check
+
+    Returns:
+        True for absolute http and https URLs within the length limit
+    """
+    return (
+        len(target) <= MAX_TARGET_LENGTH
+        and is_url(target)
+        and urlsplit(target).scheme.lower() in ("http", "https")
+    )
+
+
+class ShortLinkRegistry:
+    """
+    Map long URLs to short IDs, stored in SQLite and cached in memory.
+
+    Links never change once created, so cached entries never go stale and
+    the cache can be shared by all threads. Every thread uses its own
+    database connection.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        cache_size: int = 4096,
+        id_length: int = DEFAULT_ID_LENGTH,
+    ):
+        """
+        Initialize the registry, creating the database if needed.
+
+        Args:
+            path: Path of the SQLite database
+            cache_size: Number of links kept in memory
+            id_length: Number of characters of new IDs
+        """
+        self.path = path
+        self.id_length = id_length
+        self._targets = LRUCache(cache_size)
+        self._ids = LRUCache(cache_size)
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with closing(sqlite3.connect(path, timeout=30)) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get the calling thread's connection, in autocommit mode."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        return conn
+
+    def shorten(self, target: str) -> str:
+        """
+        Get the ID of a target, registering it if it is new.
+
+        The same target always gets the same ID.
+
+        Args:
+            target: The URL to link to
+
+        Returns:
+            The link ID
+
+        Raises:
+            ValueError: If the target cannot be shortened
+        """
+        if not is_shortenable(target):
+            raise ValueError(f"Only http(s) URLs of up to {MAX_TARGET_LENGTH} characters can be shortened")
+
+        link_id = self._ids.get(target)
+        if link_id is not None:
+            return link_id
+
+        conn = self._connection()
+        while True:
+            row = conn.execute("SELECT id FROM links WHERE target = ?", (target,)).fetchone()
+            if row is not None:
+                link_id = row[0]
+                break
+            link_id = "".join(secrets.choice(ALPHABET) for _ in range(self.id_length))
+            try:
+                conn.execute(
+                    "INSERT INTO links (id, target, created) VALUES (?, ?, ?)", (link_id, target, time.time())
+                )
+                break
+            except sqlite3.IntegrityError:
+                # The ID is taken, or another process registered the target first
+                continue
+
+        self._ids.put(target, link_id)
+        self._targets.put(link_id, target)
+        return link_id
+
+    def resolve(self, link_id: str) -> Optional[str]:
+        """
+        Look up the target of a link.
+
+        IDs are read case-insensitively, with I and L read as 1 and O as 0.
+
+        Args:
+            link_id: The link ID
+
+        Returns:
+            The target URL, or None if there is no such link
+        """
+        link_id = link_id.upper().translate(_READ_AS)
+        target = self._targets.get(link_id)
+        if target is None:
+            row = self._connection().execute("SELECT target FROM links WHERE id = ?", (link_id,)).fetchone()
+            if row is None:
+                return None
+            target = row[0]
+            self._targets.put(link_id, target)
+        return target
+
+    def short_url(self, target: str, base_url: str) -> str:
+        """
+        Shorten a target into a URL under a base URL.
+
+        The base URL is upper-cased, path included, so the whole short URL
+        is stored in alphanumeric mode. The server must therefore route the
+        upper-cased path, as it does SHORT_PATH.
+
+        Args:
+            target: The URL to link to
+            base_url: URL serving the redirect route, e.g. https://qr.example.com
+
+        Returns:
+            The short URL
+
+        Raises:
+            ValueError: If the base URL or the target is not an http(s) URL
+        """
+        base = urlsplit(base_url)
+        if base.scheme.lower() not in ("http", "https") or not base.netloc:
+            raise ValueError(f"Short link base URL must be an http(s) URL: {base_url}")
+        prefix = f"{base.scheme}://{base.netloc}{base.path.rstrip('/')}".upper()
+        return f"{prefix}{SHORT_PATH}{self.shorten(target)}"
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Entry count, hits and misses of the redirect and shorten caches
+        """
+        return {"resolve": self._targets.stats(), "shorten": self._ids.stats()}
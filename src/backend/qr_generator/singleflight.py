@@ -0,0 +1,96 @@
+"""
+Single-flight coalescing of concurrent identical work.
+
+When several threads ask for the result of the same key at the same time, only
+the first one runs the work; the others wait for it and share its result.
+"""
+
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _Call:
+    """An in-flight call and the outcome shared with its waiters."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key into a single execution.
+
+    Results are not cached: once a call finishes, the next call with the same
+    key runs the work again.
+    """
+
+    def __init__(self):
+        """Initialize the group with empty metrics."""
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.executions = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run fn for key, or wait for an identical call already in flight.
+
+        Args:
+            key: Canonical identifier of the work
+            fn: Function computing the result
+
+        Returns:
+            A tuple of (result, shared), where shared is True if the result came
+            from another caller's execution
+
+        Raises:
+            Any exception raised by fn, in the leader and in every waiter
+        """
+        with self._lock:
+            self.requests += 1
+            call = self._calls.get(key)
+            if call is not None:
+                self.shared += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executions += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result, False
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get coalescing metrics.
+
+        Returns:
+            Request, execution and shared (renders saved) counts and the number
+            of calls currently in flight
+        """
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "executions": self.executions,
+                "shared": self.shared,
+                "in_flight": len(self._calls),
+            }
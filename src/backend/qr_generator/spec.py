@@ -0,0 +1,230 @@
+"""
+Canonical, hashable description of a render.
+
+A RenderSpec carries everything that determines a rendered QR code. Options
+are validated and normalized when the spec is created, so equal renders
+compare, hash and digest equally however their options were spelled
+("#000" and "black", "M" and ERROR_CORRECT_M), and a spec can be used as a
+cache key or sent to another process.
+"""
+
+import hashlib
+from typing import Any, Dict, Optional, Tuple, Union
+
+from PIL import ImageColor
+from qrcode import constants
+
+from .styles import QRStyle
+
+Color = Union[str, Tuple[int, int, int]]
+
+_ERROR_CORRECTION_NAMES = {
+    "L": constants.ERROR_CORRECT_L,
+    "M": constants.ERROR_CORRECT_M,
+    "Q": constants.ERROR_CORRECT_Q,
+    "H": constants.ERROR_CORRECT_H,
+}
+
+
+def canonical_color(color: Optional[Color]) -> Optional[Color]:
+    """
+    Normalize an opaque color to "black", "white" or lowercase hex.
+
+    Black and white keep their names, which lets plain codes use qrcode's
+    bilevel rasterizer. "transparent" and colors with alpha are passed
+    through unchanged (tuples as tuples of ints), since qrcode picks the
+    image mode from their spelling.
+
+    Args:
+        color: A PIL color string or an RGB(A) tuple
+
+    Returns:
+        The canonical color, or None if no color is given
+
+    Raises:
+        ValueError: If the color is not recognized
+    """
+    if color is None:
+        return None
+    if isinstance(color, str) and color.strip().lower() == "transparent":
+        return color
+    rgba = ImageColor.getrgb(color.strip()) if isinstance(color, str) else tuple(int(c) for c in color)
+    if len(rgba) == 4:
+        if rgba[3] != 255:
+            return color if isinstance(color, str) else rgba
+        rgba = rgba[:3]
+    if rgba == (0, 0, 0):
+        return "black"
+    if rgba == (255, 255, 255):
+        return "white"
+    return "#" + "".join(f"{c:02x}" for c in rgba)
+
+
+def _optional_int(name: str, value: Any, low: int, high: Optional[int] = None) -> Optional[int]:
+    """Validate an optional integer option."""
+    if value is None:
+        return None
+    if isinstance(value, bool) or int(value) != value:
+        raise ValueError(f"{name} must be an integer, got {value!r}")
+    value = int(value)
+    if value < low or (high is not None and value > high):
+        bounds = f"between {low} and {high}" if high is not None else f"at least {low}"
+        raise ValueError(f"{name} must be {bounds}, got {value}")
+    return value
+
+
+class RenderSpec:
+    """
+    An immutable, normalized set of render options for one code.
+
+    Options left as None take the generator's defaults; resolve fills them
+    in, so specs of the same render compare equal before and after.
+    """
+
+    __slots__ = (
+        "content", "version", "error_correction", "box_size", "border", "fg_color",
+        "bg_color", "title", "mask_pattern", "target_width", "style", "_hash",
+    )
+
+    def __init__(
+        self,
+        content: str,
+        version: Optional[int] = None,
+        error_correction: Union[int, str, None] = None,
+        box_size: Optional[int] = None,
+        border: Optional[int] = None,
+        fg_color: Optional[Color] = None,
+        bg_color: Optional[Color] = None,
+        title: Optional[str] = None,
+        mask_pattern: Optional[int] = None,
+        target_width: Optional[int] = None,
+        style: Optional[QRStyle] = None,
+    ):
+        """
+        Initialize the spec, validating and normalizing every option.
+
+        Args:
+            content: The content to encode in the QR code
+            version: QR code version (1-40, controls size)
+            error_correction: Error correction level, as a qrcode constant or "L", "M", "Q" or "H"
+            box_size: Size of each box in pixels
+            border: Border size in boxes; 0 is a valid border
+            fg_color: Foreground color (color of the QR code)
+            bg_color: Background color
+            title: Title to display above the QR code; empty means none
+            mask_pattern: Mask pattern (0-7) to use instead of searching for the best one
+            target_width: Width of the QR code in pixels; picks the box size instead of box_size
+            style: Module shape, eye style and gradient fill
+
+        Raises:
+            ValueError: If an option is invalid
+        """
+        if not isinstance(content, str):
+            raise ValueError("content must be a string")
+        if isinstance(error_correction, str):
+            try:
+                error_correction = _ERROR_CORRECTION_NAMES[error_correction.strip().upper()]
+            except KeyError:
+                raise ValueError(f"Unknown error correction level: {error_correction}") from None
+        elif error_correction is not None and error_correction not in _ERROR_CORRECTION_NAMES.values():
+            raise ValueError(f"Unknown error correction level: {error_correction}")
+        if style is not None and not isinstance(style, QRStyle):
+            raise ValueError("style must be a QRStyle")
+
+        _set = object.__setattr__
+        _set(self, "content", content)
+        _set(self, "version", _optional_int("version", version, 1, 40))
+        _set(self, "error_correction", error_correction)
+        _set(self, "box_size", _optional_int("box_size", box_size, 1))
+        _set(self, "border", _optional_int("border", border, 0))
+        _set(self, "fg_color", canonical_color(fg_color))
+        _set(self, "bg_color", canonical_color(bg_color))
+        _set(self, "title", title or None)
+        _set(self, "mask_pattern", _optional_int("mask_pattern", mask_pattern, 0, 7))
+        _set(self, "target_width", _optional_int("target_width", target_width, 1))
+        _set(self, "style", style)
+        _set(self, "_hash", None)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("RenderSpec is immutable; use replace()")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError("RenderSpec is immutable")
+
+    def _key(self) -> tuple:
+        return (
+            self.content, self.version, self.error_correction, self.box_size, self.border, self.fg_color,
+            self.bg_color, self.title, self.mask_pattern, self.target_width, self.style,
+        )
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, RenderSpec) and self._key() == other._key()
+
+    def __hash__(self) -> int:
+        if self._hash is None:
+            object.__setattr__(self, "_hash", hash(self._key()))
+        return self._hash
+
+    def __reduce__(self):
+        # Pickled as constructor arguments, which are already canonical
+        return (RenderSpec, self._key())
+
+    def __repr__(self) -> str:
+        options = ", ".join(f"{name}={value!r}" for name, value in self.options().items())
+        return f"RenderSpec({self.content!r}{', ' + options if options else ''})"
+
+    def options(self) -> Dict[str, Any]:
+        """
+        Get the options that are set, as keyword arguments for QRGenerator.render.
+
+        Returns:
+            The options other than the content that are not None
+        """
+        names = RenderSpec.__slots__[1:-1]
+        return {name: getattr(self, name) for name in names if getattr(self, name) is not None}
+
+    def replace(self, **changes) -> "RenderSpec":
+        """
+        Get a copy of the spec with some options changed.
+
+        Args:
+            **changes: Options to change
+
+        Returns:
+            The new spec
+        """
+        values = dict(zip(RenderSpec.__slots__[:-1], self._key()))
+        values.update(changes)
+        return RenderSpec(**values)
+
+    def resolve(self, generator) -> "RenderSpec":
+        """
+        Fill in unset options with a generator's defaults.
+
+        Args:
+            generator: The QRGenerator whose defaults apply
+
+        Returns:
+            The resolved spec
+        """
+        return self.replace(
+            version=self.version if self.version is not None else generator.default_version,
+            error_correction=(
+                self.error_correction if self.error_correction is not None else generator.default_error_correction
+            ),
+            box_size=self.box_size if self.box_size is not None else generator.default_box_size,
+            border=self.border if self.border is not None else generator.default_border,
+            fg_color=self.fg_color if self.fg_color is not None else generator.default_fg_color,
+            bg_color=self.bg_color if self.bg_color is not None else generator.default_bg_color,
+        )
+
+    @property
+    def matrix_key(self) -> tuple:
+        """The options that determine the module matrix."""
+        return (self.content, self.version, self.error_correction, self.border, self.mask_pattern)
+
+    @property
+    def digest(self) -> str:
+        """A stable hex SHA-256 digest of the spec, equal across processes and runs."""
+        canonical = repr(self._key())
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
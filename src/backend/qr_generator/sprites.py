@@ -0,0 +1,310 @@
+"""
+Sprite-sheet output for very large batches.
+
+Many QR codes are packed into a few large page images instead of one file per
+code. Each page is written into an anonymous memory-mapped pixel buffer,
+then encoded once, and a JSON index records where every code was placed.
+"""
+
+import json
+import mmap
+import os
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from PIL import Image, ImageColor
+
+from .generator import QRGenerator
+
+
+class SheetLayout:
+    """
+    Geometry of a sheet: page size in pixels and a grid of equally sized cells.
+    """
+
+    def __init__(
+        self,
+        page_width: int,
+        page_height: int,
+        columns: int,
+        rows: int,
+        margin: int = 0,
+        gap: int = 0,
+        dpi: int = 300,
+    ):
+        """
+        Initialize the layout.
+
+        Args:
+            page_width: Page width in pixels
+            page_height: Page height in pixels
+            columns: Number of cells per row
+            rows: Number of cell rows per page
+            margin: Blank margin around the grid in pixels
+            gap: Blank space between cells in pixels
+            dpi: Print resolution stored in the page images
+        """
+        self.page_width = page_width
+        self.page_height = page_height
+        self.columns = columns
+        self.rows = rows
+        self.margin = margin
+        self.gap = gap
+        self.dpi = dpi
+
+        self.cell_width = (page_width - 2 * margin - (columns - 1) * gap) // columns
+        self.cell_height = (page_height - 2 * margin - (rows - 1) * gap) // rows
+        if self.cell_width < 1 or self.cell_height < 1:
+            raise ValueError("Sheet layout leaves no room for cells")
+
+    @property
+    def cells_per_page(self) -> int:
+        """Number of cells on one page."""
+        return self.columns * self.rows
+
+    def cell_origin(self, slot: int) -> Tuple[int, int]:
+        """
+        Get the top-left pixel of a cell.
+
+        Args:
+            slot: Cell index on the page, row by row
+
+        Returns:
+            The (x, y) position of the cell
+        """
+        row, column = divmod(slot, self.columns)
+        return (
+            self.margin + column * (self.cell_width + self.gap),
+            self.margin + row * (self.cell_height + self.gap),
+        )
+
+    def to_dict(self) -> Dict[str, int]:
+        """Describe the layout for the JSON index."""
+        return {
+            "page_width": self.page_width,
+            "page_height": self.page_height,
+            "columns": self.columns,
+            "rows": self.rows,
+            "margin": self.margin,
+            "gap": self.gap,
+            "dpi": self.dpi,
+        }
+
+
+# Print-ready layouts at 300 dpi
+LAYOUTS = {
+    # A4 page, 4 x 6 codes
+    "a4": SheetLayout(2480, 3508, 4, 6, margin=118, gap=30),
+    # US Letter page, 4 x 5 codes
+    "letter": SheetLayout(2550, 3300, 4, 5, margin=150, gap=30),
+    # A4 label sheet with 3 x 7 labels of 63.5 x 38.1 mm
+    "a4-labels-21": SheetLayout(2480, 3508, 3, 7, margin=90, gap=24),
+    # Plain sprite sheet of 32 x 32 cells of 256 pixels, for programmatic use
+    "sprite": SheetLayout(8192, 8192, 32, 32, dpi=72),
+}
+
+
+def get_layout(layout: Union[str, SheetLayout]) -> SheetLayout:
+    """
+    Resolve a layout name or object.
+
+    Args:
+        layout: A name from LAYOUTS or a SheetLayout
+
+    Returns:
+        The sheet layout
+    """
+    if isinstance(layout, SheetLayout):
+        return layout
+    try:
+        return LAYOUTS[layout]
+    except KeyError:
+        raise ValueError(f"Unknown sheet layout: {layout}. Available layouts: {', '.join(LAYOUTS)}")
+
+
+class SpriteSheetWriter:
+    """
+    Pack QR codes into page images written through anonymous memory-mapped buffers.
+
+    Codes are rasterized straight from their module matrix into the page
+    buffer, one pixel row at a time, so no per-code image or file is created.
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        layout: Union[str, SheetLayout] = "a4",
+        prefix: str = "sheet",
+        fg_color: Union[str, Tuple[int, int, int]] = "black",
+        bg_color: Union[str, Tuple[int, int, int]] = "white",
+        mode: str = "L",
+        generator: Optional[QRGenerator] = None,
+        keep_raw: bool = False,
+    ):
+        """
+        Initialize the writer.
+
+        Args:
+            output_dir: Directory that receives the sheets and the index
+            layout: Layout name or SheetLayout
+            prefix: File name prefix of the sheets
+            fg_color: Color of the dark modules
+            bg_color: Color of the page and light modules
+            mode: Pixel mode of the sheets, "L" (grayscale) or "RGB"
+            generator: QR generator used to encode content
+            keep_raw: Also write each page's raw pixels next to the encoded sheets
+        """
+        if mode not in ("L", "RGB"):
+            raise ValueError("Sheet mode must be 'L' or 'RGB'")
+
+        self.output_dir = output_dir
+        self.layout = get_layout(layout)
+        self.prefix = prefix
+        self.mode = mode
+        self.generator = generator or QRGenerator()
+        self.keep_raw = keep_raw
+
+        self._fg = self._pixel(fg_color)
+        self._bg = self._pixel(bg_color)
+        self._pixel_size = len(self._bg)
+        self._stride = self.layout.page_width * self._pixel_size
+
+        self._sheets: List[Dict[str, Any]] = []
+        self._count = 0
+        self._buffer: Optional[mmap.mmap] = None
+
+        os.makedirs(output_dir, exist_ok=True)
+
+    def _pixel(self, color: Union[str, Tuple[int, int, int]]) -> bytes:
+        """Convert a color into the raw bytes of one pixel."""
+        value = ImageColor.getcolor(color, self.mode) if isinstance(color, str) else color
+        if self.mode == "L":
+            if isinstance(value, tuple):
+                value = round(0.299 * value[0] + 0.587 * value[1] + 0.114 * value[2])
+            return bytes([value])
+        return bytes(value[:3])
+
+    def _open_page(self) -> None:
+        """Map the buffer of a new page, filled with the background."""
+        number = len(self._sheets) + 1
+        # Anonymous, so no file is left in the output directory if the writer fails
+        self._buffer = mmap.mmap(-1, self._stride * self.layout.page_height)
+
+        # Fill with the background color a row at a time
+        row = self._bg * self.layout.page_width
+        for y in range(self.layout.page_height):
+            self._buffer[y * self._stride:(y + 1) * self._stride] = row
+
+        self._sheets.append({
+            "file": f"{self.prefix}_{number:04d}.png",
+            "width": self.layout.page_width,
+            "height": self.layout.page_height,
+            "tiles": [],
+        })
+
+    def _close_page(self) -> None:
+        """Encode the current page buffer to PNG and release the mapping."""
+        sheet = self._sheets[-1]
+        page = Image.frombuffer(
+            self.mode,
+            (self.layout.page_width, self.layout.page_height),
+            self._buffer,
+            "raw",
+            self.mode,
+            0,
+            1,
+        )
+        page.save(os.path.join(self.output_dir, sheet["file"]), dpi=(self.layout.dpi, self.layout.dpi))
+        del page
+
+        if self.keep_raw:
+            sheet["raw_file"] = f"{os.path.splitext(sheet['file'])[0]}.raw"
+            with open(os.path.join(self.output_dir, sheet["raw_file"]), "wb") as f:
+                f.write(self._buffer)
+
+        self._buffer.close()
+        self._buffer = None
+
+    def add(
+        self,
+        content: str,
+        version: Optional[int] = None,
+        error_correction: Optional[int] = None,
+        border: Optional[int] = None,
+        box_size: Optional[int] = None,
+        key: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Encode content and place the QR code in the next free cell.
+
+        Args:
+            content: The content to encode in the QR code
+            version: QR code version (1-40, controls size)
+            error_correction: Error correction level
+            border: Border size in boxes
+            box_size: Size of each box in pixels; defaults to the largest that fits the cell
+            key: Identifier stored in the index (defaults to the content)
+
+        Returns:
+            The index entry of the placed tile
+        """
+        matrix = self.generator.make_matrix(content, version, error_correction, border)
+        modules = len(matrix)
+
+        largest = min(self.layout.cell_width, self.layout.cell_height) // modules
+        if largest < 1:
+            raise ValueError(f"QR code with {modules} modules does not fit a sheet cell")
+        box_size = min(box_size, largest) if box_size else largest
+
+        slot = self._count % self.layout.cells_per_page
+        if slot == 0:
+            if self._buffer is not None:
+                self._close_page()
+            self._open_page()
+
+        cell_x, cell_y = self.layout.cell_origin(slot)
+        size = modules * box_size
+        x = cell_x + (self.layout.cell_width - size) // 2
+        y = cell_y + (self.layout.cell_height - size) // 2
+
+        dark = self._fg * box_size
+        light = self._bg * box_size
+        offset = y * self._stride + x * self._pixel_size
+        width = size * self._pixel_size
+        for row in matrix:
+            pixels = b"".join([dark if module else light for module in row])
+            for _ in range(box_size):
+                self._buffer[offset:offset + width] = pixels
+                offset += self._stride
+
+        tile = {
+            "index": self._count,
+            "key": content if key is None else key,
+            "x": x,
+            "y": y,
+            "width": size,
+            "height": size,
+        }
+        self._sheets[-1]["tiles"].append(tile)
+        self._count += 1
+        return tile
+
+    def close(self) -> str:
+        """
+        Finish the last page and write the JSON index.
+
+        Returns:
+            The path to the index file
+        """
+        if self._buffer is not None:
+            self._close_page()
+
+        index_path = os.path.join(self.output_dir, f"{self.prefix}_index.json")
+        with open(index_path, "w") as f:
+            json.dump({"layout": self.layout.to_dict(), "count": self._count, "sheets": self._sheets}, f)
+        return index_path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
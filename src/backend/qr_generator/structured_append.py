@@ -0,0 +1,359 @@
+"""
+Structured append: content split across up to 16 linked QR codes.
+
+Each code starts with a structured append header: the mode indicator 0011,
+the position of the code and the total number of codes (four bits each),
+and a parity byte, the XOR of every byte of the whole content. Readers
+that support structured append scan the codes in any order and join them.
+Splitting keeps every code at a modest version, which scans faster and
+more reliably than a single version 40 code.
+"""
+
+import os
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from functools import reduce
+from typing import List, Optional, Sequence, Tuple, Union
+
+import qrcode
+from PIL import Image
+from qrcode import util
+
+from .generator import QRGenerator
+from .numpy_encoder import _BitWriter, build_matrix, create_codewords
+from .planner import ImageBudgetError
+from .styles import QRStyle
+
+MAX_PARTS = 16
+
+# Versions above this scan noticeably slower on phones
+DEFAULT_MAX_VERSION = 20
+
+STRUCTURED_APPEND_MODE = 0b0011
+HEADER_BITS = 20
+
+_LENGTH_FIELD_RANGES = ((1, 9), (10, 26), (27, 40))
+
+# Optimal segment splitting threshold, as qrcode.QRCode.add_data uses by default
+_OPTIMIZE = 20
+
+
+def parity(content: str) -> int:
+    """
+    Compute the structured append parity byte of the whole content.
+
+    Args:
+        content: The content before splitting
+
+    Returns:
+        The XOR of every byte of the UTF-8 encoded content
+    """
+    return reduce(int.__xor__, content.encode("utf-8"), 0)
+
+
+def header(index: int, total: int, parity_byte: int) -> Tuple[int, int]:
+    """
+    Build the structured append header of one code.
+
+    Args:
+        index: Zero-based position of the code
+        total: Number of codes
+        parity_byte: Parity of the whole content
+
+    Returns:
+        The header as (value, bit_length), for create_codewords
+    """
+    if not 0 <= index < total <= MAX_PARTS:
+        raise ValueError(f"Invalid structured append position {index + 1} of {total}")
+    value = (STRUCTURED_APPEND_MODE << 16) | (index << 12) | ((total - 1) << 8) | parity_byte
+    return value, HEADER_BITS
+
+
+def _segments(text: str) -> List[util.QRData]:
+    """Split text into optimal mode segments, as qrcode.QRCode.add_data does."""
+    return list(util.optimal_data_chunks(text, minimum=_OPTIMIZE))
+
+
+def _bit_length(segments: Sequence[util.QRData], version: int, with_header: bool) -> int:
+    """Count the data bits of segments at a version, including the structured append header."""
+    buffer = _BitWriter()
+    for data in segments:
+        buffer.put(data.mode, 4)
+        buffer.put(len(data), util.length_in_bits(data.mode, version))
+        data.write(buffer)
+    return len(buffer) + (HEADER_BITS if with_header else 0)
+
+
+def _smallest_version(
+    segments: Sequence[util.QRData], error_correction: int, max_version: int, with_header: bool
+) -> Optional[int]:
+    """Get the smallest version up to max_version that holds the segments, or None."""
+    # Length fields only change size between these ranges of versions
+    for low, high in _LENGTH_FIELD_RANGES:
+        if low > max_version:
+            break
+        high = min(high, max_version)
+        bits = _bit_length(segments, low, with_header)
+        version = bisect_left(util.BIT_LIMIT_TABLE[error_correction], bits, low, high + 1)
+        if version <= high:
+            return version
+    return None
+
+
+def split_content(
+    content: str,
+    error_correction: int = qrcode.constants.ERROR_CORRECT_M,
+    max_version: int = DEFAULT_MAX_VERSION,
+    max_parts: int = MAX_PARTS,
+) -> List[str]:
+    """
+    Split content into the fewest parts that each fit a code of at most max_version.
+
+    Parts are near-equal runs of characters, so the codes come out about the
+    same size. Content that fits a single code is not split.
+
+    Args:
+        content: The content to split
+        error_correction: Error correction level of the codes
+        max_version: Largest version a code may use
+        max_parts: Largest number of parts, at most 16
+
+    Returns:
+        The parts, in order
+
+    Raises:
+        ValueError: If the content does not fit in max_parts codes
+    """
+    if not content:
+        raise ValueError("Content cannot be empty")
+    util.check_version(max_version)
+    if not 1 <= max_parts <= MAX_PARTS:
+        raise ValueError(f"Structured append links 1 to {MAX_PARTS} codes, got {max_parts}")
+
+    if _smallest_version(_segments(content), error_correction, max_version, False) is not None:
+        return [content]
+
+    for total in range(2, min(max_parts, len(content)) + 1):
+        bounds = [len(content) * i // total for i in range(total + 1)]
+        parts = [content[start:end] for start, end in zip(bounds, bounds[1:])]
+        if all(_smallest_version(_segments(part), error_correction, max_version, True) for part in parts):
+            return parts
+
+    raise ValueError(
+        f"Content is too long for {max_parts} QR codes of version {max_version}; "
+        f"raise the maximum version or lower the error correction level"
+    )
+
+
+def encode_parts(
+    content: str,
+    error_correction: int = qrcode.constants.ERROR_CORRECT_M,
+    max_version: int = DEFAULT_MAX_VERSION,
+    border: int = 4,
+    box_size: int = 10,
+    mask_pattern: Optional[int] = None,
+    max_parts: int = MAX_PARTS,
+) -> List[qrcode.QRCode]:
+    """
+    Split content and encode every part as a compiled QR code.
+
+    All codes of a split use the same version, so they render at the same
+    size. A single part is encoded as a plain code without header.
+
+    Args:
+        content: The content to encode
+        error_correction: Error correction level
+        max_version: Largest version a code may use
+        border: Border size in boxes
+        box_size: Size of each box in pixels
+        mask_pattern: Mask pattern (0-7) to use instead of searching for the best one
+        max_parts: Largest number of codes
+
+    Returns:
+        The compiled codes, in order
+
+    Raises:
+        ValueError: If the content does not fit in max_parts codes
+    """
+    parts = split_content(content, error_correction, max_version, max_parts)
+    linked = len(parts) > 1
+    segments = [_segments(part) for part in parts]
+    version = max(_smallest_version(s, error_correction, max_version, linked) for s in segments)
+    parity_byte = parity(content)
+
+    codes = []
+    for index, part_segments in enumerate(segments):
+        part_header = header(index, len(parts), parity_byte) if linked else None
+        codewords = create_codewords(version, error_correction, part_segments, header=part_header)
+        matrix, _ = build_matrix(version, error_correction, codewords, mask_pattern)
+
+        qr = qrcode.QRCode(
+            version=version, error_correction=error_correction, box_size=box_size, border=border
+        )
+        qr.data_list = part_segments
+        qr.modules_count = len(matrix)
+        qr.modules = matrix.tolist()
+        qr.data_cache = codewords
+        codes.append(qr)
+    return codes
+
+
+def render_parts(
+    generator: QRGenerator,
+    content: str,
+    error_correction: Optional[int] = None,
+    max_version: int = DEFAULT_MAX_VERSION,
+    box_size: Optional[int] = None,
+    border: Optional[int] = None,
+    fg_color: Optional[Union[str, Tuple[int, int, int]]] = None,
+    bg_color: Optional[Union[str, Tuple[int, int, int]]] = None,
+    title: Optional[str] = None,
+    mask_pattern: Optional[int] = None,
+    style: Optional[QRStyle] = None,
+    max_parts: int = MAX_PARTS,
+    workers: Optional[int] = None,
+) -> List[Image.Image]:
+    """
+    Split content into linked codes and render them in parallel.
+
+    Each code's image size is checked against the generator's budget before
+    it is rasterized. Titles are numbered, e.g. "Manual (2/5)".
+
+    Args:
+        generator: The QR generator providing defaults, budget and rasterizer
+        content: The content to encode
+        error_correction: Error correction level
+        max_version: Largest version a code may use
+        box_size: Size of each box in pixels
+        border: Border size in boxes
+        fg_color: Foreground color (color of the QR code)
+        bg_color: Background color
+        title: Title to display above every code
+        mask_pattern: Mask pattern (0-7) to use instead of searching for the best one
+        style: Module shape, eye style and gradient fill
+        max_parts: Largest number of codes
+        workers: Number of render threads; defaults to one per CPU
+
+    Returns:
+        The images, in order
+
+    Raises:
+        ValueError: If the content does not fit in max_parts codes
+        ImageBudgetError: If a code would exceed the generator's budget
+    """
+    if error_correction is None:
+        error_correction = generator.default_error_correction
+    if box_size is None:
+        box_size = generator.default_box_size
+    if border is None:
+        border = generator.default_border
+
+    codes = encode_parts(content, error_correction, max_version, border, box_size, mask_pattern, max_parts)
+    total = len(codes)
+
+    def render(index: int) -> Image.Image:
+        qr = codes[index]
+        part_title = f"{title} ({index + 1}/{total})" if title and total > 1 else title
+        qr.box_size = generator.plan(qr, box_size, fg_color, bg_color, part_title, style=style).box_size
+        img = generator.rasterize(qr, fg_color, bg_color, style)
+        if part_title:
+            return generator._add_title_to_image(img, part_title)
+        return img
+
+    if total == 1:
+        return [render(0)]
+    with ThreadPoolExecutor(max_workers=min(total, workers or os.cpu_count() or 1)) as pool:
+        return list(pool.map(render, range(total)))
+
+
+def tile_parts(
+    images: Sequence[Image.Image],
+    columns: Optional[int] = None,
+    gap: int = 0,
+    bg_color: Union[str, Tuple[int, int, int]] = "white",
+    max_pixels: Optional[int] = None,
+) -> Image.Image:
+    """
+    Tile the images of linked codes into one sheet, row by row.
+
+    Args:
+        images: The code images, in order
+        columns: Codes per row; defaults to a near-square grid
+        gap: Space between codes in pixels
+        bg_color: Color of the sheet behind and between the codes
+        max_pixels: Largest sheet to create, in pixels
+
+    Returns:
+        The sheet image
+
+    Raises:
+        ImageBudgetError: If the sheet would exceed max_pixels
+    """
+    if not images:
+        raise ValueError("No images to tile")
+    if columns is None:
+        columns = 1
+        while columns * columns < len(images):
+            columns += 1
+    rows = -(-len(images) // columns)
+    cell_width = max(image.width for image in images)
+    cell_height = max(image.height for image in images)
+    size = (columns * cell_width + (columns - 1) * gap, rows * cell_height + (rows - 1) * gap)
+    if max_pixels is not None and size[0] * size[1] > max_pixels:
+        raise ImageBudgetError(
+            f"A {size[0]}x{size[1]} sheet exceeds the budget of {max_pixels} pixels; use a smaller box size"
+        )
+
+    mode = "L" if all(image.mode in ("1", "L") for image in images) else "RGB"
+    sheet = Image.new(mode, size, bg_color)
+    for index, image in enumerate(images):
+        row, column = divmod(index, columns)
+        sheet.paste(image.convert(mode), (column * (cell_width + gap), row * (cell_height + gap)))
+    return sheet
+
+
+def generate_structured_append(
+    generator: QRGenerator,
+    content: str,
+    output_path: str,
+    sheet: bool = False,
+    columns: Optional[int] = None,
+    **options,
+) -> List[str]:
+    """
+    Split content into linked codes and save them as separate images or one sheet.
+
+    Separate images are named after the output path with their position,
+    e.g. manual-2-of-5.png; content that fits one code is saved to the
+    output path itself.
+
+    Args:
+        generator: The QR generator instance to use
+        content: The content to encode
+        output_path: Path of the sheet, or the pattern of the separate images
+        sheet: Tile the codes into one image at output_path
+        columns: Codes per row of the sheet
+        **options: Options accepted by render_parts
+
+    Returns:
+        The paths of the written images
+    """
+    images = render_parts(generator, content, **options)
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+
+    if sheet or len(images) == 1:
+        bg_color = options.get("bg_color") or generator.default_bg_color
+        # Every code keeps its own quiet zone, so the codes can touch
+        image = images[0] if len(images) == 1 else tile_parts(
+            images, columns, bg_color=bg_color, max_pixels=generator.budget.max_pixels
+        )
+        image.save(output_path)
+        return [output_path]
+
+    stem, extension = os.path.splitext(output_path)
+    paths = []
+    for index, image in enumerate(images):
+        path = f"{stem}-{index + 1}-of-{len(images)}{extension or '.png'}"
+        image.save(path)
+        paths.append(path)
+    return paths
@@ -0,0 +1,216 @@
+"""
+Reusable pre-rendered title bands and frames for QR code images.
+"""
+
+import os
+import threading
+from functools import lru_cache
+from typing import Dict, Optional, Tuple, Union
+
+from PIL import Image, ImageDraw, ImageFont
+
+Color = Union[str, Tuple[int, int, int]]
+
+
+# Fonts are loaded once per thread: FreeType faces must not be used by
+# several threads at the same time
+_fonts = threading.local()
+
+
+def load_title_font(font_size: int) -> ImageFont.ImageFont:
+    """
+    Load the font used for titles, falling back to PIL's default font.
+
+    Each thread gets its own font objects.
+
+    Args:
+        font_size: Font size in points
+
+    Returns:
+        The loaded font
+    """
+    fonts = getattr(_fonts, "cache", None)
+    if fonts is None:
+        fonts = _fonts.cache = {}
+
+    font = fonts.get(font_size)
+    if font is None:
+        font = fonts[font_size] = _open_title_font(font_size)
+    return font
+
+
+def _open_title_font(font_size: int) -> ImageFont.ImageFont:
+    """Open the title font from the system, or PIL's default font."""
+    try:
+        # Try common system fonts
+        if os.name == 'nt':  # Windows
+            return ImageFont.truetype("arial.ttf", font_size)
+        else:  # Linux/Mac
+            return ImageFont.truetype("DejaVuSans.ttf", font_size)
+    except Exception:
+        # Fall back to default
+        return ImageFont.load_default()
+
+
+class TitleTemplate:
+    """
+    A title band and optional frame that is laid out once and composited onto many QR codes.
+
+    The band and text are rendered the first time a QR code of a given width
+    is seen; every later code of that width only costs pasting the band, the
+    frame edges and the code. Only the band is cached, never a full-size
+    canvas. Templates are safe to share between threads, and each band is
+    rendered exactly once.
+    """
+
+    def __init__(
+        self,
+        title: str,
+        bg_color: Color = "#42f593",
+        text_color: Color = "white",
+        font_size: int = 30,
+        band_height: int = 80,
+        frame_width: int = 0,
+        frame_color: Color = "white",
+    ):
+        """
+        Initialize the template.
+
+        Args:
+            title: The title text
+            bg_color: Background color of the title band
+            text_color: Color of the title text
+            font_size: Font size of the title text
+            band_height: Height of the title band in pixels
+            frame_width: Width of the frame drawn around the whole image in pixels
+            frame_color: Color of the frame
+        """
+        self.title = title
+        self.bg_color = bg_color
+        self.text_color = text_color
+        self.font_size = font_size
+        self.band_height = band_height
+        self.frame_width = frame_width
+        self.frame_color = frame_color
+        self.renders = 0
+        self._bands: Dict[int, Image.Image] = {}
+        self._lock = threading.Lock()
+
+    def canvas_size(self, qr_size: Tuple[int, int]) -> Tuple[int, int]:
+        """
+        Get the size of the final image for a QR code of the given size.
+
+        Args:
+            qr_size: Width and height of the QR code image
+
+        Returns:
+            Width and height of the composited image
+        """
+        qr_width, qr_height = qr_size
+        return (
+            qr_width + 2 * self.frame_width,
+            qr_height + self.band_height + 2 * self.frame_width,
+        )
+
+    def _render(self, qr_width: int) -> Image.Image:
+        """Render the top frame edge and the band with its text for QR codes of the given width."""
+        frame = self.frame_width
+
+        # The band's rectangle includes its bottom edge, the first row under the band
+        band = Image.new(
+            'RGB', (qr_width + 2 * frame, frame + self.band_height + 1), self.frame_color if frame else 'white'
+        )
+        draw = ImageDraw.Draw(band)
+
+        # Draw the title background
+        draw.rectangle([(frame, frame), (frame + qr_width, frame + self.band_height)], fill=self.bg_color)
+
+        font = load_title_font(self.font_size)
+
+        # Try to center the text
+        try:
+            # For newer Pillow versions
+            text_width = draw.textlength(self.title, font=font)
+        except AttributeError:
+            # Fallback for older Pillow versions
+            text_width = font.getsize(self.title)[0]
+
+        text_x = frame + (qr_width - text_width) // 2
+        text_y = frame + (self.band_height - self.font_size) // 2  # Center vertically in title area
+
+        draw.text((text_x, text_y), self.title, fill=self.text_color, font=font)
+
+        return band
+
+    def _band(self, qr_width: int) -> Image.Image:
+        """Get the shared band for QR codes of the given width, rendering it once."""
+        band = self._bands.get(qr_width)
+        if band is None:
+            with self._lock:
+                band = self._bands.get(qr_width)
+                if band is None:
+                    band = self._render(qr_width)
+                    self._bands[qr_width] = band
+                    self.renders += 1
+        return band
+
+    def apply(self, img: Image.Image, out: Optional[Image.Image] = None) -> Image.Image:
+        """
+        Composite a QR code image into the template.
+
+        Args:
+            img: The QR code image
+            out: RGB image of the composited size to draw into instead of
+                allocating a new one
+
+        Returns:
+            A new image (or out) with the title band (and frame) around the QR code
+        """
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+
+        size = self.canvas_size(img.size)
+        frame = self.frame_width
+        band = self._band(img.width)
+
+        if out is not None and out.size == size and out.mode == 'RGB':
+            result = out
+            if frame:
+                # The band covers the top edge; the code leaves the other three
+                width, height = size
+                result.paste(self.frame_color, (0, band.height, frame, height))
+                result.paste(self.frame_color, (width - frame, band.height, width, height))
+                result.paste(self.frame_color, (frame, height - frame, width - frame, height))
+        else:
+            result = Image.new('RGB', size, self.frame_color if frame else 'white')
+        result.paste(band)
+        result.paste(img, (frame, frame + self.band_height))
+        return result
+
+
+@lru_cache(maxsize=128)
+def get_title_template(
+    title: str,
+    bg_color: Color = "#42f593",
+    text_color: Color = "white",
+    font_size: int = 30,
+    band_height: int = 80,
+    frame_width: int = 0,
+    frame_color: Color = "white",
+) -> TitleTemplate:
+    """
+    Get a shared title template, creating it on first use.
+
+    Args:
+        title: The title text
+        bg_color: Background color of the title band
+        text_color: Color of the title text
+        font_size: Font size of the title text
+        band_height: Height of the title band in pixels
+        frame_width: Width of the frame in pixels
+        frame_color: Color of the frame
+
+    Returns:
+        The cached template for these settings
+    """
+    return TitleTemplate(title, bg_color, text_color, font_size, band_height, frame_width, frame_color)
@@ -2,10 +2,16 @@
 Utility functions for QR code generation.
 """
 
+import base64
 import os
 import re
-from typing import Dict, Optional, Tuple, Union
-from urllib.parse import urlparse
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+from urllib.parse import quote, urlparse
+
+# Distinct dates and mail subjects cached by the bulk builders
+_PARSE_CACHE_SIZE = 4096
 
 
 def is_url(text: str) -> bool:
@@ -163,6 +169,14 @@ def format_contact_data(
     return "\n".join(vcard)
 
 
+@lru_cache(maxsize=_PARSE_CACHE_SIZE)
+def _iso_to_ics(dt: str) -> str:
+    """Convert a datetime-local value (YYYY-MM-DDTHH:MM) to ICS format."""
+    if not dt:
+        return ''
+    return datetime.strptime(dt, '%Y-%m-%dT%H:%M').strftime('%Y%m%dT%H%M%S')
+
+
 def format_event_data(
     name: str,
     start_iso: str,
@@ -181,16 +195,7 @@ def format_event_data(
     Returns:
         Formatted VCALENDAR string
     """
-    from datetime import datetime
-    
-    def iso_to_ics(dt: str) -> str:
-        """Convert ISO datetime to ICS format."""
-        if not dt:
-            return ''
-        # Parse datetime-local format: YYYY-MM-DDTHH:MM
-        return datetime.strptime(dt, '%Y-%m-%dT%H:%M').strftime('%Y%m%dT%H%M%S')
-    
-    dtstart = iso_to_ics(start_iso)
+    dtstart = _iso_to_ics(start_iso)
     
     lines = [
         'BEGIN:VCALENDAR',
@@ -202,7 +207,7 @@ def format_event_data(
     ]
     
     if end_iso:
-        dtend = iso_to_ics(end_iso)
+        dtend = _iso_to_ics(end_iso)
         if dtend:
             lines.append(f'DTEND:{dtend}')
     
@@ -247,8 +252,6 @@ def format_email_data(
     Returns:
         Formatted mailto URI string
     """
-    from urllib.parse import quote
-    
     query_params = []
     
     if subject:
@@ -260,3 +263,239 @@ def format_email_data(
     query_string = ('?' + '&'.join(query_params)) if query_params else ''
     
     return f'mailto:{recipient}{query_string}'
+
+
+def _text_column(name: str, column: Optional[Sequence[Any]], rows: int) -> List[str]:
+    """
+    Get a column as text, with missing values (None, empty or NaN) as empty strings.
+
+    Args:
+        name: Name of the column, for error messages
+        column: The column; None stands for a column of missing values
+        rows: Expected number of values
+
+    Returns:
+        The values as strings
+
+    Raises:
+        ValueError: If the column does not have the expected number of values
+    """
+    if column is None:
+        return [""] * rows
+    if len(column) != rows:
+        raise ValueError(f"Column {name} has {len(column)} values, expected {rows}")
+    if hasattr(column, "tolist"):
+        column = column.tolist()
+    return [value if value.__class__ is str else _text(value) for value in column]
+
+
+def _text(value: Any) -> str:
+    """Convert a non-string column value to text, or an empty string if it is missing."""
+    return "" if value is None or value != value else str(value)
+
+
+def _field_column(prefix: str, values: List[str]) -> List[str]:
+    """Prefix the present values of a column as payload lines, leaving missing ones empty."""
+    return [f"{prefix}{value}" if value else "" for value in values]
+
+
+def format_wifi_columns(
+    ssids: Sequence[str],
+    passwords: Optional[Sequence[Optional[str]]] = None,
+    securities: Optional[Sequence[Optional[str]]] = None,
+) -> List[str]:
+    """
+    Format WiFi payloads for many networks, one per row of the columns.
+
+    Columns are lists, tuples or arrays of equal length; None, empty and NaN
+    values count as missing. Each payload equals what format_wifi_data
+    returns for the row. Missing securities default to WPA.
+
+    Args:
+        ssids: The WiFi network names
+        passwords: The WiFi passwords (optional)
+        securities: The security types (optional)
+
+    Returns:
+        The payloads, in row order
+
+    Raises:
+        ValueError: If the columns have different lengths
+    """
+    rows = len(ssids)
+    ssids = _text_column("ssids", ssids, rows)
+    passwords = _text_column("passwords", passwords, rows)
+    securities = [security or "WPA" for security in _text_column("securities", securities, rows)]
+    return [
+        f"WIFI:S:{ssid};T:nopass;;" if security.lower() == "nopass" else f"WIFI:S:{ssid};T:{security};P:{password};"
+        for ssid, password, security in zip(ssids, passwords, securities)
+    ]
+
+
+def format_contact_columns(
+    names: Sequence[str],
+    phones: Optional[Sequence[Optional[str]]] = None,
+    emails: Optional[Sequence[Optional[str]]] = None,
+    companies: Optional[Sequence[Optional[str]]] = None,
+    titles: Optional[Sequence[Optional[str]]] = None,
+    websites: Optional[Sequence[Optional[str]]] = None,
+) -> List[str]:
+    """
+    Format vCards for many contacts, one per row of the columns.
+
+    Each payload equals what format_contact_data returns for the row.
+
+    Args:
+        names: Contact names
+        phones: Phone numbers (optional)
+        emails: Email addresses (optional)
+        companies: Company names (optional)
+        titles: Job titles (optional)
+        websites: Website URLs (optional)
+
+    Returns:
+        The vCards, in row order
+
+    Raises:
+        ValueError: If the columns have different lengths
+    """
+    rows = len(names)
+    names = _text_column("names", names, rows)
+    lines = zip(
+        _field_column("\nORG:", _text_column("companies", companies, rows)),
+        _field_column("\nTITLE:", _text_column("titles", titles, rows)),
+        _field_column("\nTEL:", _text_column("phones", phones, rows)),
+        _field_column("\nEMAIL:", _text_column("emails", emails, rows)),
+        _field_column("\nURL:", _text_column("websites", websites, rows)),
+    )
+    return [
+        f"BEGIN:VCARD\nVERSION:3.0\nN:{name}\nFN:{name}{org}{title}{tel}{email}{url}\nEND:VCARD"
+        for name, (org, title, tel, email, url) in zip(names, lines)
+    ]
+
+
+def format_event_columns(
+    names: Sequence[str],
+    starts: Sequence[str],
+    ends: Optional[Sequence[Optional[str]]] = None,
+    locations: Optional[Sequence[Optional[str]]] = None,
+) -> List[str]:
+    """
+    Format VCALENDAR payloads for many events, one per row of the columns.
+
+    Each payload equals what format_event_data returns for the row. Dates are
+    parsed once per distinct value.
+
+    Args:
+        names: Event names/titles
+        starts: Start dates/times in ISO format (YYYY-MM-DDTHH:MM)
+        ends: End dates/times in ISO format (optional)
+        locations: Event locations (optional)
+
+    Returns:
+        The payloads, in row order
+
+    Raises:
+        ValueError: If the columns have different lengths or a date is malformed
+    """
+    rows = len(names)
+    names = _text_column("names", names, rows)
+    starts = list(map(_iso_to_ics, _text_column("starts", starts, rows)))
+    ends = _field_column("\nDTEND:", list(map(_iso_to_ics, _text_column("ends", ends, rows))))
+    locations = _field_column("\nLOCATION:", _text_column("locations", locations, rows))
+    return [
+        "BEGIN:VCALENDAR\nVERSION:2.0\nPRODID:-//QRGenerator//EN\nBEGIN:VEVENT\n"
+        f"SUMMARY:{name}\nDTSTART:{start}{end}{location}\nEND:VEVENT\nEND:VCALENDAR"
+        for name, start, end, location in zip(names, starts, ends, locations)
+    ]
+
+
+def format_geo_columns(latitudes: Sequence[Any], longitudes: Sequence[Any]) -> List[str]:
+    """
+    Format geo URIs for many locations, one per row of the columns.
+
+    Args:
+        latitudes: Latitude coordinates
+        longitudes: Longitude coordinates
+
+    Returns:
+        The geo URIs (RFC 5870), in row order
+
+    Raises:
+        ValueError: If the columns have different lengths
+    """
+    rows = len(latitudes)
+    latitudes = _text_column("latitudes", latitudes, rows)
+    longitudes = _text_column("longitudes", longitudes, rows)
+    return [f'geo:{latitude},{longitude}' for latitude, longitude in zip(latitudes, longitudes)]
+
+
+def format_email_columns(
+    recipients: Sequence[str],
+    subjects: Optional[Sequence[Optional[str]]] = None,
+    bodies: Optional[Sequence[Optional[str]]] = None,
+) -> List[str]:
+    """
+    Format mailto URIs for many emails, one per row of the columns.
+
+    Each URI equals what format_email_data returns for the row. Subjects are
+    quoted once per distinct value.
+
+    Args:
+        recipients: Email recipient addresses
+        subjects: Email subjects (optional)
+        bodies: Email body texts (optional)
+
+    Returns:
+        The mailto URIs, in row order
+
+    Raises:
+        ValueError: If the columns have different lengths
+    """
+    rows = len(recipients)
+    recipients = _text_column("recipients", recipients, rows)
+    quote_subject = lru_cache(maxsize=_PARSE_CACHE_SIZE)(quote)
+    subjects = [f"subject={quote_subject(subject)}" if subject else "" for subject in _text_column("subjects", subjects, rows)]
+    bodies = [f"body={quote(body)}" if body else "" for body in _text_column("bodies", bodies, rows)]
+    return [
+        f"mailto:{recipient}?{subject}&{body}" if subject and body
+        else f"mailto:{recipient}?{subject or body}" if subject or body
+        else f"mailto:{recipient}"
+        for recipient, subject, body in zip(recipients, subjects, bodies)
+    ]
+
+
+def pack_matrix(matrix: Sequence[Sequence[bool]]) -> str:
+    """
+    Pack a module matrix into base64 for transfer to clients.
+
+    Modules are written row by row, one bit each, most significant bit first,
+    with 1 for dark modules. The last byte is padded with zero bits.
+
+    Args:
+        matrix: Rows of modules, True for dark modules
+
+    Returns:
+        The base64-encoded bit string
+    """
+    bits = "".join("1" if module else "0" for row in matrix for module in row)
+    padding = -len(bits) % 8
+    bits += "0" * padding
+    packed = int(bits, 2).to_bytes(len(bits) // 8, "big") if bits else b""
+    return base64.b64encode(packed).decode("ascii")
+
+
+def unpack_matrix(data: str, size: int) -> List[List[bool]]:
+    """
+    Unpack a module matrix produced by pack_matrix.
+
+    Args:
+        data: The base64-encoded bit string
+        size: Number of modules per row (and of rows)
+
+    Returns:
+        Rows of modules, True for dark modules
+    """
+    packed = base64.b64decode(data)
+    bits = bin(int.from_bytes(packed, "big"))[2:].zfill(len(packed) * 8) if packed else ""
+    return [[bit == "1" for bit in bits[r * size:(r + 1) * size]] for r in range(size)]
@@ -6,6 +6,7 @@ import os
 import re
 from typing import Dict, List, Optional, Tuple, Union
 
+from .planner import MAX_BOX_SIZE
 from .utils import is_url, get_file_extension
 
 
@@ -25,7 +26,7 @@ def validate_content(content: str) -> Tuple[bool, Optional[str]]:
     # QR codes have a maximum capacity depending on version and error correction
     # This is a simplified check - actual capacity depends on the QR version and error correction level
     if len(content) > 4000:
-        return False, "Content is too long for a QR code"
+        return False, "Content is too long for a QR code; split it across linked codes with structured append"
 
     return True, None
 
@@ -146,6 +147,9 @@ def validate_qr_parameters(
     if box_size is not None and (not isinstance(box_size, int) or box_size < 1):
         return False, "Box size must be a positive integer"
     
+    if box_size is not None and box_size > MAX_BOX_SIZE:
+        return False, f"Box size must not exceed {MAX_BOX_SIZE} pixels"
+    
     if border is not None and (not isinstance(border, int) or border < 0):
         return False, "Border must be a non-negative integer"
     
@@ -0,0 +1,224 @@
+"""
+Persistent worker mode for QR code generation.
+
+The worker keeps a single warm QRGenerator and answers newline-delimited
+JSON jobs, so callers pay interpreter startup and imports only once.
+"""
+
+import json
+import os
+import socketserver
+from typing import Any, Dict, IO, Optional
+
+from .generator import QRGenerator
+from .occlusion import LEVELS_BY_NAME
+from .styles import style_from_options
+from .utils import detect_content_type, format_wifi_data, format_contact_data
+
+
+# Options accepted by every job, mirroring the CLI option names
+_QR_OPTIONS = ("version", "box_size", "border", "fg_color", "bg_color", "mask_pattern", "target_width")
+
+# Keys each command reads from a job, besides ``command`` and ``id``
+JOB_OPTIONS = {
+    "generate": ("content", "output", "title", "module_style", "eye_style", "gradient", "gradient_type",
+                 "gradient_angle", "eye_color") + _QR_OPTIONS,
+    "generate-with-logo": ("content", "output", "logo", "logo_size", "title", "error_correction") + _QR_OPTIONS,
+    "wifi": ("ssid", "password", "security", "output", "title", "logo") + _QR_OPTIONS,
+    "contact": ("name", "phone", "email", "company", "job_title", "website", "output", "qr_title",
+                "logo") + _QR_OPTIONS,
+}
+
+
+def _qr_options(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Pick the QR code options present in a job."""
+    return {key: job[key] for key in _QR_OPTIONS if job.get(key) is not None}
+
+
+def run_job(generator: QRGenerator, job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run a single job against a warm generator.
+
+    Args:
+        generator: The QR generator instance to use
+        job: The job description. ``command`` selects one of ``generate``,
+            ``generate-with-logo``, ``wifi`` or ``contact``; the remaining
+            keys mirror the options of the matching CLI command. Other keys
+            are ignored unless ``strict`` is set.
+
+    Returns:
+        The reply for the job, with ``success`` and either ``output`` or ``error``.
+        A strict job with an unknown command or option is not run, and its
+        reply lists the offending keys under ``unsupported``.
+    """
+    reply = {"id": job.get("id"), "success": False}
+    command = job.get("command", "generate").replace("_", "-")
+
+    if job.get("strict"):
+        if command not in JOB_OPTIONS:
+            unsupported = ["command"]
+        else:
+            unsupported = sorted(set(job) - set(JOB_OPTIONS[command]) - {"command", "id", "strict"})
+        if unsupported:
+            reply["unsupported"] = unsupported
+            reply["error"] = f"Unsupported by this worker: {', '.join(unsupported)}"
+            return reply
+
+    try:
+        if command == "generate":
+            content = job["content"]
+            output_path = generator.generate(
+                content=content,
+                output_path=job["output"],
+                title=job.get("title"),
+                style=style_from_options(
+                    job.get("module_style"),
+                    job.get("eye_style"),
+                    job.get("gradient"),
+                    job.get("gradient_type", "linear"),
+                    job.get("gradient_angle", 0.0),
+                    job.get("eye_color"),
+                ),
+                **_qr_options(job)
+            )
+        elif command == "generate-with-logo":
+            content = job["content"]
+            output_path = generator.generate_with_logo(
+                content=content,
+                output_path=job["output"],
+                logo_path=job["logo"],
+                logo_size=job.get("logo_size", 0.2),
+                title=job.get("title"),
+                error_correction=LEVELS_BY_NAME.get(job.get("error_correction")),
+                **_qr_options(job)
+            )
+        elif command == "wifi":
+            ssid = job["ssid"]
+            content = format_wifi_data(ssid, job.get("password"), job.get("security", "WPA"))
+            kwargs = dict(
+                content=content,
+                output_path=job["output"],
+                title=job.get("title") or f"WiFi: {ssid}",
+                **_qr_options(job)
+            )
+            if job.get("logo"):
+                output_path = generator.generate_with_logo(logo_path=job["logo"], **kwargs)
+            else:
+                output_path = generator.generate(**kwargs)
+        elif command == "contact":
+            name = job["name"]
+            content = format_contact_data(
+                name=name,
+                phone=job.get("phone"),
+                email=job.get("email"),
+                company=job.get("company"),
+                title=job.get("job_title"),
+                website=job.get("website"),
+            )
+            kwargs = dict(
+                content=content,
+                output_path=job["output"],
+                title=job.get("qr_title") or f"Contact: {name}",
+                **_qr_options(job)
+            )
+            if job.get("logo"):
+                output_path = generator.generate_with_logo(logo_path=job["logo"], **kwargs)
+            else:
+                output_path = generator.generate(**kwargs)
+        else:
+            reply["error"] = f"Unknown command: {command}"
+            return reply
+    except KeyError as e:
+        reply["error"] = f"Missing required field: {e.args[0]}"
+        return reply
+    except Exception as e:
+        reply["error"] = str(e)
+        return reply
+
+    reply["success"] = True
+    reply["output"] = output_path
+    reply["content_type"] = detect_content_type(content)
+    return reply
+
+
+def handle_line(generator: QRGenerator, line: str) -> Optional[str]:
+    """
+    Decode one JSON job line, run it and encode the reply.
+
+    Args:
+        generator: The QR generator instance to use
+        line: A single line of input
+
+    Returns:
+        The JSON reply line (without newline), or None for blank input
+    """
+    line = line.strip()
+    if not line:
+        return None
+
+    try:
+        job = json.loads(line)
+        if not isinstance(job, dict):
+            raise ValueError("Job must be a JSON object")
+    except ValueError as e:
+        return json.dumps({"id": None, "success": False, "error": f"Invalid job: {str(e)}"})
+
+    return json.dumps(run_job(generator, job))
+
+
+def serve_stream(generator: QRGenerator, infile: IO[str], outfile: IO[str]) -> int:
+    """
+    Serve newline-delimited JSON jobs from a stream until it is exhausted.
+
+    Args:
+        generator: The QR generator instance to use
+        infile: Stream to read jobs from (e.g. stdin)
+        outfile: Stream to write replies to (e.g. stdout)
+
+    Returns:
+        The number of jobs processed
+    """
+    count = 0
+    for line in infile:
+        reply = handle_line(generator, line)
+        if reply is None:
+            continue
+        outfile.write(reply + "\n")
+        outfile.flush()
+        count += 1
+    return count
+
+
+class _JobHandler(socketserver.StreamRequestHandler):
+    """Answer every job line received on a client connection."""
+
+    def handle(self):
+        for raw in self.rfile:
+            reply = handle_line(self.server.generator, raw.decode("utf-8"))
+            if reply is None:
+                continue
+            self.wfile.write(reply.encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+def serve_unix_socket(generator: QRGenerator, socket_path: str) -> None:
+    """
+    Serve newline-delimited JSON jobs on a local Unix socket until interrupted.
+
+    Args:
+        generator: The QR generator instance to use
+        socket_path: Filesystem path of the socket to listen on
+    """
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    server = socketserver.UnixStreamServer(socket_path, _JobHandler)
+    server.generator = generator
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        try:
+            os.unlink(socket_path)
+        except OSError:
+            pass
@@ -0,0 +1,221 @@
+"""
+Precompressed, fingerprinted static assets for the bundled frontend.
+
+All frontend files are read once, compressed with gzip (and brotli when the
+``brotli`` package is installed) and given content hashes. Stylesheets and
+scripts are served under fingerprinted names with immutable caching, and the
+HTML is rewritten to reference them, so repeat page loads are answered from
+browser caches or with 304 responses.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import sys
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Files served at the site root come from this subdirectory
+HTML_DIR = 'html'
+
+# Subdirectories whose files get fingerprinted names
+FINGERPRINTED_DIRS = ('css', 'js')
+
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE = 'no-cache'
+
+
+class StaticAsset:
+    """A single file with its precompressed variants and validators."""
+
+    def __init__(self, data, mimetype, immutable):
+        """
+        Initialize the asset and precompress it.
+
+        Args:
+            data: The file contents
+            mimetype: The MIME type to serve it with
+            immutable: Whether the URL is fingerprinted and may be cached forever
+        """
+        self.mimetype = mimetype
+        self.immutable = immutable
+        self.digest = hashlib.sha256(data).hexdigest()
+        self.etag = f'"{self.digest[:32]}"'
+
+        # Only keep compressed variants that are actually smaller
+        self.variants = {'identity': data}
+        compressed = gzip.compress(data, compresslevel=9, mtime=0)
+        if len(compressed) < len(data):
+            self.variants['gzip'] = compressed
+        if brotli is not None:
+            compressed = brotli.compress(data, quality=11)
+            if len(compressed) < len(data):
+                self.variants['br'] = compressed
+
+
+def parse_accept_encoding(header):
+    """
+    Parse an Accept-Encoding header into the set of acceptable codings.
+
+    Args:
+        header: The header value (may be empty)
+
+    Returns:
+        The codings with a non-zero quality
+    """
+    accepted = set()
+    for part in (header or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        match = re.search(r'q=([0-9.]+)', params)
+        if match and float(match.group(1)) == 0:
+            continue
+        accepted.add(coding)
+    return accepted
+
+
+class StaticAssets:
+    """
+    In-memory registry of the frontend assets.
+    """
+
+    def __init__(self, root):
+        """
+        Load, fingerprint and precompress every file under the frontend root.
+
+        Args:
+            root: Path of the frontend directory
+        """
+        self.root = root
+        self.assets = {}
+        # Logical path (e.g. css/styles.css) -> fingerprinted path
+        self.fingerprints = {}
+
+        html_files = []
+        for directory, _, files in os.walk(root):
+            for name in sorted(files):
+                full_path = os.path.join(directory, name)
+                rel_path = os.path.relpath(full_path, root).replace(os.sep, '/')
+                top = rel_path.split('/', 1)[0]
+
+                if top == HTML_DIR:
+                    # HTML references are rewritten once fingerprints are known
+                    html_files.append((rel_path[len(HTML_DIR) + 1:], full_path))
+                    continue
+
+                with open(full_path, 'rb') as f:
+                    data = f.read()
+                mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+                if top in FINGERPRINTED_DIRS:
+                    asset = StaticAsset(data, mimetype, immutable=True)
+                    stem, ext = os.path.splitext(rel_path)
+                    fingerprinted = f'{stem}.{asset.digest[:10]}{ext}'
+                    self.fingerprints[rel_path] = fingerprinted
+                    self.assets[fingerprinted] = asset
+                    # The plain name stays reachable, but must be revalidated
+                    self.assets[rel_path] = StaticAsset(data, mimetype, immutable=False)
+                else:
+                    self.assets[rel_path] = StaticAsset(data, mimetype, immutable=False)
+
+        for rel_path, full_path in html_files:
+            with open(full_path, 'rb') as f:
+                data = self.rewrite_references(f.read().decode('utf-8')).encode('utf-8')
+            mimetype = mimetypes.guess_type(full_path)[0] or 'text/html'
+            self.assets[rel_path] = StaticAsset(data, mimetype, immutable=False)
+
+    def rewrite_references(self, html):
+        """
+        Point asset references in an HTML document at their fingerprinted URLs.
+
+        Args:
+            html: The HTML source
+
+        Returns:
+            The rewritten HTML
+        """
+        for logical, fingerprinted in self.fingerprints.items():
+            html = re.sub(
+                r'(["\'])(?:\.\./|/)?' + re.escape(logical) + r'\1',
+                lambda match: f'{match.group(1)}/{fingerprinted}{match.group(1)}',
+                html
+            )
+        return html
+
+    def response(self, path, request):
+        """
+        Build the response for an asset, negotiating encoding and validators.
+
+        Args:
+            path: The requested path, relative to the site root
+            request: The Flask request
+
+        Returns:
+            A Flask response, or None if the asset is unknown
+        """
+        asset = self.assets.get(path)
+        if asset is None:
+            return None
+
+        accepted = parse_accept_encoding(request.headers.get('Accept-Encoding'))
+        for coding in ('br', 'gzip', 'identity'):
+            if coding in asset.variants and (coding == 'identity' or coding in accepted):
+                break
+
+        # Each encoding is a different representation, so it gets its own tag
+        etag = asset.etag if coding == 'identity' else f'{asset.etag[:-1]}-{coding}"'
+
+        if etag in request.headers.get('If-None-Match', ''):
+            response = Response(status=304)
+        else:
+            response = Response(asset.variants[coding], mimetype=asset.mimetype)
+            if coding != 'identity':
+                response.headers['Content-Encoding'] = coding
+
+        response.headers['ETag'] = etag
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE if asset.immutable else REVALIDATE_CACHE
+        return response
+
+    def build(self, output_dir):
+        """
+        Write every asset and its compressed variants to a directory.
+
+        Useful for serving the frontend from a CDN or reverse proxy that can
+        send precompressed files (e.g. nginx ``gzip_static``/``brotli_static``).
+
+        Args:
+            output_dir: Directory to write to
+
+        Returns:
+            The number of files written
+        """
+        suffixes = {'identity': '', 'gzip': '.gz', 'br': '.br'}
+        count = 0
+        for path, asset in self.assets.items():
+            target = os.path.join(output_dir, *path.split('/'))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            for coding, data in asset.variants.items():
+                with open(target + suffixes[coding], 'wb') as f:
+                    f.write(data)
+                count += 1
+        return count
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print('Usage: python static_assets.py OUTPUT_DIR', file=sys.stderr)
+        sys.exit(1)
+
+    frontend_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'frontend')
+    written = StaticAssets(frontend_root).build(sys.argv[1])
+    print(f'{written} static files written to {sys.argv[1]}')
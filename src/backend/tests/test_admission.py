@@ -0,0 +1,141 @@
+"""Tests of rate limiting and admission control."""
+
+import threading
+import time
+
+import pytest
+
+import admission as admission_module
+import api
+from admission import AdmissionController, ClientRateLimiter, Overloaded, TokenBucket, estimate_cost
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def queue_behind_held_slot(controller, costs, order):
+    """Start a thread per cost that waits for a slot, then records its cost."""
+    errors = []
+
+    def run(cost):
+        try:
+            with controller.slot(cost):
+                order.append(cost)
+        except Overloaded as e:
+            errors.append((cost, e.reason))
+
+    threads = []
+    for cost in costs:
+        thread = threading.Thread(target=run, args=(cost,))
+        thread.start()
+        threads.append(thread)
+        # Queue the threads one at a time, so arrival order is known
+        wait_for(lambda: controller.stats()["queue_depth"] + len(errors) == len(threads))
+    return threads, errors
+
+
+def test_token_bucket_refills_over_time(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(admission_module.time, "monotonic", lambda: now[0])
+    bucket = TokenBucket(rate=2, capacity=4)
+    assert bucket.consume(3)
+    assert not bucket.consume(2)
+    now[0] += 0.5
+    assert bucket.consume(2)
+    # Refills never exceed the capacity
+    now[0] += 60
+    assert bucket.consume(4) and not bucket.consume(0.5)
+
+    # A request costlier than the bucket passes only on a full bucket, and
+    # leaves the bucket in debt
+    now[0] += 2
+    assert bucket.consume(10)
+    now[0] += 2
+    assert not bucket.consume(1)
+
+
+def test_rate_limiter_tracks_clients_separately():
+    limiter = ClientRateLimiter(rate=0.001, capacity=2, max_clients=2)
+    assert limiter.allow("a", 2)
+    assert not limiter.allow("a", 1)
+    assert limiter.allow("b", 1)
+    # A third client evicts the least recently seen, whose bucket starts full again
+    assert limiter.allow("c", 1)
+    assert limiter.allow("a", 2)
+    assert limiter.stats() == {"clients": 2, "limited": 1}
+
+
+def test_cost_grows_with_the_work():
+    small = estimate_cost("https://example.com", box_size=10)
+    assert estimate_cost("https://example.com", box_size=20) > small
+    assert estimate_cost("x" * 500, box_size=10) > small
+    assert estimate_cost("https://example.com", box_size=10, title="Menu", logo=True) == small + 1.5
+    assert estimate_cost("https://example.com", rasterize=False) < small
+
+
+def test_waiting_requests_are_admitted_cheapest_first():
+    controller = AdmissionController(max_concurrent=1, max_queue=8)
+    order = []
+    with controller.slot(1):
+        threads, errors = queue_behind_held_slot(controller, [5, 1, 3, 1], order)
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert order == [1, 1, 3, 5]
+    stats = controller.stats()
+    assert stats["admitted"] == 5 and stats["deferred"] == 4 and stats["in_flight"] == 0
+
+
+def test_full_queue_sheds_the_most_expensive_request():
+    controller = AdmissionController(max_concurrent=1, max_queue=1)
+    order = []
+    with controller.slot(1):
+        threads, errors = queue_behind_held_slot(controller, [5], order)
+        # Not cheaper than the waiter: shed at once
+        with pytest.raises(Overloaded) as info:
+            with controller.slot(5):
+                pass
+        assert info.value.reason == "queue full"
+        # Cheaper: takes the waiter's place
+        more, _ = queue_behind_held_slot(controller, [2], order)
+        threads[0].join()
+    for thread in more:
+        thread.join()
+    assert errors == [(5, "evicted by cheaper requests")]
+    assert order == [2]
+    assert controller.stats()["shed"] == {"queue_full": 1, "evicted": 1, "timeout": 0, "total": 2}
+
+
+def test_waiting_too_long_is_shed():
+    controller = AdmissionController(max_concurrent=1, max_queue=4, queue_timeout=0.05)
+    with controller.slot(1):
+        with pytest.raises(Overloaded) as info:
+            with controller.slot(1):
+                pass
+    assert info.value.reason == "queue timeout"
+    assert controller.stats()["queue_depth"] == 0
+
+
+def test_api_rejects_with_retry_after(monkeypatch):
+    client = api.app.test_client()
+    payload = {"type": "custom", "content": "https://example.com", "title": "Menu"}
+
+    monkeypatch.setattr(api, "rate_limiter", ClientRateLimiter(rate=0.001, capacity=1))
+    assert client.post("/api/generate", json=payload).status_code == 200
+    response = client.post("/api/generate", json=payload)
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+    assert response.json["success"] is False
+
+    controller = AdmissionController(max_concurrent=1, max_queue=0)
+    monkeypatch.setattr(api, "rate_limiter", ClientRateLimiter(rate=1000, capacity=1000))
+    monkeypatch.setattr(api, "admission", controller)
+    with controller.slot(1):
+        response = client.post("/api/generate", json=dict(payload, content="https://example.com/busy"))
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert "overloaded" in response.json["error"]
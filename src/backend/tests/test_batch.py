@@ -0,0 +1,103 @@
+"""Tests of sharded, resumable batch generation."""
+
+import io
+import json
+import os
+
+import pytest
+
+from qr_generator import QRGenerator
+from qr_generator.batch import (
+    item_key,
+    journal_path,
+    output_name,
+    parse_shard,
+    read_journal,
+    read_manifest,
+    run_batch,
+    shard_of,
+)
+
+ITEMS = [{"content": f"https://example.com/{i}", "name": f"codes/{i}.png"} for i in range(12)]
+
+
+def crash_after(items, count):
+    """Yield items, then fail as a killed run would."""
+    for index, item in enumerate(items):
+        if index == count:
+            raise KeyboardInterrupt
+        yield item
+
+
+def test_manifest_lines_and_shard_specs():
+    manifest = io.StringIO('https://example.com/a\n\n{"content": "b", "name": "b.png"}\n')
+    assert list(read_manifest(manifest)) == [{"content": "https://example.com/a"}, {"content": "b", "name": "b.png"}]
+    assert parse_shard("2/8") == (1, 8)
+    for spec in ("0/4", "5/4", "x/4", "1"):
+        with pytest.raises(ValueError):
+            parse_shard(spec)
+    with pytest.raises(ValueError):
+        output_name({"name": "../escape.png"}, "k")
+
+
+@pytest.mark.parametrize("strategy", ["index", "hash"])
+def test_shards_split_the_manifest(tmp_path, strategy):
+    generator = QRGenerator()
+    outputs = []
+    for shard in range(3):
+        report = run_batch(ITEMS, str(tmp_path), generator, shard, 3, strategy)
+        assert report.failed == 0 and report.generated == report.total
+        outputs.extend(entry["output"] for entry in read_journal(journal_path(str(tmp_path), shard, 3)).values())
+
+    # Every item is generated by exactly one shard
+    assert sorted(outputs) == sorted(item["name"] for item in ITEMS)
+    assert sorted(os.listdir(tmp_path / "codes")) == sorted(os.path.basename(item["name"]) for item in ITEMS)
+
+
+def test_hash_shards_survive_reordering():
+    keys = [item_key(item) for item in ITEMS]
+    assignment = {key: shard_of(index, key, 4, "hash") for index, key in enumerate(keys)}
+    reordered = list(reversed(keys))
+    assert all(shard_of(index, key, 4, "hash") == assignment[key] for index, key in enumerate(reordered))
+    assert len(set(assignment.values())) > 1
+    assert [shard_of(index, key, 4) for index, key in enumerate(keys)] == [index % 4 for index in range(12)]
+
+
+def test_run_resumes_after_the_journaled_items(tmp_path):
+    generator = QRGenerator()
+    with pytest.raises(KeyboardInterrupt):
+        run_batch(crash_after(ITEMS, 5), str(tmp_path), generator)
+    path = journal_path(str(tmp_path), 0, 1)
+    assert len(read_journal(path)) == 5
+
+    # A line torn by the crash is dropped
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"key": "torn", "outp')
+    mtime = os.path.getmtime(tmp_path / "codes" / "0.png")
+    report = run_batch(ITEMS, str(tmp_path), generator)
+    assert (report.total, report.skipped, report.generated) == (12, 5, 7)
+    assert os.path.getmtime(tmp_path / "codes" / "0.png") == mtime
+    with open(path, encoding="utf-8") as f:
+        assert len([json.loads(line) for line in f]) == 12
+
+    # Nothing is left to do, unless an output went missing
+    os.remove(tmp_path / "codes" / "3.png")
+    report = run_batch(ITEMS, str(tmp_path), generator)
+    assert (report.skipped, report.generated) == (11, 1)
+    assert (tmp_path / "codes" / "3.png").exists()
+
+
+def test_failed_items_are_retried_on_request(tmp_path):
+    items = ITEMS[:2] + [{"content": "x", "fg_color": "not-a-color", "name": "bad.png"}]
+    report = run_batch(items, str(tmp_path))
+    assert (report.generated, report.failed) == (2, 1)
+    assert run_batch(items, str(tmp_path)).skipped == 3
+    report = run_batch(items, str(tmp_path), retry_failed=True)
+    assert (report.skipped, report.failed) == (2, 1)
+
+
+def test_duplicate_codes_are_linked(tmp_path):
+    items = [{"content": "https://example.com/same", "name": f"{name}.png"} for name in ("a", "b", "c")]
+    report = run_batch(items, str(tmp_path))
+    assert (report.generated, report.linked) == (3, 2)
+    assert (tmp_path / "a.png").read_bytes() == (tmp_path / "c.png").read_bytes()
@@ -0,0 +1,85 @@
+"""Tests of the per-thread scratch buffers of QRGenerator."""
+
+import threading
+
+from qr_generator import QRGenerator, generator as generator_module
+
+SIZES = [
+    dict(content="https://example.com/small", box_size=2, fg_color="#1a237e", bg_color="#fffde7"),
+    dict(content="https://example.com/large/" + "x" * 200, box_size=12, fg_color="#1a237e", bg_color="#fffde7",
+         title="Large"),
+    dict(content="https://example.com/small", box_size=2, fg_color="#1a237e", bg_color="#fffde7"),
+    dict(content="Hello", box_size=5, title="Hello"),
+    dict(content="Hello", box_size=5),
+]
+
+
+def pixels(img):
+    return img.size, img.mode, img.tobytes()
+
+
+def test_threads_get_their_own_buffers():
+    generator = QRGenerator()
+    barrier = threading.Barrier(2)
+    seen = {}
+
+    def use(name):
+        image = generator._scratch_buffer((64, 64))
+        array = generator._scratch_array(4096)
+        barrier.wait()
+        # The same thread gets the same buffers back
+        assert generator._scratch_buffer((64, 64)) is image
+        assert generator._scratch_array(100).base is array.base
+        seen[name] = (image, array.base)
+
+    threads = [threading.Thread(target=use, args=(name,)) for name in ("a", "b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert seen["a"][0] is not seen["b"][0]
+    assert seen["a"][1] is not seen["b"][1]
+
+
+def test_concurrent_renders_do_not_overwrite_each_other():
+    generator = QRGenerator()
+    cases = [dict(content=f"https://example.com/{i}", box_size=4, fg_color="#800000", title=f"Code {i}")
+             for i in range(4)]
+    expected = [pixels(QRGenerator().render(**case)) for case in cases]
+    barrier = threading.Barrier(len(cases))
+    results = {}
+
+    def render(index):
+        img = generator.render(reuse_buffer=True, **cases[index])
+        # Every thread renders before any result is checked
+        barrier.wait()
+        results[index] = pixels(img)
+
+    threads = [threading.Thread(target=render, args=(i,)) for i in range(len(cases))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert [results[i] for i in range(len(cases))] == expected
+
+
+def test_differently_sized_renders_do_not_leak_pixels():
+    reference = QRGenerator()
+    generator = QRGenerator()
+    for case in SIZES:
+        assert pixels(generator.render(reuse_buffer=True, **case)) == pixels(reference.render(**case))
+        with generator.encode_image(generator.render(reuse_buffer=True, **case)) as png_data:
+            expected = bytes(png_data)
+        with reference.encode_image(reference.render(**case)) as png_data:
+            assert bytes(png_data) == expected
+
+
+def test_buffers_stay_within_the_memory_limit(monkeypatch):
+    monkeypatch.setattr(generator_module, "MAX_SCRATCH_BYTES", 1024 * 1024)
+    generator = QRGenerator()
+    for box_size in range(2, 14):
+        generator.render("https://example.com", box_size=box_size, title="Menu", fg_color="red", reuse_buffer=True)
+        buffers = generator._scratch_buffers()
+        assert sum(generator_module._buffer_bytes(buffer) for buffer in buffers.values()) <= 1024 * 1024
+    # The most recent render's buffers are kept
+    assert len(buffers) > 0
@@ -0,0 +1,109 @@
+"""Tests of incremental builds."""
+
+import json
+import os
+
+import pytest
+from PIL import Image
+
+from qr_generator import dedup
+from qr_generator.build import MANIFEST_NAME, IncrementalBuilder, read_rows
+
+HEADER = "name,content,title,box_size,logo,logo_size\n"
+
+
+def write_rows(path, rows):
+    path.write_text(HEADER + "".join(f"{row}\n" for row in rows), encoding="utf-8")
+
+
+def mtimes(directory):
+    return {name: os.stat(directory / name).st_mtime_ns for name in os.listdir(directory) if name.endswith(".png")}
+
+
+@pytest.fixture
+def source(tmp_path):
+    Image.new("RGB", (40, 40), "red").save(tmp_path / "logo.png")
+    path = tmp_path / "codes.csv"
+    write_rows(path, [
+        "a.png,https://example.com/a,Menu,4,,",
+        "b.png,https://example.com/b,,4,,",
+        f"c.png,https://example.com/c,,4,{tmp_path / 'logo.png'},0.2",
+    ])
+    return path
+
+
+def test_csv_rows_become_jobs(source):
+    rows = list(read_rows(str(source)))
+    assert rows[0] == {"name": "a.png", "content": "https://example.com/a", "title": "Menu", "box_size": 4}
+    assert rows[2]["logo_size"] == 0.2 and "title" not in rows[2]
+
+
+def test_only_changed_rows_are_rebuilt(tmp_path, source):
+    out = tmp_path / "out"
+    builder = IncrementalBuilder(str(out))
+    report = builder.build(str(source))
+    assert (report.total, report.built, report.failed) == (3, 3, [])
+    before = mtimes(out)
+
+    report = IncrementalBuilder(str(out)).build(str(source))
+    assert (report.built, report.unchanged) == (0, 3)
+    assert mtimes(out) == before
+
+    # A changed title rebuilds its row only
+    write_rows(source, [
+        "a.png,https://example.com/a,Drinks,4,,",
+        "b.png,https://example.com/b,,4,,",
+        f"c.png,https://example.com/c,,4,{tmp_path / 'logo.png'},0.2",
+    ])
+    report = IncrementalBuilder(str(out)).build(str(source))
+    assert (report.built, report.unchanged) == (1, 2)
+    after = mtimes(out)
+    assert after["a.png"] != before["a.png"]
+    assert after["b.png"] == before["b.png"] and after["c.png"] == before["c.png"]
+
+
+def test_logo_changes_missing_outputs_and_removed_rows(tmp_path, source):
+    out = tmp_path / "out"
+    IncrementalBuilder(str(out)).build(str(source))
+
+    # The logo's bytes are part of the fingerprint
+    Image.new("RGB", (40, 40), "blue").save(tmp_path / "logo.png")
+    os.remove(out / "b.png")
+    report = IncrementalBuilder(str(out)).build(str(source))
+    assert (report.built, report.unchanged) == (2, 1)
+
+    write_rows(source, ["a.png,https://example.com/a,Menu,4,,"])
+    report = IncrementalBuilder(str(out)).build(str(source))
+    assert (report.unchanged, report.removed) == (1, 2)
+    assert sorted(mtimes(out)) == ["a.png"]
+    with open(out / MANIFEST_NAME, encoding="utf-8") as f:
+        assert sorted(json.load(f)["outputs"]) == ["a.png"]
+
+
+def test_interrupted_build_resumes_where_it_stopped(tmp_path, source, monkeypatch):
+    out = tmp_path / "out"
+    run = dedup.Deduplicator.run
+    calls = []
+
+    def interrupted(self, job, *args):
+        if len(calls) == 2:
+            raise KeyboardInterrupt
+        calls.append(job["output"])
+        return run(self, job, *args)
+
+    monkeypatch.setattr(dedup.Deduplicator, "run", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        IncrementalBuilder(str(out)).build(str(source))
+    monkeypatch.setattr(dedup.Deduplicator, "run", run)
+
+    with open(out / MANIFEST_NAME, encoding="utf-8") as f:
+        assert sorted(json.load(f)["outputs"]) == ["a.png", "b.png"]
+    report = IncrementalBuilder(str(out)).build(str(source))
+    assert (report.built, report.unchanged) == (1, 2)
+
+
+def test_rows_writing_the_same_output_are_rejected(tmp_path):
+    source = tmp_path / "codes.csv"
+    write_rows(source, ["a.png,https://example.com/1,,,,", "a.png,https://example.com/2,,,,"])
+    with pytest.raises(ValueError, match="a.png"):
+        IncrementalBuilder(str(tmp_path / "out")).build(str(source))
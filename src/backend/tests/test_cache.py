@@ -0,0 +1,27 @@
+"""Tests of the shared LRU cache."""
+
+from qr_generator.cache import LRUCache
+
+
+def test_cache_is_bounded_by_entries():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    # "b" was the least recently used
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats() == {"entries": 2, "bytes": 0, "hits": 3, "misses": 1}
+
+
+def test_cache_is_bounded_by_bytes():
+    cache = LRUCache(None, max_bytes=100, sizeof=len)
+    cache.put("a", b"x" * 60)
+    cache.put("b", b"x" * 30)
+    cache.put("c", b"x" * 30)
+    assert cache.get("a") is None
+    assert cache.get("b") is not None and cache.get("c") is not None
+    cache.put("huge", b"x" * 101)
+    assert cache.get("huge") is None
+    assert cache.stats()["bytes"] == 60
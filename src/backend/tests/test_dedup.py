@@ -0,0 +1,38 @@
+"""Tests of batch output deduplication."""
+
+import os
+
+from PIL import Image
+
+from qr_generator.batch import run_batch
+from qr_generator.dedup import render_key
+
+
+def test_equivalent_jobs_share_a_key():
+    wifi = {"command": "wifi", "ssid": "Office", "password": "pw", "output": "a.png"}
+    explicit = dict(wifi, security="WPA", output="b.png")
+    assert render_key(wifi) == render_key(explicit)
+    assert render_key({"content": "x", "fg_color": "#000", "output": "a.png"}) == render_key(
+        {"content": "x", "fg_color": "black", "output": "b.png"}
+    )
+
+
+def test_output_format_is_part_of_the_key():
+    job = {"content": "x", "title": "T"}
+    assert render_key(dict(job, output="a.png")) != render_key(dict(job, output="b.jpg"))
+    assert render_key(dict(job, output="a.jpg")) == render_key(dict(job, output="b.jpeg"))
+
+
+def test_batch_links_duplicates_of_the_same_format(tmp_path):
+    items = [
+        {"content": "https://example.com", "title": "Menu", "name": "a.png"},
+        {"content": "https://example.com", "title": "Menu", "name": "b.png"},
+        {"content": "https://example.com", "title": "Menu", "name": "c.jpg"},
+    ]
+    report = run_batch(items, str(tmp_path))
+    assert (report.generated, report.linked, report.failed) == (3, 1, 0)
+
+    assert os.path.samefile(tmp_path / "a.png", tmp_path / "b.png")
+    assert not os.path.samefile(tmp_path / "a.png", tmp_path / "c.jpg")
+    with Image.open(tmp_path / "c.jpg") as img:
+        assert img.format == "JPEG"
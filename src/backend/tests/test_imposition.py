@@ -0,0 +1,65 @@
+"""Tests of label imposition into PDF files."""
+
+import re
+import zlib
+
+import pytest
+import qrcode
+
+from qr_generator.imposition import SheetSpec, impose_pdf
+
+
+def read_pdf(path):
+    """Get the page count of a PDF and the decompressed content stream of every page."""
+    with open(path, "rb") as f:
+        data = f.read()
+    count = int(re.search(rb"/Type /Pages /Kids \[[^\]]*\] /Count (\d+)", data).group(1))
+    streams = [zlib.decompress(stream).decode("latin-1")
+               for stream in re.findall(rb"stream\n(.*?)\nendstream", data, re.DOTALL)]
+    return count, streams
+
+
+def rectangles(content, color):
+    """Get the rectangles filled in a color, as (x, y, width, height)."""
+    pattern = re.escape(color) + r" rg ([\d.-]+) ([\d.-]+) ([\d.-]+) ([\d.-]+) re f"
+    return [tuple(float(v) for v in match) for match in re.findall(pattern, content)]
+
+
+def test_pages_and_label_placement(tmp_path):
+    sheet = SheetSpec(2, 3, "a4", margin=10, gap=5, label_color="#000080")
+    jobs = [{"content": f"https://example.com/{i}", "title": f"Label {i}"} for i in range(8)]
+    count = impose_pdf(jobs, str(tmp_path / "labels.pdf"), sheet)
+
+    pages, streams = read_pdf(tmp_path / "labels.pdf")
+    assert count == 8
+    assert pages == 2 and len(streams) == 2
+
+    labels = rectangles(streams[0], "0 0 0.502")
+    assert len(labels) == 6
+    assert len(rectangles(streams[1], "0 0 0.502")) == 2
+    for slot, label in enumerate(labels):
+        assert label == pytest.approx(sheet.label_box(slot), abs=1e-3)
+
+    # Every code sits on a light square inside its label
+    codes = rectangles(streams[0], "1 1 1")
+    assert len(codes) == 6
+    for (x, y, width, height), (cx, cy, side, _) in zip(labels, codes):
+        assert x < cx and cx + side < x + width
+        assert y < cy and cy + side < y + height
+
+
+def test_error_correction_names_are_mapped(tmp_path):
+    sheet = SheetSpec(1, 1)
+    impose_pdf([{"content": "x", "error_correction": "H"}], str(tmp_path / "name.pdf"), sheet)
+    impose_pdf([{"content": "x", "error_correction": qrcode.constants.ERROR_CORRECT_H}],
+               str(tmp_path / "constant.pdf"), sheet)
+    assert read_pdf(tmp_path / "name.pdf")[1] == read_pdf(tmp_path / "constant.pdf")[1]
+
+    with pytest.raises(ValueError):
+        impose_pdf([{"content": "x", "error_correction": "Z"}], str(tmp_path / "bad.pdf"), sheet)
+
+
+def test_label_without_room_for_the_code_is_rejected(tmp_path):
+    sheet = SheetSpec(20, 10, "a4", margin=5, padding=3, title_size=40)
+    with pytest.raises(ValueError, match="no room"):
+        impose_pdf([{"content": "x", "title": "Title"}], str(tmp_path / "labels.pdf"), sheet)
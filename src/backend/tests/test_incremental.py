@@ -0,0 +1,70 @@
+"""Tests of incremental rendering."""
+
+from qr_generator import QRGenerator
+from qr_generator.incremental import IncrementalRenderer
+from qr_generator.spec import RenderSpec
+
+
+def test_stage_caches_stay_within_their_budget():
+    budget = 4 * 1024 * 1024
+    renderer = IncrementalRenderer(max_bytes=budget)
+    for i in range(40):
+        renderer.render(f"https://example.com/{i}", box_size=20, title=f"Code {i}")
+    stats = renderer.stats()
+    for stage in ("matrix", "raster", "title"):
+        assert 0 < stats[stage]["bytes"] <= budget
+    assert stats["raster"]["entries"] < 40
+
+
+def hits(renderer):
+    return {stage: (stats["hits"], stats["misses"]) for stage, stats in renderer.stats().items()}
+
+
+def test_title_change_reuses_the_matrix_and_raster():
+    renderer = IncrementalRenderer()
+    renderer.render("https://example.com", title="Before")
+    renderer.render("https://example.com", title="After")
+    assert hits(renderer) == {"matrix": (1, 1), "raster": (1, 1), "title": (0, 2)}
+
+
+def test_color_change_reuses_the_matrix():
+    renderer = IncrementalRenderer()
+    renderer.render("https://example.com", fg_color="black", title="Menu")
+    renderer.render("https://example.com", fg_color="#000080", title="Menu")
+    assert hits(renderer) == {"matrix": (1, 1), "raster": (0, 2), "title": (0, 2)}
+
+    # Equal colors spelled differently are the same render
+    renderer.render("https://example.com", fg_color="#000", title="Menu")
+    assert hits(renderer)["title"] == (1, 2)
+
+
+def test_incremental_render_matches_a_full_render():
+    generator = QRGenerator()
+    renderer = IncrementalRenderer(generator)
+    options = dict(box_size=6, fg_color="#204080", bg_color="#ffffe0")
+    renderer.render("https://example.com", title="Before", **options)
+
+    for title in ("After", None):
+        img = renderer.render("https://example.com", title=title, **options)
+        expected = generator.render_spec(RenderSpec("https://example.com", title=title, **options))
+        assert img.size == expected.size
+        assert img.convert("RGB").tobytes() == expected.convert("RGB").tobytes()
+
+
+def test_preview_endpoint_reuses_cached_stages(monkeypatch):
+    import api
+
+    renderer = IncrementalRenderer()
+    monkeypatch.setattr(api, "preview_renderer", renderer)
+    client = api.app.test_client()
+    payload = {"type": "custom", "content": "https://example.com", "title": "Before"}
+
+    first = client.post("/api/preview", json=payload)
+    second = client.post("/api/preview", json=dict(payload, title="After"))
+    assert first.status_code == second.status_code == 200
+    assert second.json["qrCodeUrl"].startswith("data:image/png;base64,")
+    assert second.json["qrCodeUrl"] != first.json["qrCodeUrl"]
+    assert hits(renderer)["matrix"] == (1, 1) and hits(renderer)["raster"] == (1, 1)
+
+    matrix = client.post("/api/preview", json=dict(payload, render="matrix"))
+    assert matrix.status_code == 200 and "matrix" in matrix.json
@@ -0,0 +1,110 @@
+"""Tests of background jobs."""
+
+import json
+import os
+import time
+import zipfile
+
+import api
+from admission import ClientRateLimiter
+from qr_generator import QRGenerator
+from qr_generator.jobs import DONE, FAILED, JobQueue, process_job, run_worker
+
+ITEMS = [
+    {"content": "https://example.com/1", "name": "a.png"},
+    {"content": "https://example.com/2", "name": "b.png"},
+    {"content": "https://example.com/1", "name": "c.png"},
+]
+
+
+def read_results(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_job_writes_results_and_archive(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    job_id = queue.submit(ITEMS)
+    job = queue.claim("a")
+    artifacts = tmp_path / "artifacts"
+
+    assert process_job(queue, job, str(artifacts), QRGenerator(), "a")
+    assert queue.status(job_id)["status"] == DONE
+    results = read_results(artifacts / job_id / "results.jsonl")
+    assert [result["output"] for result in results] == ["000000-a.png", "000001-b.png", "000002-c.png"]
+    assert results[2]["duplicate_of"] == "000000-a.png"
+    assert sorted(os.listdir(artifacts / job_id)) == ["000000-a.png", "000001-b.png", "000002-c.png", "results.jsonl"]
+    with zipfile.ZipFile(artifacts / f"{job_id}.zip") as zf:
+        assert sorted(zf.namelist()) == sorted(os.listdir(artifacts / job_id))
+
+
+def test_worker_that_lost_its_lease_records_nothing(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"), lease_seconds=0.01)
+    job_id = queue.submit(ITEMS)
+    stale = queue.claim("a")
+    time.sleep(0.05)
+    current = queue.claim("b")
+    artifacts = tmp_path / "artifacts"
+    results_path = artifacts / job_id / "results.jsonl"
+
+    # The stale worker finishes its items but may not publish them
+    assert not process_job(queue, stale, str(artifacts), QRGenerator(), "a")
+    assert not results_path.exists()
+    assert not (artifacts / f"{job_id}.zip").exists()
+
+    assert process_job(queue, current, str(artifacts), QRGenerator(), "b")
+    assert len(read_results(results_path)) == len(ITEMS)
+    assert queue.status(job_id)["status"] == DONE
+
+
+def test_job_resumes_after_recorded_results(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    job_id = queue.submit(ITEMS)
+    job = queue.claim("a")
+    job_dir = tmp_path / "artifacts" / job_id
+    job_dir.mkdir(parents=True)
+    recorded = {"success": True, "output": "000000-a.png", "id": 0}
+    (job_dir / "results.jsonl").write_text(json.dumps(recorded) + "\n", encoding="utf-8")
+
+    assert process_job(queue, job, str(tmp_path / "artifacts"), QRGenerator(), "a")
+    results = read_results(job_dir / "results.jsonl")
+    assert results[0] == recorded
+    assert len(results) == len(ITEMS)
+
+
+def test_expired_jobs_are_deleted_with_their_artifacts(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    artifacts = tmp_path / "artifacts"
+    old_id = queue.submit(ITEMS)
+    assert run_worker(queue, str(artifacts), QRGenerator(), once=True) == 1
+    time.sleep(0.5)
+    failed_id = queue.submit(ITEMS, max_attempts=1)
+    queue.claim("a")
+    queue.fail(failed_id, "a", "boom")
+    assert queue.status(failed_id)["status"] == FAILED
+    new_id = queue.submit(ITEMS)
+
+    # The worker sweeps before claiming, so only the first job is old enough
+    assert run_worker(queue, str(artifacts), QRGenerator(), once=True, retention=0.25) == 1
+    assert queue.status(old_id) is None
+    assert not (artifacts / old_id).exists() and not (artifacts / f"{old_id}.zip").exists()
+    assert queue.status(new_id)["status"] == DONE
+
+    assert sorted(queue.expire(str(artifacts), 0)) == sorted([new_id, failed_id])
+    assert os.listdir(artifacts) == []
+
+
+def test_job_submissions_are_charged_per_item(tmp_path, monkeypatch):
+    monkeypatch.setattr(api, "_job_queue", JobQueue(str(tmp_path / "jobs.sqlite3")))
+    monkeypatch.setattr(api, "rate_limiter", ClientRateLimiter(rate=0.001, capacity=20))
+    client = api.app.test_client()
+
+    # A job costlier than the bucket is admitted on a full bucket, but its
+    # items use up the budget of the next submissions
+    large = {"items": [{"content": f"https://example.com/{i}"} for i in range(200)]}
+    assert api.job_cost(large["items"]) > 20
+    assert client.post("/api/jobs", json=large).status_code == 202
+    small = {"items": [{"content": "https://example.com/1"}]}
+    response = client.post("/api/jobs", json=small)
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
@@ -0,0 +1,59 @@
+"""Tests of the command-line interface."""
+
+from click.testing import CliRunner
+from PIL import Image
+
+from main import cli
+
+
+def test_generate_with_renditions_writes_the_output(tmp_path):
+    output = tmp_path / "qr.png"
+    result = CliRunner().invoke(cli, [
+        "generate", "--content", "https://example.com", "--output", str(output),
+        "--box-size", "3", "--rendition", "png:8", "--rendition", "svg:2",
+    ])
+    assert result.exit_code == 0, result.output
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["qr-2.svg", "qr-8.png", "qr.png"]
+    with Image.open(output) as img, Image.open(tmp_path / "qr-8.png") as large:
+        assert img.width * 8 == large.width * 3
+
+
+def test_generate_with_renditions_rejects_other_output_formats(tmp_path):
+    result = CliRunner().invoke(cli, [
+        "generate", "--content", "x", "--output", str(tmp_path / "qr.jpg"), "--rendition", "png:8",
+    ])
+    assert result.exit_code == 1
+    assert ".png, .webp or .svg" in result.output
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_budget_options_read_the_environment(tmp_path):
+    result = CliRunner(env={"QR_MAX_PIXELS": "100"}).invoke(cli, [
+        "generate", "--content", "x", "--output", str(tmp_path / "qr.png"),
+    ])
+    assert result.exit_code == 1
+    assert not (tmp_path / "qr.png").exists()
+
+    result = CliRunner(env={"QR_MAX_BYTES": "0"}).invoke(cli, [
+        "generate", "--content", "x", "--output", str(tmp_path / "qr.png"),
+    ])
+    assert result.exit_code == 2
+    assert "--max-bytes" in result.output
+
+
+def test_sprite_sheet_rejects_out_of_range_box_sizes(tmp_path):
+    for box_size in ("0", "101"):
+        result = CliRunner().invoke(cli, [
+            "sprite-sheet", "--input", "-", "--output-dir", str(tmp_path), "--box-size", box_size,
+        ], input="x\n")
+        assert result.exit_code == 2
+        assert "--box-size" in result.output
+
+
+def test_job_worker_once_takes_a_single_process(tmp_path):
+    result = CliRunner().invoke(cli, [
+        "job-worker", "--db", str(tmp_path / "jobs.sqlite3"), "--processes", "2", "--once",
+    ])
+    assert result.exit_code == 2
+    assert "--once" in result.output
+    assert not (tmp_path / "jobs.sqlite3").exists()
@@ -0,0 +1,95 @@
+"""Cross-validation of the NumPy encoder against qrcode."""
+
+import pytest
+import qrcode
+from qrcode import util
+
+from qr_generator.numpy_encoder import NumpyEncoder, cross_validate
+
+ERROR_CORRECTIONS = (
+    qrcode.constants.ERROR_CORRECT_L,
+    qrcode.constants.ERROR_CORRECT_M,
+    qrcode.constants.ERROR_CORRECT_Q,
+    qrcode.constants.ERROR_CORRECT_H,
+)
+
+# qrcode has no kanji mode, so kanji are encoded as bytes, both as UTF-8
+# and as Shift JIS
+KANJI = "漢字日本語点茗"
+
+
+def corpus_content(mode, length):
+    """Content of a mode, at most length bytes long once encoded."""
+    if mode == util.MODE_NUMBER:
+        return ("31415926535897932384" * length)[:length]
+    if mode == util.MODE_ALPHA_NUM:
+        return ("HTTPS://QR.EXAMPLE.COM/S/7K3M9Q $%*+-" * length)[:length]
+    if mode == "kanji-utf8":
+        return (KANJI * length)[: max(length // 3, 1)]
+    if mode == "kanji-sjis":
+        return (KANJI * length)[: max(length // 2, 1)].encode("shift_jis")
+    return ("Grüße, wörld! {}\n" * length).encode("utf-8")[:length]
+
+
+MODES = (util.MODE_NUMBER, util.MODE_ALPHA_NUM, util.MODE_8BIT_BYTE, "kanji-utf8", "kanji-sjis")
+
+# Content lengths that fit version 1 at every error correction level
+VERSION_1_LENGTHS = {
+    util.MODE_NUMBER: 17,
+    util.MODE_ALPHA_NUM: 10,
+    util.MODE_8BIT_BYTE: 7,
+    "kanji-utf8": 7,
+    "kanji-sjis": 7,
+}
+
+
+def compile_both(content, version, error_correction, mask_pattern):
+    """Compile content with qrcode and with the NumPy encoder."""
+    codes = []
+    for compile_code in (lambda qr: qr.make(fit=True), NumpyEncoder().encode):
+        qr = qrcode.QRCode(version=version, error_correction=error_correction, mask_pattern=mask_pattern)
+        qr.add_data(content)
+        compile_code(qr)
+        codes.append(qr)
+    return codes
+
+
+@pytest.mark.parametrize("version", range(1, 41))
+@pytest.mark.parametrize("error_correction", ERROR_CORRECTIONS)
+def test_matches_qrcode_at_every_version_and_level(version, error_correction):
+    mode = MODES[version % len(MODES)]
+    mask_pattern = (version + error_correction) % 8
+    # Fill more of larger versions, staying within version 1 capacity per version
+    content = corpus_content(mode, VERSION_1_LENGTHS[mode] * version)
+    expected, actual = compile_both(content, version, error_correction, mask_pattern)
+    assert expected.version == version
+    assert actual.version == expected.version
+    assert actual.data_cache == expected.data_cache
+    assert actual.modules == expected.modules
+
+
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("mask_pattern", range(8))
+def test_matches_qrcode_with_every_pinned_mask(mode, mask_pattern):
+    content = corpus_content(mode, 40)
+    for error_correction in ERROR_CORRECTIONS:
+        expected, actual = compile_both(content, None, error_correction, mask_pattern)
+        assert actual.version == expected.version
+        assert actual.modules == expected.modules
+
+
+def test_matches_qrcode_with_searched_masks():
+    contents = [
+        "0",
+        "01234567890123456789",
+        "HELLO WORLD",
+        "https://example.com/menu?table=12",
+        "WIFI:S:Office;T:WPA;P:secret;;",
+        "漢字のテスト",
+        "x" * 300,
+        "9" * 1000,
+        # Versions whose length fields grow: 9 to 10 and 26 to 27
+        "A" * 230,
+        "A" * 1300,
+    ]
+    assert cross_validate(contents, ERROR_CORRECTIONS) == []
@@ -0,0 +1,104 @@
+"""Tests of the analytic logo occlusion checks."""
+
+import numpy as np
+import pytest
+import qrcode
+from PIL import Image
+
+from qr_generator import QRGenerator
+from qr_generator.numpy_encoder import _layout
+from qr_generator.occlusion import (
+    LogoOcclusionError,
+    _codeword_blocks,
+    analyze_occlusion,
+    choose_error_correction,
+    logo_footprint,
+)
+from qr_generator.planner import PixelBudget
+
+CONTENT = "https://example.com/some/longer/path?x=1"
+L, M, Q, H = (qrcode.constants.ERROR_CORRECT_L, qrcode.constants.ERROR_CORRECT_M,
+              qrcode.constants.ERROR_CORRECT_Q, qrcode.constants.ERROR_CORRECT_H)
+
+
+def data_list(content=CONTENT):
+    qr = qrcode.QRCode()
+    qr.add_data(content)
+    return qr.data_list
+
+
+def test_footprint_covers_every_module_the_logo_touches():
+    # A 290 px code fits a 58 px logo at (116, 116): modules 11-17 with the border
+    covered = logo_footprint(Image.new("RGB", (500, 500)), 0.2, 21, 10, 4)
+    assert covered.shape == (21, 21)
+    assert covered.sum() == 49
+    assert covered[7:14, 7:14].all()
+
+
+def test_footprint_ignores_transparent_pixels():
+    logo = Image.new("RGBA", (100, 100), (0, 0, 0, 0))
+    assert not logo_footprint(logo, 0.2, 21, 10, 4).any()
+    logo.putpixel((50, 50), (0, 0, 0, 255))
+    assert logo_footprint(logo, 0.2, 21, 10, 4).sum() == 1
+
+
+def test_codeword_loss_counts_each_touched_codeword_once():
+    version, level = 5, Q
+    layout = _layout(version)
+    owners, ec_counts = _codeword_blocks(version, level)
+
+    covered = np.zeros((layout.modules_count, layout.modules_count), dtype=bool)
+    assert sum(analyze_occlusion(version, level, covered).damaged) == 0
+
+    # All eight bits of the first codeword, then one bit of the second
+    covered[layout.data_rows[:9], layout.data_cols[:9]] = True
+    report = analyze_occlusion(version, level, covered)
+    assert sum(report.damaged) == 2
+    assert report.damaged[owners[0]] >= 1 and report.damaged[owners[1]] >= 1
+    assert report.critical_modules == 0
+    assert report.capacity == [count // 2 for count in ec_counts]
+
+
+def test_covered_finder_pattern_is_never_decodable():
+    covered = np.zeros((21, 21), dtype=bool)
+    covered[0, 0] = True
+    report = analyze_occlusion(1, H, covered)
+    assert report.critical_modules == 1
+    assert not report.decodable
+
+
+def test_error_correction_escalates_with_the_logo_size():
+    logo = Image.new("RGB", (1000, 1000))
+    levels = [choose_error_correction(data_list(), logo, size, 10, 4).error_correction for size in (0.04, 0.1, 0.2)]
+    assert levels == [L, M, Q]
+    report = choose_error_correction(data_list(), logo, 0.1, 10, 4)
+    assert report.decodable and report.box_size == 10
+
+
+@pytest.mark.parametrize("logo_size", [0.3, 0.5])
+def test_too_large_logo_is_rejected(logo_size):
+    with pytest.raises(LogoOcclusionError):
+        choose_error_correction(data_list(), Image.new("RGB", (1000, 1000)), logo_size, 10, 4)
+
+
+def test_fixed_level_is_not_escalated():
+    with pytest.raises(LogoOcclusionError):
+        choose_error_correction(data_list(), Image.new("RGB", (1000, 1000)), 0.2, 10, 4, levels=(L,))
+
+
+def test_logo_is_drawn_at_the_analysed_box_size(tmp_path):
+    # The budget forces a downscale only once the title band is counted
+    generator = QRGenerator(budget=PixelBudget(max_pixels=330 * 330 + 330 * 80, downscale=True))
+    logo_path = tmp_path / "logo.png"
+    Image.new("RGB", (1000, 1000), "red").save(logo_path)
+
+    with Image.open(logo_path) as logo:
+        report = generator.plan_logo(CONTENT, logo, 0.1, box_size=12, title="Menu")
+    side = (report.version * 4 + 17 + 2 * generator.default_border) * report.box_size
+    assert report.box_size < 12
+
+    output = generator.generate_with_logo(CONTENT, str(tmp_path / "qr.png"), str(logo_path), 0.1,
+                                          title="Menu", box_size=12)
+    with Image.open(output) as img:
+        assert img.width == side
+        assert img.height == side + 80
@@ -0,0 +1,62 @@
+"""Tests of on-demand profiling."""
+
+import pstats
+
+from click.testing import CliRunner
+
+import api
+from main import cli
+
+ARGS = ["generate", "--content", "https://example.com", "--title", "Menu", "--box-size", "4"]
+
+
+def check_profile_files(summary):
+    files = summary["files"]
+    assert pstats.Stats(files["pstats"]).total_calls > 0
+    with open(files["collapsed"], encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    for line in lines:
+        stack, count = line.rsplit(" ", 1)
+        assert stack and int(count) > 0
+    with open(files["summary"], encoding="utf-8") as f:
+        assert f.read().startswith("Elapsed:")
+
+
+def test_profile_option_writes_artifacts_and_keeps_the_output(tmp_path):
+    output = tmp_path / "qr.png"
+    plain = CliRunner().invoke(cli, ARGS + ["--output", str(output)])
+    assert plain.exit_code == 0, plain.output
+    expected = output.read_bytes()
+    output.unlink()
+
+    profile_dir = tmp_path / "profile"
+    profiled = CliRunner().invoke(cli, ARGS + ["--output", str(output), "--profile", str(profile_dir)])
+    assert profiled.exit_code == 0, profiled.output
+    assert profiled.stdout == plain.stdout
+    assert output.read_bytes() == expected
+
+    names = sorted(path.name for path in profile_dir.iterdir())
+    assert [name.rsplit(".", 1)[1] for name in names] == ["collapsed", "pstats", "txt"]
+    assert all(name.startswith("generate-") for name in names)
+    assert "Hotspots (own time):" in profiled.stderr
+    stats = pstats.Stats(str(profile_dir / names[1]))
+    assert any(function == "render_spec" for _, _, function in stats.stats)
+
+
+def test_generate_endpoint_profiles_on_request(tmp_path, monkeypatch):
+    monkeypatch.setattr(api, "profile_dir", str(tmp_path))
+    client = api.app.test_client()
+    payload = {"type": "custom", "content": "https://example.com/profiled", "title": "Menu"}
+
+    # Ignored unless profiling is enabled on the server
+    assert "profile" not in client.post("/api/generate", json=dict(payload, profile=True)).json
+    assert list(tmp_path.iterdir()) == []
+
+    monkeypatch.setattr(api, "profiling_enabled", True)
+    plain = client.post("/api/generate", json=payload).json
+    profiled = client.post("/api/generate", json=payload, headers={"X-Profile": "1"}).json
+    assert profiled["success"]
+    assert profiled["qrCodeUrl"] == plain["qrCodeUrl"]
+    assert set(profiled) - set(plain) == {"profile"}
+    check_profile_files(profiled["profile"])
+    assert profiled["profile"]["elapsed_seconds"] > 0
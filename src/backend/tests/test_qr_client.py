@@ -0,0 +1,108 @@
+"""Tests of the worker client."""
+
+import json
+import os
+import socket
+import threading
+
+import pytest
+
+import qr_client
+
+
+def serve_once(path, reply):
+    """Accept one connection on a Unix socket, record the job and send reply (or nothing)."""
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen(1)
+    jobs = []
+
+    def handle():
+        conn, _ = server.accept()
+        with conn, server:
+            jobs.append(json.loads(conn.makefile("r", encoding="utf-8").readline()))
+            if reply is not None:
+                conn.sendall(json.dumps(reply).encode("utf-8") + b"\n")
+
+    thread = threading.Thread(target=handle)
+    thread.start()
+    return thread, jobs
+
+
+def test_strip_socket_option():
+    argv = ["--socket", "/a.sock", "generate", "--socket=/b.sock", "--content", "x"]
+    assert qr_client.strip_socket_option(argv) == ["generate", "--content", "x"]
+
+
+def test_paths_are_sent_absolute(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = str(tmp_path / "worker.sock")
+    thread, jobs = serve_once(path, {"success": True, "output": "x", "content_type": "text"})
+    qr_client.main([f"--socket={path}", "generate-with-logo", "--content", "x", "--output", "out/qr.png",
+                    "--logo", "logo.png"])
+    thread.join()
+    assert jobs[0]["output"] == os.path.join(str(tmp_path), "out", "qr.png")
+    assert jobs[0]["logo"] == os.path.join(str(tmp_path), "logo.png")
+
+
+def test_no_fallback_once_the_job_was_sent(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    path = str(tmp_path / "worker.sock")
+    thread, jobs = serve_once(path, None)
+    with pytest.raises(SystemExit) as exit_info:
+        qr_client.main(["--socket", path, "generate", "--content", "x", "--output", "qr.png"])
+    thread.join()
+    assert exit_info.value.code == 1
+    assert "worker failed" in capsys.readouterr().err
+    assert not (tmp_path / "qr.png").exists()
+
+
+def test_falls_back_in_process_without_a_worker(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(SystemExit) as exit_info:
+        qr_client.main([f"--socket={tmp_path / 'missing.sock'}", "generate", "--content", "x", "--output", "qr.png"])
+    assert exit_info.value.code == 0
+    assert (tmp_path / "qr.png").exists()
+
+
+def test_unsupported_reply_falls_back_in_process(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = str(tmp_path / "worker.sock")
+    thread, jobs = serve_once(path, {"success": False, "unsupported": ["eye_color"], "error": "Unsupported"})
+    with pytest.raises(SystemExit) as exit_info:
+        qr_client.main(["--socket", path, "generate", "--content", "x", "--output", "qr.png", "--eye-color", "red"])
+    thread.join()
+    assert jobs[0]["strict"] is True
+    assert exit_info.value.code == 0
+    assert (tmp_path / "qr.png").exists()
+
+
+def test_options_the_client_does_not_mirror_run_in_process(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = str(tmp_path / "worker.sock")
+    thread, jobs = serve_once(path, {"success": True, "output": "x", "content_type": "text"})
+    with pytest.raises(SystemExit) as exit_info:
+        qr_client.main(["--socket", path, "generate", "--content", "x", "--output", "qr.png",
+                        "--rendition", "svg:2"])
+    assert exit_info.value.code == 0
+    assert sorted(p.name for p in tmp_path.iterdir() if p.suffix != ".sock") == ["qr-2.svg", "qr.png"]
+
+    # Socket options after the command are still the client's own
+    qr_client.main(["generate", f"--socket={path}", "--content", "x", "--output", "forwarded.png"])
+    thread.join()
+    assert jobs[0]["output"] == str(tmp_path / "forwarded.png")
+
+
+def test_worker_refuses_unknown_options_of_strict_jobs(tmp_path):
+    from qr_generator import QRGenerator
+    from qr_generator.worker import run_job
+
+    generator = QRGenerator()
+    job = {"command": "generate", "content": "x", "output": str(tmp_path / "qr.png"), "rendition": ["svg:2"]}
+    reply = run_job(generator, dict(job, strict=True))
+    assert not reply["success"] and reply["unsupported"] == ["rendition"]
+    assert not (tmp_path / "qr.png").exists()
+    assert run_job(generator, dict(command="impose", strict=True))["unsupported"] == ["command"]
+
+    # Without strict, unknown keys are ignored as before
+    assert run_job(generator, job)["success"]
@@ -0,0 +1,29 @@
+"""Tests of short links."""
+
+import api
+from qr_generator.shortlinks import ShortLinkRegistry
+
+
+def test_short_url_upper_cases_the_base_path(tmp_path):
+    registry = ShortLinkRegistry(str(tmp_path / "links.sqlite3"))
+    short_url = registry.short_url("https://example.com/a?b=c", "https://qr.example.com/go/")
+    assert short_url.startswith("HTTPS://QR.EXAMPLE.COM/GO/S/")
+    assert short_url == short_url.upper()
+    assert registry.resolve(short_url.rsplit("/", 1)[-1]) == "https://example.com/a?b=c"
+
+
+def test_api_refuses_shortening_unless_configured(tmp_path, monkeypatch):
+    client = api.app.test_client()
+    monkeypatch.setattr(api, "_shortlinks", None)
+    for base_url, db in [(None, str(tmp_path / "links.sqlite3")), ("https://qr.example.com", None)]:
+        monkeypatch.setattr(api, "shortlink_base_url", base_url)
+        monkeypatch.setattr(api, "DEFAULT_SHORTLINK_DB", db)
+        response = client.post("/api/shortlinks", json={"url": "https://example.com/a"}, base_url="http://evil.test")
+        assert response.status_code == 400
+        assert not response.get_json()["success"]
+        assert client.get("/S/ABC123").status_code == 404
+
+    monkeypatch.setattr(api, "shortlink_base_url", "https://qr.example.com")
+    monkeypatch.setattr(api, "DEFAULT_SHORTLINK_DB", str(tmp_path / "links.sqlite3"))
+    response = client.post("/api/shortlinks", json={"url": "https://example.com/a"}, base_url="http://evil.test")
+    assert response.get_json()["shortUrl"].startswith("HTTPS://QR.EXAMPLE.COM/S/")
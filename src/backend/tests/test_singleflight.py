@@ -0,0 +1,114 @@
+"""Tests of single-flight coalescing."""
+
+import threading
+import time
+
+import pytest
+
+import api
+from qr_generator.singleflight import SingleFlight
+from qr_generator.spec import RenderSpec
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def run_concurrently(group, key, fn, callers):
+    """Call group.do from several threads while fn blocks, collecting outcomes."""
+    outcomes = []
+    lock = threading.Lock()
+
+    def call():
+        try:
+            outcome = group.do(key, fn)
+        except Exception as e:
+            outcome = e
+        with lock:
+            outcomes.append(outcome)
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, outcomes
+
+
+def test_concurrent_identical_calls_run_once():
+    group = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        release.wait(5)
+        return "result"
+
+    threads, outcomes = run_concurrently(group, "key", work, 8)
+    wait_for(lambda: group.stats()["requests"] == 8)
+    assert group.stats()["in_flight"] == 1
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert sorted(outcomes, key=lambda outcome: outcome[1]) == [("result", False)] + [("result", True)] * 7
+    assert group.stats() == {"requests": 8, "executions": 1, "shared": 7, "in_flight": 0}
+
+    # Results are not cached
+    assert group.do("key", lambda: "again") == ("again", False)
+
+
+def test_error_reaches_every_waiter_and_clears_the_call():
+    group = SingleFlight()
+    release = threading.Event()
+    error = ValueError("render failed")
+
+    def work():
+        release.wait(5)
+        raise error
+
+    threads, outcomes = run_concurrently(group, "key", work, 5)
+    wait_for(lambda: group.stats()["requests"] == 5)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert outcomes == [error] * 5
+    assert group.stats()["in_flight"] == 0
+    assert group.do("key", lambda: "recovered") == ("recovered", False)
+
+    with pytest.raises(ValueError):
+        group.do("other", lambda: int("x"))
+    assert group.stats()["in_flight"] == 0
+
+
+def test_identical_renders_share_one_render(monkeypatch):
+    group = SingleFlight()
+    monkeypatch.setattr(api, "render_flights", group)
+    release = threading.Event()
+    renders = []
+    render_png_base64 = api.render_png_base64
+
+    def slow_render(spec):
+        renders.append(spec)
+        release.wait(5)
+        return render_png_base64(spec)
+
+    monkeypatch.setattr(api, "render_png_base64", slow_render)
+    results = []
+    # Equal specs spelled differently coalesce
+    specs = [RenderSpec("https://example.com", fg_color=color) for color in ("black", "#000", "#000000")]
+    threads = [threading.Thread(target=lambda spec=spec: results.append(api.render_admitted(spec, 1)))
+               for spec in specs]
+    for thread in threads:
+        thread.start()
+    wait_for(lambda: group.stats()["requests"] == 3)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(renders) == 1
+    assert len(results) == 3 and len(set(results)) == 1
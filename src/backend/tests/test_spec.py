@@ -0,0 +1,33 @@
+"""Tests of RenderSpec option normalization."""
+
+from PIL import Image
+
+from qr_generator import QRGenerator
+from qr_generator.spec import RenderSpec, canonical_color
+
+
+def test_opaque_colors_are_canonical():
+    assert canonical_color("#000") == "black"
+    assert canonical_color((255, 255, 255, 255)) == "white"
+    assert canonical_color("RED") == "#ff0000"
+    assert RenderSpec("x", fg_color="#000") == RenderSpec("x", fg_color="black")
+
+
+def test_transparent_and_alpha_colors_pass_through():
+    assert canonical_color("transparent") == "transparent"
+    assert canonical_color((0, 0, 0, 128)) == (0, 0, 0, 128)
+    assert canonical_color([0, 0, 0, 128]) == (0, 0, 0, 128)
+    assert canonical_color("#00000080") == "#00000080"
+
+
+def test_transparent_background_renders(tmp_path):
+    generator = QRGenerator()
+    for reuse_buffer in (False, True):
+        img = generator.render("https://example.com", bg_color="transparent", reuse_buffer=reuse_buffer)
+        assert img.mode == "RGBA"
+        assert img.getpixel((0, 0))[3] == 0
+
+    path = generator.generate("https://example.com", str(tmp_path / "qr.png"), bg_color="transparent")
+    with Image.open(path) as saved:
+        assert saved.mode == "RGBA"
+        assert saved.getpixel((0, 0))[3] == 0
@@ -0,0 +1,35 @@
+"""Tests of sprite sheets."""
+
+import json
+import os
+
+from PIL import Image
+
+from qr_generator.sprites import SheetLayout, SpriteSheetWriter
+
+LAYOUT = SheetLayout(400, 300, columns=4, rows=3, margin=10, gap=4)
+
+
+def test_pages_are_buffered_outside_the_output_directory(tmp_path):
+    writer = SpriteSheetWriter(str(tmp_path), LAYOUT)
+    for i in range(15):
+        writer.add(f"code {i}")
+        assert not any(name.endswith(".raw") for name in os.listdir(tmp_path))
+    index_path = writer.close()
+
+    assert sorted(os.listdir(tmp_path)) == ["sheet_0001.png", "sheet_0002.png", "sheet_index.json"]
+    with open(index_path) as f:
+        index = json.load(f)
+    assert index["count"] == 15
+    assert [len(sheet["tiles"]) for sheet in index["sheets"]] == [12, 3]
+    with Image.open(tmp_path / "sheet_0002.png") as page:
+        assert page.size == (400, 300)
+        assert page.getpixel((0, 0)) == 255
+
+
+def test_raw_pages_are_written_on_request(tmp_path):
+    with SpriteSheetWriter(str(tmp_path), LAYOUT, mode="RGB", keep_raw=True) as writer:
+        writer.add("code")
+    raw = tmp_path / "sheet_0001.raw"
+    with Image.open(tmp_path / "sheet_0001.png") as page:
+        assert raw.read_bytes() == page.tobytes()
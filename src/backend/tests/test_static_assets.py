@@ -0,0 +1,109 @@
+"""Tests of the precompressed, fingerprinted frontend assets."""
+
+import gzip
+import types
+import zlib
+
+from flask import Flask, request
+
+import api
+import static_assets
+from static_assets import IMMUTABLE_CACHE, REVALIDATE_CACHE, StaticAssets, parse_accept_encoding
+
+CSS = b"body { color: #123456; }\n" * 200
+
+
+def make_frontend(root):
+    for directory in ("html", "css", "js", "img"):
+        (root / directory).mkdir()
+    (root / "css" / "styles.css").write_bytes(CSS)
+    (root / "js" / "script.js").write_bytes(b"console.log('hi');\n" * 100)
+    (root / "img" / "dot.gif").write_bytes(b"GIF89a")
+    (root / "html" / "index.html").write_text(
+        '<link href="../css/styles.css" rel="stylesheet"><script src=\'/js/script.js\'></script>'
+        '<a href="css/styles.css.map">', encoding="utf-8")
+    return StaticAssets(str(root))
+
+
+def fetch(assets, path, headers=None):
+    with Flask(__name__).test_request_context(headers=headers or {}):
+        return assets.response(path, request)
+
+
+def test_scripts_and_styles_get_fingerprinted_names(tmp_path):
+    assets = make_frontend(tmp_path)
+    css = assets.fingerprints["css/styles.css"]
+    js = assets.fingerprints["js/script.js"]
+    assert css.startswith("css/styles.") and css.endswith(".css")
+    assert css == f"css/styles.{assets.assets[css].digest[:10]}.css"
+    assert "img/dot.gif" not in assets.fingerprints
+
+    html = fetch(assets, "index.html").get_data(as_text=True)
+    assert f'href="/{css}"' in html and f"src='/{js}'" in html
+    # Only exact references are rewritten
+    assert 'href="css/styles.css.map"' in html
+
+    # A changed file gets a new name
+    (tmp_path / "css" / "styles.css").write_bytes(CSS + b"p {}\n")
+    assert StaticAssets(str(tmp_path)).fingerprints["css/styles.css"] != css
+
+
+def test_fingerprinted_urls_are_cached_forever(tmp_path):
+    assets = make_frontend(tmp_path)
+    css = assets.fingerprints["css/styles.css"]
+    assert fetch(assets, css).headers["Cache-Control"] == IMMUTABLE_CACHE
+    for path in ("css/styles.css", "index.html", "img/dot.gif"):
+        assert fetch(assets, path).headers["Cache-Control"] == REVALIDATE_CACHE
+    assert fetch(assets, "missing.css") is None
+
+
+def test_variant_follows_accept_encoding(tmp_path):
+    assets = make_frontend(tmp_path)
+    css = assets.fingerprints["css/styles.css"]
+
+    response = fetch(assets, css, {"Accept-Encoding": "gzip, deflate"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert gzip.decompress(response.get_data()) == CSS
+
+    for header in (None, "gzip;q=0, deflate"):
+        response = fetch(assets, css, {"Accept-Encoding": header} if header else None)
+        assert "Content-Encoding" not in response.headers
+        assert response.get_data() == CSS
+
+    # Files that do not shrink are only kept as they are
+    response = fetch(assets, "img/dot.gif", {"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+
+
+def test_brotli_is_preferred_when_available(tmp_path, monkeypatch):
+    monkeypatch.setattr(static_assets, "brotli", types.SimpleNamespace(
+        compress=lambda data, quality: zlib.compress(data, 9)))
+    assets = make_frontend(tmp_path)
+    css = assets.fingerprints["css/styles.css"]
+
+    assert fetch(assets, css, {"Accept-Encoding": "gzip, br"}).headers["Content-Encoding"] == "br"
+    assert fetch(assets, css, {"Accept-Encoding": "gzip, br;q=0"}).headers["Content-Encoding"] == "gzip"
+    assert parse_accept_encoding("GZIP;q=0.5, br ;q=0.0, *") == {"gzip", "*"}
+
+
+def test_etags_differ_per_encoding_and_revalidate(tmp_path):
+    assets = make_frontend(tmp_path)
+    plain = fetch(assets, "css/styles.css")
+    gzipped = fetch(assets, "css/styles.css", {"Accept-Encoding": "gzip"})
+    assert plain.headers["ETag"] != gzipped.headers["ETag"]
+
+    response = fetch(assets, "css/styles.css", {"Accept-Encoding": "gzip", "If-None-Match": gzipped.headers["ETag"]})
+    assert response.status_code == 304 and response.get_data() == b""
+    assert fetch(assets, "css/styles.css", {"If-None-Match": gzipped.headers["ETag"]}).status_code == 200
+
+
+def test_app_serves_the_fingerprinted_frontend():
+    client = api.app.test_client()
+    html = client.get("/").get_data(as_text=True)
+    css = api.static_assets.fingerprints["css/styles.css"]
+    assert f"/{css}" in html
+    response = client.get(f"/{css}", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == IMMUTABLE_CACHE
+    assert response.headers["Content-Encoding"] == "gzip"
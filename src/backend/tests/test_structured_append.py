@@ -0,0 +1,117 @@
+"""Tests of structured append headers and content splitting."""
+
+import pytest
+import qrcode
+from qrcode import base, util
+
+from qr_generator.structured_append import MAX_PARTS, encode_parts, header, parity, split_content
+
+CONTENT = "Lorem ipsum dolor sit amet, 12345678901234567890 " * 40
+
+
+class BitReader:
+    """Read big-endian fields from a byte string."""
+
+    def __init__(self, data):
+        self.bits = "".join(f"{byte:08b}" for byte in data)
+        self.position = 0
+
+    def read(self, length):
+        value = int(self.bits[self.position:self.position + length], 2)
+        self.position += length
+        return value
+
+
+def data_codewords(qr):
+    """Undo the block interleaving of a compiled code's data codewords."""
+    blocks = base.rs_blocks(qr.version, qr.error_correction)
+    data = [[] for _ in blocks]
+    position = 0
+    for i in range(max(block.data_count for block in blocks)):
+        for block, codewords in zip(blocks, data):
+            if i < block.data_count:
+                codewords.append(qr.data_cache[position])
+                position += 1
+    return bytes(sum(data, []))
+
+
+def decode(qr):
+    """Decode the structured append header, if any, and the text of a compiled code."""
+    reader = BitReader(data_codewords(qr))
+    fields = None
+    text = []
+    while True:
+        mode = reader.read(4)
+        if mode == 0:
+            return fields, "".join(text)
+        if mode == 0b0011:
+            fields = (reader.read(4), reader.read(4) + 1, reader.read(8))
+            continue
+        length = reader.read(util.length_in_bits(mode, qr.version))
+        if mode == util.MODE_NUMBER:
+            for start in range(0, length, 3):
+                digits = min(3, length - start)
+                text.append(str(reader.read((4, 7, 10)[digits - 1])).zfill(digits))
+        elif mode == util.MODE_ALPHA_NUM:
+            for start in range(0, length, 2):
+                if length - start == 1:
+                    text.append(chr(util.ALPHA_NUM[reader.read(6)]))
+                else:
+                    pair = reader.read(11)
+                    text.append(chr(util.ALPHA_NUM[pair // 45]) + chr(util.ALPHA_NUM[pair % 45]))
+        else:
+            text.append(bytes(reader.read(8) for _ in range(length)).decode("utf-8"))
+
+
+def test_every_code_carries_its_header():
+    codes = encode_parts(CONTENT, max_version=10)
+    total = len(codes)
+    assert 1 < total <= MAX_PARTS
+
+    parts = []
+    for index, qr in enumerate(codes):
+        reader = BitReader(data_codewords(qr))
+        assert reader.read(4) == 0b0011
+        fields, text = decode(qr)
+        assert fields == (index, total, parity(CONTENT))
+        parts.append(text)
+
+    assert "".join(parts) == CONTENT
+    assert parts == split_content(CONTENT, max_version=10)
+    assert len({qr.version for qr in codes}) == 1 and codes[0].version <= 10
+
+
+def test_parity_covers_the_whole_payload():
+    expected = 0
+    for byte in CONTENT.encode("utf-8"):
+        expected ^= byte
+    assert parity(CONTENT) == expected
+    assert parity("é") == 0xC3 ^ 0xA9
+    assert header(2, 5, 0xAB) == ((0b0011 << 16) | (2 << 12) | (4 << 8) | 0xAB, 20)
+
+
+def test_split_boundaries_are_near_equal_and_each_part_fits():
+    parts = split_content(CONTENT, max_version=10)
+    assert max(map(len, parts)) - min(map(len, parts)) <= 1
+    # One part fewer does not fit
+    with pytest.raises(ValueError):
+        split_content(CONTENT, max_version=10, max_parts=len(parts) - 1)
+
+
+def test_content_that_fits_one_code_has_no_header():
+    (qr,) = encode_parts("https://example.com")
+    fields, text = decode(qr)
+    assert fields is None and text == "https://example.com"
+
+
+def test_at_most_sixteen_codes_are_linked():
+    with pytest.raises(ValueError):
+        header(16, 17, 0)
+    with pytest.raises(ValueError):
+        split_content(CONTENT, max_parts=MAX_PARTS + 1)
+    with pytest.raises(ValueError, match="too long for 16"):
+        split_content(CONTENT * 3, qrcode.constants.ERROR_CORRECT_H, max_version=3)
+
+    codes = encode_parts(CONTENT[:len(CONTENT) // 5], max_version=2)
+    assert len(codes) == MAX_PARTS
+    assert decode(codes[-1])[0][:2] == (MAX_PARTS - 1, MAX_PARTS)
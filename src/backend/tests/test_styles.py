@@ -0,0 +1,102 @@
+"""Tests of styled rendering."""
+
+import numpy as np
+import pytest
+import qrcode
+
+from qr_generator import QRGenerator
+from qr_generator.styles import Gradient, QRStyle, eye_stamp, module_stamps, style_from_options
+
+BOX = 8
+
+
+def compiled(content="https://example.com", border=4):
+    qr = qrcode.QRCode(box_size=BOX, border=border)
+    qr.add_data(content)
+    qr.make()
+    return qr
+
+
+def test_module_shapes():
+    square, dot, gapped = (module_stamps(style, BOX) for style in ("square", "dot", "gapped"))
+    assert (square[0] == 0).all() and (square[1] == 255).all()
+    assert dot[1][0, 0] == 0 and dot[1][BOX // 2, BOX // 2] == 255
+    assert gapped[1][0].max() < 255 and gapped[1][BOX // 2, BOX // 2] == 255
+
+    rounded = module_stamps("rounded", BOX)
+    assert len(rounded) == 17
+    # Isolated modules are round, modules surrounded on every side square
+    assert rounded[1][0, 0] == 0
+    assert (rounded[16] == 255).all()
+    # A neighbour above keeps the two top corners square
+    assert rounded[2][0, 0] == rounded[2][0, -1] == 255 and rounded[2][-1, -1] == 0
+
+    with pytest.raises(ValueError):
+        module_stamps("star", BOX)
+
+
+def test_eye_styles():
+    square, circle = eye_stamp("square", BOX), eye_stamp("circle", BOX)
+    assert square.shape == (7 * BOX, 7 * BOX)
+    for stamp in (square, circle):
+        # Ring, gap and center ball
+        middle = stamp[7 * BOX // 2]
+        assert middle[BOX // 2] == 255 and middle[3 * BOX // 2] == 0 and middle[7 * BOX // 2] == 255
+    assert square[0, 0] == 255 and circle[0, 0] == 0
+
+    with pytest.raises(ValueError):
+        QRStyle(eyes="star")
+
+
+def test_square_style_matches_the_plain_render():
+    qr = compiled()
+    img = QRStyle().render(qr.get_matrix(), BOX, qr.border, "#123456", "#fedcba")
+    expected = qr.make_image(fill_color="#123456", back_color="#fedcba").get_image()
+    assert img.mode == "RGB"
+    assert img.tobytes() == expected.convert("RGB").tobytes()
+
+
+def test_gradients():
+    linear = Gradient("red", "blue").image(300)
+    assert linear.getpixel((0, 150))[0] > 250 and linear.getpixel((299, 150))[2] > 250
+    vertical = Gradient("red", "blue", angle=90).image(300)
+    assert vertical.getpixel((150, 0))[0] > 250 and vertical.getpixel((150, 299))[2] > 250
+    radial = Gradient("white", "black", kind="radial").image(300)
+    assert radial.getpixel((150, 150))[0] > 250 and radial.getpixel((0, 0))[0] < 5
+
+    qr = compiled()
+    img = QRStyle(gradient=Gradient("red", "blue")).render(qr.get_matrix(), BOX, qr.border)
+    # The top-left eye takes the start color, the top-right one the end color
+    left, right = img.getpixel((4 * BOX, 4 * BOX)), img.getpixel((img.width - 5 * BOX, 4 * BOX))
+    assert left[0] > left[2] and right[2] > right[0]
+
+    with pytest.raises(ValueError):
+        Gradient("red", "blue", kind="conic")
+
+
+def test_eye_color():
+    qr = compiled()
+    img = QRStyle(modules="dot", eye_color="#00ff00").render(qr.get_matrix(), BOX, qr.border)
+    assert img.getpixel((4 * BOX, 4 * BOX)) == (0, 255, 0)
+
+
+def test_transparent_background():
+    generator = QRGenerator()
+    for style in (QRStyle(modules="dot"), QRStyle("rounded", "circle", Gradient("red", "blue"), "green")):
+        img = generator.render("https://example.com", bg_color="transparent", box_size=BOX, style=style)
+        assert img.mode == "RGBA"
+        assert img.getpixel((0, 0))[3] == 0
+        assert img.getpixel((15 * BOX // 2, 15 * BOX // 2))[3] == 255
+
+    # Translucent modules blend over an opaque background
+    img = generator.render("https://example.com", fg_color=(0, 0, 0, 128), box_size=BOX, style=QRStyle())
+    assert img.mode == "RGB"
+    assert img.getpixel((4 * BOX, 4 * BOX)) == (127, 127, 127)
+
+
+def test_style_from_options():
+    assert style_from_options() is None
+    style = style_from_options(module_style="dot", gradient="red, blue", gradient_type="radial")
+    assert style == QRStyle("dot", gradient=Gradient("red", "blue", kind="radial"))
+    with pytest.raises(ValueError):
+        style_from_options(gradient="red")
@@ -0,0 +1,25 @@
+"""Tests of title templates."""
+
+from PIL import Image
+
+from qr_generator.templates import TitleTemplate
+
+
+def test_only_the_band_is_cached():
+    template = TitleTemplate("Menu", band_height=40)
+    for size in (100, 300, 2000):
+        template.apply(Image.new("RGB", (size, size), "black"))
+    template.apply(Image.new("RGB", (300, 300), "black"))
+    assert template.renders == 3
+    assert all(band.height <= 41 for band in template._bands.values())
+
+
+def test_drawing_into_a_buffer_matches_a_new_image():
+    template = TitleTemplate("Menu", frame_width=6, frame_color=(1, 2, 3))
+    img = Image.new("RGB", (120, 120), "black")
+    out = Image.new("RGB", template.canvas_size(img.size), "red")
+    result = template.apply(img, out)
+    assert result is out
+    assert result.tobytes() == template.apply(img).tobytes()
+    assert result.getpixel((0, result.height - 1)) == (1, 2, 3)
+    assert result.getpixel((result.width - 1, result.height // 2)) == (1, 2, 3)
@@ -0,0 +1,76 @@
+"""Thread-safety stress test of QRGenerator."""
+
+import hashlib
+import threading
+
+import pytest
+
+from qr_generator import QRGenerator
+from qr_generator.templates import get_title_template
+
+THREADS = 4
+
+CASES = [
+    dict(content="https://example.com", title="Example"),
+    dict(content="https://example.com/menu", title="Menu", fg_color="#1a237e", bg_color="#fffde7"),
+    dict(content="WIFI:S:Office;T:WPA;P:secret;;", title="WiFi: Office"),
+    dict(content="Hello World", box_size=10, border=2),
+    dict(content="Hello World", box_size=10, title="Hello"),
+    dict(content="x" * 300, title="Long content", error_correction=3),
+    dict(content="tel:+15551234567", fg_color="red"),
+    dict(content="mailto:team@example.com", title="Mail", version=5),
+]
+
+
+def render_digest(generator, case):
+    """Render a case to PNG through the thread's scratch buffers and hash it."""
+    with generator.encode_image(generator.render(reuse_buffer=True, **case)) as png_data:
+        return hashlib.sha256(png_data).hexdigest()
+
+
+@pytest.mark.parametrize("encoder", ["qrcode", "numpy"])
+def test_shared_generator_under_threads(encoder):
+    # Reference digests and allocations of one pass, rendered on one thread
+    reference = QRGenerator(encoder=encoder)
+    expected = [render_digest(reference, case) for case in CASES]
+
+    # Start from cold title templates so the threads race to render bands
+    get_title_template.cache_clear()
+    generator = QRGenerator(encoder=encoder)
+
+    failures = []
+    allocations = []
+    barrier = threading.Barrier(THREADS, action=lambda: allocations.append(generator.buffer_allocations))
+
+    def hammer(index):
+        barrier.wait()
+        # First pass in the reference order, so every thread allocates what the reference did
+        for case_index in range(len(CASES)):
+            if render_digest(generator, CASES[case_index]) != expected[case_index]:
+                failures.append((index, case_index))
+        barrier.wait()
+        # Second pass in a different order per thread, from warm scratch buffers
+        for i in range(len(CASES)):
+            case_index = (index + i) % len(CASES)
+            if render_digest(generator, CASES[case_index]) != expected[case_index]:
+                failures.append((index, case_index))
+
+    threads = [threading.Thread(target=hammer, args=(i,)) for i in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert failures == []
+
+    # Every titled case uses one template and one code width
+    titled = {(case["title"], case.get("box_size"), case.get("border")) for case in CASES if case.get("title")}
+    band_renders = sum(
+        get_title_template(title, generator.default_title_bg_color, generator.default_title_text_color).renders
+        for title in {case["title"] for case in CASES if case.get("title")}
+    )
+    assert band_renders == len(titled)
+
+    # Scratch buffers are allocated once per thread and size, not per code
+    assert allocations == [0, THREADS * reference.buffer_allocations]
+    assert generator.buffer_allocations == THREADS * reference.buffer_allocations
@@ -0,0 +1,80 @@
+"""Tests of the payload builders."""
+
+import numpy as np
+import pytest
+
+from qr_generator.utils import (
+    format_contact_columns,
+    format_contact_data,
+    format_email_columns,
+    format_email_data,
+    format_event_columns,
+    format_event_data,
+    format_geo_columns,
+    format_geo_data,
+    format_wifi_columns,
+    format_wifi_data,
+)
+
+
+def test_row_values_are_not_rewritten():
+    assert format_wifi_data("Café; 2,4 GHz", "pw;x") == "WIFI:S:Café; 2,4 GHz;T:WPA;P:pw;x;"
+    assert "ORG:Acme, Inc.\n" in format_contact_data("Doe, Jane", company="Acme, Inc.")
+    assert "SUMMARY:Launch; party\n" in format_event_data("Launch; party", "2024-05-01T18:00")
+
+
+def test_wifi_columns_match_rows():
+    ssids = ["Home", "Café; 2,4 GHz", 'a"b:c\\d', "Guest"]
+    passwords = ["secret", "pw;x,y", None, ""]
+    securities = ["WPA", "WEP", "nopass", None]
+    assert format_wifi_columns(ssids, passwords, securities) == [
+        format_wifi_data(ssid, password, security or "WPA")
+        for ssid, password, security in zip(ssids, passwords, securities)
+    ]
+    assert format_wifi_columns(["x"]) == [format_wifi_data("x")]
+
+
+def test_contact_columns_match_rows():
+    names = ["Ada Lovelace", "Doe, Jane; Dr", "Line\nbreak"]
+    phones = ["+1 555", None, ""]
+    emails = [None, "jane@example.com", "x@example.com"]
+    companies = ["Acme, Inc.", "", None]
+    titles = [np.nan, "CTO; founder", None]
+    websites = ["https://example.com", None, "https://x.example"]
+    expected = [
+        format_contact_data(name, phone, email, company, title if isinstance(title, str) else None, website)
+        for name, phone, email, company, title, website in zip(names, phones, emails, companies, titles, websites)
+    ]
+    assert format_contact_columns(names, phones, emails, companies, titles, websites) == expected
+    assert format_contact_columns(names) == [format_contact_data(name) for name in names]
+
+
+def test_event_columns_match_rows():
+    names = ["Launch; party", "Review, Q3", "Standup"]
+    starts = np.array(["2024-05-01T18:00", "2024-07-02T09:30", "2024-05-01T18:00"])
+    ends = ["2024-05-01T22:00", None, ""]
+    locations = ["Hall 1, Floor 2", None, "Room; B"]
+    assert format_event_columns(names, starts, ends, locations) == [
+        format_event_data(name, start, end, location)
+        for name, start, end, location in zip(names, starts.tolist(), ends, locations)
+    ]
+
+
+def test_geo_and_email_columns_match_rows():
+    assert format_geo_columns([52.5, "-33.9"], np.array([13.4, 18.4])) == [
+        format_geo_data("52.5", "13.4"), format_geo_data("-33.9", "18.4"),
+    ]
+
+    recipients = ["a@example.com", "b@example.com", "c@example.com"]
+    subjects = ["Hello & welcome", None, "Hello & welcome"]
+    bodies = [None, "Line 1\nLine 2", float("nan")]
+    assert format_email_columns(recipients, subjects, bodies) == [
+        format_email_data("a@example.com", "Hello & welcome"),
+        format_email_data("b@example.com", body="Line 1\nLine 2"),
+        format_email_data("c@example.com", "Hello & welcome"),
+    ]
+
+
+def test_columns_of_different_lengths_are_rejected():
+    with pytest.raises(ValueError, match="passwords"):
+        format_wifi_columns(["a", "b"], ["x"])
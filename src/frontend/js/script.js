@@ -19,6 +19,13 @@ const DOWNLOAD_ENDPOINT = isProduction
   ? 'https://qrcodetinker.vercel.app/api/download'
   : 'http://localhost:5000/api/download';
 
+const PREVIEW_ENDPOINT = isProduction
+  ? 'https://qrcodetinker.vercel.app/api/preview'
+  : 'http://localhost:5000/api/preview';
+
+// Delay after the last edit before a live preview is requested
+const PREVIEW_DELAY_MS = 250;
+
 // DOM Elements
 document.addEventListener('DOMContentLoaded', () => {
     // Tab navigation
@@ -44,70 +51,38 @@ document.addEventListener('DOMContentLoaded', () => {
     const showPasswordCheckbox = document.getElementById('show-wifi-password');
     const passwordInput = document.getElementById('wifi-password');
 
-    // Initialize the application
-    initTabs();
-    initForms();
-    initPasswordToggle();
-    initResultActions();
-
-    /**
-     * Initialize tab navigation
-     */
-    function initTabs() {
-        tabButtons.forEach(button => {
-            button.addEventListener('click', () => {
-                // Remove active class from all buttons and panes
-                tabButtons.forEach(btn => btn.classList.remove('active'));
-                tabPanes.forEach(pane => pane.classList.remove('active'));
-                
-                // Add active class to clicked button and corresponding pane
-                button.classList.add('active');
-                const tabId = button.getAttribute('data-tab');
-                document.getElementById(tabId).classList.add('active');
-                
-                // Hide result container when switching tabs
-                resultContainer.style.display = 'none';
-            });
-        });
-    }
-
-    /**
-     * Initialize form submissions
-     */
-    function initForms() {
+    // Request data collectors for each form
+    const formCollectors = new Map([
         // URL Form
-        urlForm.addEventListener('submit', (e) => {
-            e.preventDefault();
+        [urlForm, () => {
             const url = document.getElementById('url-input').value;
             const title = document.getElementById('url-title').value || 'URL QR Code';
             
-            generateQRCode({
+            return {
                 type: 'url',
                 content: url,
                 title: title
-            });
-        });
+            };
+        }],
         
         // WiFi Form
-        wifiForm.addEventListener('submit', (e) => {
-            e.preventDefault();
+        [wifiForm, () => {
             const ssid = document.getElementById('wifi-ssid').value;
             const password = document.getElementById('wifi-password').value;
             const security = document.getElementById('wifi-security').value;
             const title = document.getElementById('wifi-title').value || `WiFi: ${ssid}`;
             
-            generateQRCode({
+            return {
                 type: 'wifi',
                 ssid: ssid,
                 password: password,
                 security: security,
                 title: title
-            });
-        });
+            };
+        }],
         
         // Contact Form
-        contactForm.addEventListener('submit', (e) => {
-            e.preventDefault();
+        [contactForm, () => {
             const name = document.getElementById('contact-name').value;
             const phone = document.getElementById('contact-phone').value;
             const email = document.getElementById('contact-email').value;
@@ -116,7 +91,7 @@ document.addEventListener('DOMContentLoaded', () => {
             const website = document.getElementById('contact-website').value;
             const title = document.getElementById('contact-title').value || `Contact: ${name}`;
             
-            generateQRCode({
+            return {
                 type: 'contact',
                 name: name,
                 phone: phone,
@@ -125,74 +100,124 @@ document.addEventListener('DOMContentLoaded', () => {
                 jobTitle: jobTitle,
                 website: website,
                 title: title
-            });
-        });
+            };
+        }],
         
         // Event Form
-        eventForm.addEventListener('submit', (e) => {
-            e.preventDefault();
+        [eventForm, () => {
             const name = document.getElementById('event-name').value;
             const start = document.getElementById('event-start').value;
             const end = document.getElementById('event-end').value;
             const location = document.getElementById('event-location').value;
             const title = document.getElementById('event-title').value || `Event: ${name}`;
             
-            generateQRCode({
+            return {
                 type: 'event',
                 name: name,
                 start: start,
                 end: end,
                 location: location,
                 title: title
-            });
-        });
+            };
+        }],
         
         // Geolocation Form
-        geoForm.addEventListener('submit', (e) => {
-            e.preventDefault();
+        [geoForm, () => {
             const latitude = document.getElementById('geo-latitude').value;
             const longitude = document.getElementById('geo-longitude').value;
             const title = document.getElementById('geo-title').value || `Location: ${latitude}, ${longitude}`;
             
-            generateQRCode({
+            return {
                 type: 'geo',
                 latitude: latitude,
                 longitude: longitude,
                 title: title
-            });
-        });
+            };
+        }],
         
         // Email Form
-        emailForm.addEventListener('submit', (e) => {
-            e.preventDefault();
+        [emailForm, () => {
             const recipient = document.getElementById('email-recipient').value;
             const subject = document.getElementById('email-subject').value;
             const body = document.getElementById('email-body').value;
             const title = document.getElementById('email-title').value || `Email: ${recipient}`;
             
-            generateQRCode({
+            return {
                 type: 'email',
                 recipient: recipient,
                 subject: subject,
                 body: body,
                 title: title
-            });
-        });
+            };
+        }],
         
         // Custom Form
-        customForm.addEventListener('submit', (e) => {
-            e.preventDefault();
+        [customForm, () => {
             const content = document.getElementById('custom-content').value;
             const title = document.getElementById('custom-title').value || 'Custom QR Code';
             const fgColor = document.getElementById('custom-fg-color').value;
             const bgColor = document.getElementById('custom-bg-color').value;
             
-            generateQRCode({
+            return {
                 type: 'custom',
                 content: content,
                 title: title,
                 fgColor: fgColor,
                 bgColor: bgColor
+            };
+        }]
+    ]);
+    
+    // Form whose QR code is currently displayed, used for live previews
+    let activeForm = null;
+    let previewTimer = null;
+    // Data of the last live preview, generated on the server when downloaded
+    let previewedData = null;
+
+    // Initialize the application
+    initTabs();
+    initForms();
+    initPasswordToggle();
+    initResultActions();
+
+    /**
+     * Initialize tab navigation
+     */
+    function initTabs() {
+        tabButtons.forEach(button => {
+            button.addEventListener('click', () => {
+                // Remove active class from all buttons and panes
+                tabButtons.forEach(btn => btn.classList.remove('active'));
+                tabPanes.forEach(pane => pane.classList.remove('active'));
+                
+                // Add active class to clicked button and corresponding pane
+                button.classList.add('active');
+                const tabId = button.getAttribute('data-tab');
+                document.getElementById(tabId).classList.add('active');
+                
+                // Hide result container when switching tabs
+                resultContainer.style.display = 'none';
+            });
+        });
+    }
+
+    /**
+     * Initialize form submissions and live previews
+     */
+    function initForms() {
+        formCollectors.forEach((collect, form) => {
+            form.addEventListener('submit', (e) => {
+                e.preventDefault();
+                activeForm = form;
+                generateQRCode(collect());
+            });
+            
+            // Once a code is shown, refresh it as the form is edited
+            form.addEventListener('input', () => {
+                if (activeForm === form && resultContainer.style.display !== 'none' && form.checkValidity()) {
+                    clearTimeout(previewTimer);
+                    previewTimer = setTimeout(() => previewQRCode(collect()), PREVIEW_DELAY_MS);
+                }
             });
         });
     }
@@ -225,6 +250,10 @@ document.addEventListener('DOMContentLoaded', () => {
                 if (qrImage.src && qrImage.dataset.filename) {
                     // Use the backend download endpoint if we have a filename
                     window.open(`${DOWNLOAD_ENDPOINT}/${qrImage.dataset.filename}`, '_blank');
+                } else if (qrImage.src && previewedData) {
+                    // Previews are not stored on the server, so generate the
+                    // previewed code there first and download it at full resolution
+                    downloadPreview(previewedData);
                 } else if (qrImage.src) {
                     // Fallback to direct download from data URL
                     const link = document.createElement('a');
@@ -238,6 +267,42 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
+    /**
+     * Generate the previewed QR code on the server and download it
+     * @param {Object} data - The data of the previewed QR code
+     */
+    function downloadPreview(data) {
+        // Open the window while handling the click so it is not blocked
+        const downloadWindow = window.open('', '_blank');
+        
+        fetch(API_ENDPOINT, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ ...data, render: 'matrix' })
+        })
+        .then(response => response.json())
+        .then(result => {
+            if (result.success) {
+                // Later downloads of the same preview reuse the stored code
+                if (previewedData === data) {
+                    qrImage.dataset.filename = result.filename;
+                    previewedData = null;
+                }
+                downloadWindow.location = `${DOWNLOAD_ENDPOINT}/${result.filename}`;
+            } else {
+                downloadWindow.close();
+                alert('Failed to generate QR code: ' + (result.error || 'Unknown error'));
+            }
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            downloadWindow.close();
+            alert('An error occurred while downloading the QR code. Please try again.');
+        });
+    }
+
     /**
      * Generate QR code based on form data
      * @param {Object} data - The data to encode in the QR code
@@ -246,20 +311,22 @@ document.addEventListener('DOMContentLoaded', () => {
         // Show loading state
         showLoading();
         
-        // Make API call to our backend
+        // Make API call to our backend; the server returns only the module
+        // matrix and renders the full-resolution PNG on download
         fetch(API_ENDPOINT, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify(data)
+            body: JSON.stringify({ ...data, render: 'matrix' })
         })
         .then(response => response.json())
         .then(data => {
             if (data.success) {
                 // Store the filename for download
                 qrImage.dataset.filename = data.filename;
-                displayQRCode(data.qrCodeUrl);
+                previewedData = null;
+                displayQRCode(renderMatrix(data.matrix, data.style));
             } else {
                 alert('Failed to generate QR code: ' + (data.error || 'Unknown error'));
             }
@@ -270,6 +337,77 @@ document.addEventListener('DOMContentLoaded', () => {
         });
     }
 
+    /**
+     * Refresh the displayed QR code with a live preview
+     * @param {Object} data - The data to encode in the QR code
+     */
+    function previewQRCode(data) {
+        fetch(PREVIEW_ENDPOINT, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ ...data, render: 'matrix' })
+        })
+        .then(response => response.json())
+        .then(result => {
+            if (result.success) {
+                // Previews are not stored on the server, so remember the data
+                // to generate the code there when it is downloaded
+                delete qrImage.dataset.filename;
+                previewedData = data;
+                qrImage.src = renderMatrix(result.matrix, result.style);
+            }
+        })
+        .catch(error => {
+            console.error('Preview error:', error);
+        });
+    }
+
+    /**
+     * Paint a bit-packed module matrix, with its title band, to a canvas
+     * @param {Object} matrix - Module count per side and base64 bit-packed modules
+     * @param {Object} style - Box size, colors and title settings
+     * @returns {string} PNG data URL of the rendered QR code
+     */
+    function renderMatrix(matrix, style) {
+        const bytes = atob(matrix.data);
+        const size = matrix.size;
+        const box = style.boxSize;
+        const titleHeight = style.title ? style.titleHeight : 0;
+        
+        const canvas = document.createElement('canvas');
+        canvas.width = size * box;
+        canvas.height = size * box + titleHeight;
+        const ctx = canvas.getContext('2d');
+        
+        // Background, then dark modules
+        ctx.fillStyle = style.bgColor;
+        ctx.fillRect(0, titleHeight, canvas.width, size * box);
+        ctx.fillStyle = style.fgColor;
+        for (let row = 0; row < size; row++) {
+            for (let col = 0; col < size; col++) {
+                const bit = row * size + col;
+                if (bytes.charCodeAt(bit >> 3) & (0x80 >> (bit & 7))) {
+                    ctx.fillRect(col * box, titleHeight + row * box, box, box);
+                }
+            }
+        }
+        
+        // Title band
+        if (style.title) {
+            ctx.fillStyle = style.titleBgColor;
+            ctx.fillRect(0, 0, canvas.width, titleHeight);
+            ctx.fillStyle = style.titleTextColor;
+            ctx.font = `${style.titleFontSize}px "DejaVu Sans", Arial, sans-serif`;
+            ctx.textAlign = 'center';
+            ctx.textBaseline = 'top';
+            ctx.fillText(style.title, canvas.width / 2, (titleHeight - style.titleFontSize) / 2);
+        }
+        
+        return canvas.toDataURL('image/png');
+    }
+
     /**
      * Show loading state
      */